@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateBudget:
+    """
+    Token bucket shared by all backfills: ``rate`` messages per second, bursts up to ``burst``.
+    """
+
+    def __init__(self, rate, burst):
+        if rate <= 0 or burst <= 0:
+            raise ValueError(f"RateBudget needs a positive rate and burst, got {rate} and {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount, stop_event=None):
+        """
+        Block until ``amount`` (at most ``burst``) messages may be fetched.
+
+        Returns:
+            bool: False if ``stop_event`` was set while waiting.
+        """
+        amount = min(amount, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if stop_event is not None and stop_event.wait(wait):
+                return False
+            if stop_event is None:
+                time.sleep(wait)
+
+
+class BackfillService:
+    """
+    Walks users' mailbox history backwards in the background, one chunk at a time.
+
+    Backfills never compete with interactive refreshes for their resources: each
+    runs on its own IMAP connection and its own small thread pool, waits while
+    ``busy()`` reports refreshes in flight, and all of them together fetch at most
+    ``rate`` messages per second. A job ends when ``step`` reports that nothing is
+    left (0 messages), when it fails, or when the service stops; ``start`` can then
+    be called again for the user. A ``rate`` of 0 disables backfilling.
+
+    Args:
+        connect (callable): ``connect(user_email, app_password)`` -> logged-in IMAP4 connection.
+        step (callable): ``step(mail, user_email, limit)`` -> number of messages backfilled.
+        chunk_size (int): Messages requested per step.
+        rate (float): Messages per second across all backfills (0: never backfill).
+        max_workers (int): Users backfilled concurrently.
+        busy (callable, optional): ``busy()`` -> True while backfills should wait.
+        poll_interval (float): Seconds between ``busy`` checks.
+    """
+
+    def __init__(self, connect, step, chunk_size=100, rate=20, max_workers=2, busy=None, poll_interval=0.5):
+        self.connect = connect
+        self.step = step
+        self.chunk_size = chunk_size
+        self.budget = RateBudget(rate, burst=max(chunk_size, rate)) if rate > 0 else None
+        self.busy = busy or (lambda: False)
+        self.poll_interval = poll_interval
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backfill")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def start(self, user_email, app_password):
+        """
+        Queue a backfill of the user's history (no-op while one is queued or running,
+        or when backfilling is disabled).
+
+        Returns:
+            bool: Whether a new job was queued.
+        """
+        if self.budget is None:
+            return False
+        with self._lock:
+            job = self._jobs.get(user_email)
+            if job is not None and job["state"] in ("queued", "running"):
+                return False
+            self._jobs[user_email] = {"state": "queued", "backfilled": 0, "error": None}
+        self.pool.submit(self._run, user_email, app_password)
+        return True
+
+    def status(self, user_email):
+        """
+        Returns:
+            dict: ``state`` (queued, running, done, failed, stopped or None if never started),
+            ``backfilled`` messages and the last ``error``.
+        """
+        with self._lock:
+            return dict(self._jobs.get(user_email) or {"state": None, "backfilled": 0, "error": None})
+
+    def stats(self):
+        with self._lock:
+            states = [job["state"] for job in self._jobs.values()]
+            counts = {state: states.count(state) for state in ("queued", "running", "done", "failed", "stopped")}
+            return dict(counts, backfilled=sum(job["backfilled"] for job in self._jobs.values()))
+
+    def stop(self):
+        self._stop.set()
+        self.pool.shutdown(wait=True)
+
+    def _update(self, user_email, **changes):
+        with self._lock:
+            self._jobs[user_email].update(changes)
+
+    def _run(self, user_email, app_password):
+        self._update(user_email, state="running")
+        mail = None
+        try:
+            mail = self.connect(user_email, app_password)
+            while not self._stop.is_set():
+                # Interactive refreshes go first
+                while self.busy() and not self._stop.wait(self.poll_interval):
+                    pass
+                if not self.budget.acquire(self.chunk_size, self._stop):
+                    break
+                count = self.step(mail, user_email, self.chunk_size)
+                if not count:
+                    self._update(user_email, state="done")
+                    return
+                with self._lock:
+                    self._jobs[user_email]["backfilled"] += count
+            self._update(user_email, state="stopped")
+        except Exception as e:  # any failure ends the job, so a later start() can retry
+            print(f"History backfill for {user_email} failed: {e}")
+            self._update(user_email, state="failed", error=str(e))
+        finally:
+            if mail is not None:
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
@@ -0,0 +1,218 @@
+"""
+Parsing and classification of fetched messages: the CPU-bound half of a refresh.
+
+Imported by the server and by the job worker processes (classify_worker.py), which
+need this code and the served models but none of the web app.
+"""
+import base64
+import email
+from email.header import decode_header
+import os
+import quopri
+import re
+import sys
+import threading
+
+from config import PREDICTION_CACHE_PATH
+from prediction_cache import PredictionCache
+from text_extract import extract_text, normalize_text
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)  # for utils, model_registry and the machine_learning package
+from model_registry import registry
+from utils import load_config
+
+CONFIG = load_config()
+
+# Served artifacts, loaded lazily once by the shared registry and hot-reloaded on change.
+# The SVM pipeline bundles the training preprocessor, vectorizer and model (see email_pipeline.py).
+PIPELINE_NAME = "svm_pipeline"
+
+# 'svm' scores TF-IDF features; 'distilbert' runs the exported int8 transformer on CPU
+BACKENDS = ("svm", "distilbert")
+DEFAULT_BACKEND = CONFIG["serving"]["backend"]
+DISTILBERT_MODEL_NAME = CONFIG["serving"]["distilbert_model"]
+# DistilBERT reads the text the preprocessor makes of an email, as in training (processed_content)
+PREPROCESSOR_NAME = "preprocessor"
+# Models the default backend needs, loaded before the first request (see warm_up)
+SERVED_MODELS = [PREPROCESSOR_NAME, DISTILBERT_MODEL_NAME] if DEFAULT_BACKEND == "distilbert" else [PIPELINE_NAME]
+
+# Newsletters and notifications come back on every first sync and for every recipient
+prediction_cache = PredictionCache(
+    max_entries=CONFIG["serving"]["prediction_cache_size"],
+    ttl=CONFIG["serving"]["prediction_cache_ttl"],
+    path=PREDICTION_CACHE_PATH if CONFIG["serving"]["prediction_cache_persist"] else None,
+)
+
+def categorize_emails(batch, backend=None):
+    """
+    Categorize a batch of ``(subject, body)`` pairs with one pipeline predict: the same
+    preprocessing, TF-IDF and model the classifier was trained and evaluated with.
+
+    Only emails whose model input is not in the prediction cache are predicted. The
+    cache key is the preprocessed text, so emails that differ only in numbers,
+    punctuation or dropped names share one entry.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if not batch:
+        return []
+    # The dataset's 'content' column, which the preprocessor turns into processed_content
+    combined_texts = [f"{subject} {body}" for subject, body in batch]
+    if backend == "distilbert":
+        model, version = registry.get_versioned(DISTILBERT_MODEL_NAME)
+        preprocessed = list(registry.get(PREPROCESSOR_NAME).transform(combined_texts))
+        return prediction_cache.predict(backend, version, preprocessed, preprocessed, model.predict)
+    pipeline, version = registry.get_versioned(PIPELINE_NAME)
+    preprocessed = pipeline[0].transform(combined_texts)
+    return prediction_cache.predict(backend, version, preprocessed, preprocessed, pipeline[1:].predict)
+
+def categorize_email(subject, body, backend=None):
+    return categorize_emails([(subject, body)], backend=backend)[0]
+
+def process_stats():
+    """
+    Prediction-cache and model counters of this process; job workers send theirs
+    back with every result (see classify_worker.py).
+    """
+    return {"prediction_cache": prediction_cache.stats(), "models": registry.stats()}
+
+# Set once this process has run a prediction through every served model (see /ready)
+models_warm = threading.Event()
+
+def load_models():
+    """
+    Load the served models. wsgi.py calls this before gunicorn forks its workers,
+    so all workers share the loaded models' memory pages.
+    """
+    registry.preload(SERVED_MODELS)
+
+def warm_up():
+    """
+    Load the served models and run one prediction through each, bypassing the
+    prediction cache, so the first request pays for neither.
+    """
+    load_models()
+    for name in SERVED_MODELS:
+        model = registry.get(name)
+        (model.predict if hasattr(model, "predict") else model.transform)(["warm up"])
+    models_warm.set()
+
+def classifier_text(body, body_type):
+    """
+    Plain text the classifier sees: visible HTML text without tags, or the plain body.
+    """
+    return extract_text(body) if body_type == "html" else normalize_text(body)
+
+def decode_subject(msg):
+    subject, encoding = decode_header(msg["Subject"])[0]
+    if isinstance(subject, bytes):
+        subject = subject.decode(encoding or "utf-8")
+    return subject
+
+def parse_email(raw):
+    """
+    Extract the subject, sender, unsanitized body and body type ("html" or "plain")
+    from a raw RFC822 message.
+
+    Multipart messages show the first text/html part, else the first text/plain
+    part, skipping attachments (the same choice as imap_fetch.select_text_part).
+    """
+    msg = email.message_from_bytes(raw)
+
+    subject = decode_subject(msg)
+    from_ = msg.get("From")
+
+    body, body_type = "Unable to Read Body", "plain"
+    if msg.is_multipart():
+        plain = None
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            if "attachment" in str(part.get("Content-Disposition")):
+                continue
+            if content_type == "text/html":
+                body = part.get_payload(decode=True).decode(errors="ignore")
+                body_type = "html"
+                break
+            elif content_type == "text/plain" and plain is None:
+                plain = part.get_payload(decode=True).decode(errors="ignore")
+        if body_type != "html" and plain is not None:
+            body = plain
+    else:
+        content_type = msg.get_content_type()
+        if content_type == "text/html":
+            body = msg.get_payload(decode=True).decode(errors="ignore")
+            body_type = "html"
+        elif content_type == "text/plain":
+            body = msg.get_payload(decode=True).decode(errors="ignore")
+
+    return subject, from_, body, body_type
+
+def decode_part(payload, encoding, charset):
+    """
+    Decode a (possibly truncated) MIME part fetched with BODY.PEEK[section]<0.n>.
+    """
+    if encoding == "base64":
+        payload = re.sub(rb'[^A-Za-z0-9+/]', b'', payload)
+        payload = base64.b64decode(payload[:len(payload) - len(payload) % 4])
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+def parse_partial(header, part, payload):
+    """
+    Extract the subject, sender, unsanitized body and body type from a header-first partial fetch.
+    """
+    msg = email.message_from_bytes(header)
+    subject = decode_subject(msg)
+    from_ = msg.get("From")
+
+    body, body_type = "Unable to Read Body", "plain"
+    if part is not None and payload is not None:
+        body = decode_part(payload, part["encoding"], part["charset"])
+        body_type = "html" if part["subtype"] == "html" else "plain"
+    return subject, from_, body, body_type
+
+def parse_fetched(batch):
+    """
+    Parse one fetched batch into message dicts (without a category yet).
+
+    Bodies are stored unsanitized; only the extracted ``text`` is classified.
+    """
+    messages = []
+    for fetched in batch:
+        if fetched["raw"] is not None:
+            subject, from_, body, body_type = parse_email(fetched["raw"])
+        else:
+            subject, from_, body, body_type = parse_partial(fetched["header"], fetched["part"], fetched["body"])
+        messages.append({
+            "uid": fetched["uid"],
+            "subject": subject,
+            "from": from_,
+            "body": body,
+            "body_type": body_type,
+            "text": classifier_text(body, body_type),
+            "gmail_id": fetched["gmail_id"]
+        })
+    return messages
+
+def categorize_batch(batch, backend=None):
+    """
+    Parse one fetched batch and categorize it: the CPU-bound half of a refresh.
+    """
+    messages = parse_fetched(batch)
+    categories = categorize_emails([(m["subject"], m["text"]) for m in messages], backend=backend)
+    for message, category in zip(messages, categories):
+        message["category"] = category
+    return messages
+
+# Jobs run by the worker pool, in worker processes or on the parse threads (see job_queue.py)
+JOB_HANDLERS = {
+    "categorize_batch": lambda payload: categorize_batch(*payload),
+    "categorize": lambda payload: categorize_emails(*payload),
+}
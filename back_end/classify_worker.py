@@ -0,0 +1,18 @@
+"""
+Job handlers of the classification worker processes (see job_queue.WorkerPool).
+
+A worker imports only the parsing and classification code (categorize.py), never
+the web app; ``init_worker`` loads and warms up the served model once per process,
+and ``stats`` reports its prediction-cache and model counters with every result.
+"""
+from categorize import JOB_HANDLERS, process_stats, warm_up
+
+HANDLERS = JOB_HANDLERS
+
+
+def init_worker():
+    warm_up()
+
+
+def stats():
+    return process_stats()
@@ -36,4 +36,22 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-EMAIL = os.getenv("EMAIL")
\ No newline at end of file
+EMAIL = os.getenv("EMAIL")
+
+# SQLite file holding per-user sync state and cached classifications
+MESSAGE_STORE_PATH = os.getenv(
+    "MESSAGE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "message_store.sqlite3")
+)
+
+# SQLite file persisting cached predictions across restarts (serving.prediction_cache_persist)
+PREDICTION_CACHE_PATH = os.getenv(
+    "PREDICTION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prediction_cache.sqlite3")
+)
+
+# SQLite file of the classification job queue shared with the worker processes
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_queue.sqlite3")
+)
@@ -0,0 +1,38 @@
+"""
+gunicorn settings of the backend (see wsgi.py). Workers, threads and the bind
+address come from ``serving`` in config.yaml.
+
+The job queue's worker processes are not started under gunicorn: the WSGI workers
+already classify on separate cores. IMAP sessions, the prediction cache's memory
+tier and in-flight refresh de-duplication are per worker; the message store, the
+persisted prediction cache and the job queue are SQLite files they share.
+"""
+import os
+import sys
+
+BACK_END_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BACK_END_DIR))  # for utils
+from utils import load_config  # noqa: E402
+
+SERVING = load_config()["serving"]
+
+chdir = BACK_END_DIR
+wsgi_app = "wsgi:app"
+bind = os.getenv("WSGI_BIND", SERVING["wsgi_bind"])
+workers = int(os.getenv("WEB_CONCURRENCY", SERVING["wsgi_workers"]))
+threads = int(os.getenv("WSGI_THREADS", SERVING["wsgi_threads"]))
+worker_class = "gthread"
+# Load the app and its models in the master before forking; WSGI_PRELOAD=0 makes
+# every worker load its own copy (e.g. to compare memory use)
+preload_app = os.getenv("WSGI_PRELOAD", "1") != "0"
+# Streams and /jobs long polls hold a thread for a while; gthread workers are only
+# restarted when they stop heartbeating, not for slow requests
+timeout = 60
+
+
+def post_worker_init(worker):
+    # Warm up before accepting requests. This runs after the fork, so thread pools
+    # that torch or ONNX Runtime start on the first prediction are never forked.
+    import server
+
+    server.warm_up()
@@ -0,0 +1,291 @@
+import re
+
+# Number of messages requested per FETCH command. A window of 100 messages is
+# fetched with a single command instead of one round-trip per message.
+FETCH_BATCH_SIZE = 100
+FETCH_ITEMS = "(RFC822 X-GM-MSGID)"
+
+# Header-first strategy: structure and the two headers we show, then one text part
+HEADER_ITEMS = "(UID X-GM-MSGID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (SUBJECT FROM)])"
+HEADER_ITEM = "BODY[HEADER.FIELDS (SUBJECT FROM)]"
+MAX_BODY_BYTES = 64 * 1024
+
+_SEQ_RE = re.compile(rb'^\s*(\d+) \(')
+_GM_MSGID_RE = re.compile(rb'X-GM-MSGID (\d+)')
+_UID_RE = re.compile(rb'\bUID (\d+)')
+_LITERAL_ITEM_RE = re.compile(rb'([A-Z0-9.\-]+(?:\[[^\]]*\])?(?:<\d+>)?) \{\d+\}$')
+_SEXP_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|(\{\d+\})|([^\s()"]+))')
+
+
+def to_sequence_set(ids):
+    """
+    Collapse message numbers into a compact IMAP sequence set.
+
+    Args:
+        ids (iterable): Message sequence numbers or UIDs (int, str or bytes).
+
+    Returns:
+        str: Sequence set such as "1:5,7,9:12".
+    """
+    numbers = sorted({int(i) for i in ids})
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(f"{start}" if start == end else f"{start}:{end}" for start, end in ranges)
+
+
+def chunked(items, size):
+    """
+    Split a list into consecutive chunks of at most ``size`` items.
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_fetch_response(data):
+    """
+    Parse a multi-message FETCH response in a single pass.
+
+    imaplib returns a flat list in which every literal is a ``(header, payload)``
+    tuple and the remaining response text is a plain ``bytes`` element. A tuple
+    whose header starts with ``<n> (`` opens a new message; any other element
+    belongs to the message opened last.
+
+    Args:
+        data (list): The data part of ``IMAP4.fetch`` / ``IMAP4.uid("FETCH", ...)``.
+
+    Returns:
+        list: One dict per message with the keys ``seq``, ``uid``, ``gmail_id``,
+        ``literals`` (item name -> bytes), ``raw`` (the RFC822 payload, if any) and
+        ``text`` (the response without literal payloads, e.g. for BODYSTRUCTURE).
+    """
+    messages = []
+    current = None
+
+    for part in data or []:
+        if part is None:
+            continue
+        header = part[0] if isinstance(part, tuple) else part
+        header = header or b""
+
+        match = _SEQ_RE.match(header)
+        if match or current is None:
+            current = {
+                "seq": int(match.group(1)) if match else None,
+                "uid": None,
+                "gmail_id": None,
+                "literals": {},
+                "raw": None,
+                "text": b"",
+            }
+            messages.append(current)
+        current["text"] += header
+
+        gm_match = _GM_MSGID_RE.search(header)
+        if gm_match:
+            current["gmail_id"] = gm_match.group(1).decode()
+        uid_match = _UID_RE.search(header)
+        if uid_match:
+            current["uid"] = int(uid_match.group(1))
+
+        if isinstance(part, tuple):
+            item_match = _LITERAL_ITEM_RE.search(header.rstrip())
+            item = item_match.group(1).decode().upper() if item_match else "RFC822"
+            current["literals"][item] = part[1]
+            if item in ("RFC822", "BODY[]"):
+                current["raw"] = part[1]
+
+    return messages
+
+
+def iter_fetch_batches(mail, ids, items=FETCH_ITEMS, batch_size=FETCH_BATCH_SIZE, uid=False):
+    """
+    Fetch messages one FETCH command per batch, yielding each parsed batch as soon as it arrives.
+
+    Lets a caller process batch ``n`` while batch ``n+1`` is still on the wire.
+    Arguments are the same as for ``fetch_messages``.
+
+    Yields:
+        list: Parsed messages of one batch (see ``parse_fetch_response``).
+    """
+    ids = sorted({int(i) for i in ids})
+    for batch in chunked(ids, batch_size):
+        sequence_set = to_sequence_set(batch)
+        if uid:
+            status, data = mail.uid("FETCH", sequence_set, items)
+        else:
+            status, data = mail.fetch(sequence_set, items)
+        if status != "OK":
+            raise Exception(f"FETCH {sequence_set} failed: {data}")
+        yield parse_fetch_response(data)
+
+
+def fetch_messages(mail, ids, items=FETCH_ITEMS, batch_size=FETCH_BATCH_SIZE, uid=False):
+    """
+    Fetch a window of messages with one FETCH command per batch.
+
+    Args:
+        mail (imaplib.IMAP4): An authenticated connection with a mailbox selected.
+        ids (list): Message sequence numbers (or UIDs when ``uid`` is True).
+        items (str): FETCH data items to request.
+        batch_size (int): Maximum number of messages per FETCH command.
+        uid (bool): Whether ``ids`` are UIDs and ``UID FETCH`` should be used.
+
+    Returns:
+        list: Parsed messages (see ``parse_fetch_response``) in mailbox order.
+    """
+    messages = []
+    for batch in iter_fetch_batches(mail, ids, items=items, batch_size=batch_size, uid=uid):
+        messages.extend(batch)
+
+    key = "uid" if uid else "seq"
+    messages.sort(key=lambda message: message[key] if message[key] is not None else 0)
+    return messages
+
+
+def parse_sexp(text, start=0):
+    """
+    Parse one parenthesized IMAP list (e.g. a BODYSTRUCTURE) starting at ``text[start]``.
+
+    Returns:
+        tuple: (nested lists of str/None, end offset). Raises ValueError on literals
+        or malformed input.
+    """
+    stack, position = [], start
+    while True:
+        match = _SEXP_TOKEN_RE.match(text, position)
+        if not match:
+            raise ValueError("Malformed IMAP list")
+        position = match.end()
+        opened, closed, quoted, literal, atom = match.groups()
+        if literal is not None:
+            raise ValueError("Literal inside IMAP list")
+        if opened:
+            stack.append([])
+            continue
+        if closed:
+            if not stack:
+                raise ValueError("Unbalanced IMAP list")
+            done = stack.pop()
+            if not stack:
+                return done, position
+            stack[-1].append(done)
+            continue
+        if not stack:
+            raise ValueError("Expected an IMAP list")
+        if quoted is not None:
+            stack[-1].append(re.sub(rb'\\(.)', rb'\1', quoted).decode(errors="replace"))
+        else:
+            stack[-1].append(None if atom.upper() == b"NIL" else atom.decode(errors="replace"))
+
+
+def parse_bodystructure(text):
+    """
+    Extract the BODYSTRUCTURE list from the text of a FETCH response, or None.
+    """
+    index = text.find(b"BODYSTRUCTURE (")
+    if index < 0:
+        return None
+    try:
+        return parse_sexp(text, index + len(b"BODYSTRUCTURE "))[0]
+    except ValueError:
+        return None
+
+
+def _params(value):
+    if not isinstance(value, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(value[::2], value[1::2])}
+
+
+def _text_parts(structure, prefix=""):
+    """Yield (section, part info) for every non-attachment text/html and text/plain part."""
+    if structure and isinstance(structure[0], list):
+        children = [part for part in structure if isinstance(part, list)]
+        for number, part in enumerate(children, start=1):
+            yield from _text_parts(part, f"{prefix}{number}.")
+        return
+    if len(structure) < 7 or str(structure[0]).lower() != "text":
+        return
+    subtype = str(structure[1]).lower()
+    disposition = structure[9] if len(structure) > 9 else None
+    if subtype not in ("html", "plain") or (
+        isinstance(disposition, list) and str(disposition[0]).lower() == "attachment"
+    ):
+        return
+    yield (prefix or "1.")[:-1], {
+        "subtype": subtype,
+        "charset": _params(structure[2]).get("charset"),
+        "encoding": str(structure[5] or "7bit").lower(),
+        "size": int(structure[6]) if str(structure[6]).isdigit() else None,
+    }
+
+
+def select_text_part(structure):
+    """
+    Pick the part shown and classified for a message: the first text/html part,
+    else the first text/plain part, skipping attachments.
+
+    Returns:
+        dict: ``section`` (e.g. "1.2"), ``subtype``, ``charset``, ``encoding`` and
+        ``size``, or None when the message has no readable text part.
+    """
+    parts = list(_text_parts(structure))
+    for wanted in ("html", "plain"):
+        for section, part in parts:
+            if part["subtype"] == wanted:
+                return dict(part, section=section)
+    return None
+
+
+def iter_partial_batches(mail, uids, max_body_bytes=MAX_BODY_BYTES, batch_size=FETCH_BATCH_SIZE):
+    """
+    Header-first fetch: BODYSTRUCTURE and headers, then only the displayed text part.
+
+    Per batch this costs one FETCH for the structures and headers plus one
+    ``BODY.PEEK[section]<0.max_body_bytes>`` FETCH per distinct section (usually
+    one or two), so attachments are never downloaded. Messages whose structure
+    cannot be parsed fall back to a full RFC822 fetch.
+
+    Yields:
+        list: Dicts with ``uid``, ``gmail_id``, ``header`` (Subject/From bytes),
+        ``part`` (see ``select_text_part``), ``body`` (the raw, still
+        transfer-encoded part bytes) and ``raw`` (the full message, fallback only).
+    """
+    for batch in iter_fetch_batches(mail, uids, items=HEADER_ITEMS, batch_size=batch_size, uid=True):
+        messages, by_section, fallback = [], {}, []
+        for fetched in batch:
+            if fetched["uid"] is None:
+                continue
+            structure = parse_bodystructure(fetched["text"])
+            message = {
+                "uid": fetched["uid"],
+                "gmail_id": fetched["gmail_id"],
+                "header": fetched["literals"].get(HEADER_ITEM, b""),
+                "part": select_text_part(structure) if structure else None,
+                "body": None,
+                "raw": None,
+            }
+            messages.append(message)
+            if structure is None:
+                fallback.append(message)
+            elif message["part"] is not None:
+                by_section.setdefault(message["part"]["section"], []).append(message)
+
+        for section, group in by_section.items():
+            by_uid = {message["uid"]: message for message in group}
+            items = f"(UID BODY.PEEK[{section}]<0.{max_body_bytes}>)"
+            for fetched in fetch_messages(mail, list(by_uid), items=items, batch_size=batch_size, uid=True):
+                if fetched["uid"] in by_uid:
+                    by_uid[fetched["uid"]]["body"] = next(iter(fetched["literals"].values()), b"")
+
+        if fallback:
+            by_uid = {message["uid"]: message for message in fallback}
+            for fetched in fetch_messages(mail, list(by_uid), items="(UID RFC822)", batch_size=batch_size, uid=True):
+                if fetched["uid"] in by_uid:
+                    by_uid[fetched["uid"]]["raw"] = fetched["raw"]
+
+        yield messages
@@ -0,0 +1,135 @@
+import re
+import select
+import threading
+import time
+
+# Restart IDLE before servers drop it (RFC 2177 recommends at most 29 minutes)
+IDLE_TIMEOUT = 29 * 60
+
+_CHANGE_RE = re.compile(rb'^\* \d+ (EXISTS|EXPUNGE)\b')
+
+
+def idle_wait(mail, timeout, stop_event=None, poll_interval=1.0):
+    """
+    Run one IMAP IDLE cycle on a selected mailbox.
+
+    imaplib (before Python 3.14) has no IDLE support, so the command is written
+    to the connection directly and the socket is polled until the server reports
+    a new or expunged message, ``timeout`` passes or ``stop_event`` is set.
+
+    Returns:
+        bool: Whether the mailbox changed.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b" IDLE\r\n")
+    line = mail.readline()
+    if not line.startswith(b"+"):
+        raise mail.error(f"IDLE not accepted: {line!r}")
+
+    changed = False
+    deadline = time.monotonic() + timeout
+    while not changed and time.monotonic() < deadline and not (stop_event and stop_event.is_set()):
+        pending = getattr(mail.sock, "pending", lambda: 0)()  # bytes already decrypted by SSL
+        if not pending:
+            wait = max(0.0, min(poll_interval, deadline - time.monotonic()))
+            readable, _, _ = select.select([mail.sock], [], [], wait)
+            if not readable:
+                continue
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed during IDLE")
+        changed = bool(_CHANGE_RE.match(line))
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed during IDLE")
+        if line.startswith(tag):
+            break
+        changed = changed or bool(_CHANGE_RE.match(line))
+    return changed
+
+
+class MailboxWatcher:
+    """
+    Keeps an IDLE connection per watched user and calls ``on_change`` when mail arrives.
+
+    IDLE occupies its connection, so each watched user gets one dedicated session
+    next to the pooled one used by refreshes. Watch threads reconnect after any
+    error, so a user stays watched until ``unwatch`` or ``stop``.
+
+    Args:
+        connect (callable): ``connect(user_email, app_password)`` -> logged-in IMAP4 connection.
+        on_change (callable): ``on_change(user_email, app_password)``, called from the watch thread.
+        idle_timeout (float): Seconds before an IDLE command is restarted.
+        retry_delay (float): Seconds to wait before reconnecting after an error.
+    """
+
+    def __init__(self, connect, on_change, idle_timeout=IDLE_TIMEOUT, retry_delay=30):
+        self.connect = connect
+        self.on_change = on_change
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self._watches = {}
+        self._lock = threading.Lock()
+
+    def watch(self, user_email, app_password):
+        """
+        Start watching the user's INBOX (no-op if already watched).
+        """
+        with self._lock:
+            if user_email in self._watches:
+                return
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=self._run, args=(user_email, app_password, stop_event),
+                name=f"idle-{user_email}", daemon=True
+            )
+            self._watches[user_email] = (thread, stop_event)
+        thread.start()
+
+    def watching(self, user_email):
+        with self._lock:
+            return user_email in self._watches
+
+    def unwatch(self, user_email):
+        with self._lock:
+            watch = self._watches.pop(user_email, None)
+        if watch:
+            watch[1].set()
+
+    def stop(self):
+        with self._lock:
+            watches, self._watches = list(self._watches.values()), {}
+        for thread, stop_event in watches:
+            stop_event.set()
+        for thread, stop_event in watches:
+            thread.join(timeout=5)
+
+    def _run(self, user_email, app_password, stop_event):
+        try:
+            while not stop_event.is_set():
+                mail = None
+                try:
+                    mail = self.connect(user_email, app_password)
+                    mail.select("inbox", readonly=True)
+                    while not stop_event.is_set():
+                        if idle_wait(mail, self.idle_timeout, stop_event):
+                            self.on_change(user_email, app_password)
+                except Exception as e:  # connection errors, but also failing refreshes or login errors
+                    print(f"IDLE watch for {user_email} failed, retrying in {self.retry_delay}s: {e}")
+                    stop_event.wait(self.retry_delay)
+                finally:
+                    if mail is not None:
+                        try:
+                            mail.logout()
+                        except Exception:
+                            pass
+        finally:
+            # However the thread ends, stop reporting the user as watched so watch() can
+            # start over (unless the entry already belongs to a newer watch)
+            with self._lock:
+                watch = self._watches.get(user_email)
+                if watch is not None and watch[1] is stop_event:
+                    del self._watches[user_email]
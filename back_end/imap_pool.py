@@ -0,0 +1,130 @@
+import imaplib
+import threading
+import time
+from contextlib import contextmanager
+
+# Errors after which an IMAP session can no longer be trusted
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError, EOFError)
+
+
+class _Session:
+    def __init__(self):
+        self.lock = threading.Lock()  # one command stream per connection
+        self.mail = None
+        self.password = None
+        self.last_used = 0.0
+
+
+class ImapConnectionPool:
+    """
+    Authenticated IMAP sessions kept open per user between refreshes.
+
+    A refresh borrows the user's session instead of paying for a TLS handshake and
+    LOGIN every time. A session idle for longer than ``health_check_interval`` is
+    probed with NOOP before use and replaced if the probe fails; a session that
+    errors during use is discarded so the next refresh reconnects. Sessions idle
+    for longer than ``max_idle`` are logged out (Gmail drops them after ~30 minutes).
+
+    Args:
+        connect (callable): ``connect(user_email, app_password)`` -> logged-in IMAP4 connection.
+        max_idle (float): Seconds after which an unused session is closed.
+        health_check_interval (float): Seconds of inactivity after which a session is probed.
+    """
+
+    def __init__(self, connect, max_idle=25 * 60, health_check_interval=60):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._counts = {"connects": 0, "reuses": 0, "reconnects": 0, "evictions": 0}
+
+    def _session(self, user_email):
+        with self._lock:
+            session = self._sessions.get(user_email)
+            if session is None:
+                session = self._sessions[user_email] = _Session()
+            return session
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    @contextmanager
+    def connection(self, user_email, app_password):
+        """
+        Borrow the user's session, connecting (or reconnecting) if needed.
+
+        Example:
+            with pool.connection(user_email, app_password) as mail:
+                mail.select("inbox")
+        """
+        self.evict_idle()
+        session = self._session(user_email)
+        with session.lock:
+            if session.mail is not None and session.password != app_password:
+                self._close(session)  # the user re-registered with a new app password
+            if session.mail is not None and not self._healthy(session):
+                self._close(session)
+                self._count("reconnects")
+            if session.mail is None:
+                session.mail = self.connect(user_email, app_password)
+                session.password = app_password
+                self._count("connects")
+            else:
+                self._count("reuses")
+
+            try:
+                yield session.mail
+            except CONNECTION_ERRORS:
+                self._close(session)
+                raise
+            finally:
+                session.last_used = time.monotonic()
+
+    def _healthy(self, session):
+        if time.monotonic() - session.last_used < self.health_check_interval:
+            return True
+        try:
+            status, _ = session.mail.noop()
+            return status == "OK"
+        except CONNECTION_ERRORS:
+            return False
+
+    def _close(self, session):
+        mail, session.mail = session.mail, None
+        try:
+            mail.logout()
+        except Exception:
+            pass  # the connection is being dropped anyway
+
+    def evict_idle(self):
+        """
+        Log out every session unused for longer than ``max_idle``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            if session.mail is not None and now - session.last_used > self.max_idle:
+                if session.lock.acquire(blocking=False):
+                    try:
+                        if session.mail is not None:
+                            self._close(session)
+                            self._count("evictions")
+                    finally:
+                        session.lock.release()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                if session.mail is not None:
+                    self._close(session)
+
+    def stats(self):
+        with self._lock:
+            open_sessions = sum(1 for session in self._sessions.values() if session.mail is not None)
+            return dict(self._counts, open=open_sessions)
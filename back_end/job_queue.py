@@ -0,0 +1,405 @@
+import importlib
+import multiprocessing
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result BLOB,
+    error TEXT,
+    owner TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+# Columns added after the first release, for queue files created before them
+ADDED_COLUMNS = {
+    "owner": "TEXT",
+}
+
+# Finished jobs nobody collected (e.g. /classify results never polled), and unfinished
+# jobs of pools that are gone, are dropped after this
+FINISHED_JOB_TTL = 3600
+
+
+class JobQueue:
+    """
+    SQLite-backed broker shared by the web process and the worker processes.
+
+    Payloads and results are pickled. Workers claim the oldest queued job of their
+    ``owner`` (the pool that queued it) in an immediate transaction, so every job runs
+    once and several pools can share one file; jobs of a worker that died are put back
+    with ``requeue``. The database is in WAL mode, so polling readers do not block
+    workers finishing jobs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._ready = False
+        self._setup_lock = threading.Lock()
+
+    def _setup(self):
+        # The file is created on first use, not when the queue is constructed
+        with self._setup_lock:
+            if self._ready:
+                return
+            with closing(self._open()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for name, column_type in ADDED_COLUMNS.items():
+                    if name not in columns:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, status, id)")
+            self._ready = True
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _connect(self):
+        if not self._ready:
+            self._setup()
+        return self._open()
+
+    def enqueue(self, kind, payload, owner=None, worker=None):
+        """
+        Queue a job for the workers of ``owner``, or record it as already running on
+        ``worker`` (a job run outside the worker processes).
+
+        Returns:
+            int: The new job's id.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "INSERT INTO jobs (kind, payload, status, owner, worker, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL),
+                 "queued" if worker is None else "running", owner, worker, time.time()),
+            ).lastrowid
+
+    def claim(self, worker, owner=None):
+        """
+        Mark the oldest job queued for ``owner`` as running on ``worker``.
+
+        Returns:
+            tuple: ``(job_id, kind, payload)``, or None if the queue is empty.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE owner IS ? AND status = 'queued' ORDER BY id LIMIT 1) "
+                "RETURNING id, kind, payload",
+                (worker, owner),
+            ).fetchone()
+            conn.execute("COMMIT")
+        return (row["id"], row["kind"], pickle.loads(row["payload"])) if row else None
+
+    def finish(self, job_id, result=None, error=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error is not None else "done",
+                 None if error is not None else pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL),
+                 error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: ``status`` (queued, running, done or failed), ``result`` and ``error``,
+            or None for an unknown job.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT status, result, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        result = pickle.loads(row["result"]) if row["result"] is not None else None
+        return {"status": row["status"], "result": result, "error": row["error"]}
+
+    def delete(self, job_ids):
+        with closing(self._connect()) as conn:
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def requeue(self, worker):
+        """
+        Put the jobs ``worker`` was running back in the queue (after it died).
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND worker = ?",
+                (worker,),
+            ).rowcount
+
+    def abandon(self, owner, error):
+        """
+        Fail the unfinished jobs of ``owner`` (its workers stopped), so pollers stop waiting.
+
+        Returns:
+            int: Number of jobs failed.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE owner = ? AND status IN ('queued', 'running')",
+                (error, time.time(), owner),
+            ).rowcount
+
+    def prune(self, max_age=FINISHED_JOB_TTL):
+        """
+        Drop jobs finished more than ``max_age`` seconds ago, and jobs queued that long
+        ago and never finished (their pool's process died without stopping it).
+        """
+        cutoff = time.time() - max_age
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE (status IN ('done', 'failed') AND finished_at < ?) "
+                "OR (status IN ('queued', 'running') AND created_at < ?)",
+                (cutoff, cutoff),
+            )
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+
+def run_job(handlers, kind, payload):
+    handler = handlers.get(kind)
+    if handler is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return handler(payload)
+
+
+def worker_main(path, module_name, owner, worker, wakeup, finished, stop_event):
+    """
+    Entry point of a worker process: initialize once, then run the jobs of ``owner`` until stopped.
+
+    ``module_name`` names a module with a ``HANDLERS`` dict (job kind -> callable
+    taking the payload), an optional ``init_worker()``, e.g. to load models, and an
+    optional ``stats()``, whose (picklable) result is reported with every finished job.
+    """
+    module = importlib.import_module(module_name)
+    if hasattr(module, "init_worker"):
+        module.init_worker()
+    report = getattr(module, "stats", None)
+    jobs = JobQueue(path)
+    while not stop_event.is_set():
+        wakeup.acquire(timeout=1.0)
+        while not stop_event.is_set():
+            job = jobs.claim(worker, owner)
+            if job is None:
+                break
+            job_id, kind, payload = job
+            try:
+                jobs.finish(job_id, result=run_job(module.HANDLERS, kind, payload))
+            except Exception as e:
+                jobs.finish(job_id, error=f"{type(e).__name__}: {e}")
+            finished.put((job_id, worker, report() if report is not None else None))
+
+
+class WorkerPool:
+    """
+    Runs CPU-bound jobs (MIME parsing, classification) outside the web process's GIL.
+
+    With ``processes`` > 0, jobs go through the SQLite ``JobQueue`` to that many
+    worker processes, started with ``start()``. Each worker imports ``module`` once,
+    so models are loaded once per worker rather than per job. ``submit`` returns a
+    Future that a collector thread resolves when a worker reports the job finished;
+    ``enqueue`` leaves the job in the queue for clients polling by id.
+
+    Until the processes are started (or with ``processes=0``), jobs run in this
+    process with ``handlers`` on ``local_executor``, which behaves like the pool did
+    before workers existed.
+
+    Every pool gets its own ``owner`` id: its workers only claim jobs it queued, so
+    other processes sharing the queue file (e.g. gunicorn workers) keep their jobs.
+
+    Args:
+        path (str): SQLite file of the job queue.
+        module (str): Module the workers import (``HANDLERS``, optional ``init_worker``).
+        handlers (dict): Job kind -> callable, for jobs run in this process.
+        local_executor (concurrent.futures.Executor): Runs jobs in this process.
+        processes (int): Worker processes.
+    """
+
+    def __init__(self, path, module, handlers, local_executor, processes=0):
+        self.queue = JobQueue(path)
+        self.module = module
+        self.handlers = handlers
+        self.local_executor = local_executor
+        self.processes = processes
+        self.owner = uuid.uuid4().hex
+        self._context = multiprocessing.get_context("spawn")  # the web process runs threads; never fork it
+        self._workers = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._counts = {"submitted": 0, "local": 0, "restarts": 0}
+        self._worker_stats = {}
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running or not self.processes:
+            return
+        self.queue.prune()  # drops jobs a previous run left unfinished, once they are stale
+        self._wakeup = self._context.Semaphore(0)
+        self._finished = self._context.Queue()
+        self._stop = self._context.Event()
+        for index in range(self.processes):
+            self._spawn(f"{self.owner}:worker-{index}")
+        self._running = True
+        threading.Thread(target=self._collect, name="job-collector", daemon=True).start()
+        threading.Thread(target=self._supervise, name="job-supervisor", daemon=True).start()
+
+    def _spawn(self, name):
+        process = self._context.Process(
+            target=worker_main,
+            args=(self.queue.path, self.module, self.owner, name, self._wakeup, self._finished, self._stop),
+            name=name,
+            daemon=True,
+        )
+        process.start()
+        self._workers[name] = process
+
+    def stop(self, timeout=5):
+        if not self._running:
+            return
+        self._running = False
+        self._stop.set()
+        for _ in self._workers:
+            self._wakeup.release()
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._workers = {}
+        self.queue.abandon(self.owner, "RuntimeError: Job workers stopped")
+        with self._lock:
+            futures, self._futures = list(self._futures.values()), {}
+        for future in futures:
+            future.set_exception(RuntimeError("Job workers stopped"))
+
+    def submit(self, kind, payload):
+        """
+        Run one job, in a worker process if they are running.
+
+        Returns:
+            concurrent.futures.Future: The job's result.
+        """
+        if not self._running:
+            with self._lock:
+                self._counts["local"] += 1
+            return self.local_executor.submit(run_job, self.handlers, kind, payload)
+        future = Future()
+        with self._lock:
+            job_id = self.queue.enqueue(kind, payload, owner=self.owner)
+            self._futures[job_id] = future
+            self._counts["submitted"] += 1
+        self._wakeup.release()
+        return future
+
+    def enqueue(self, kind, payload):
+        """
+        Queue a job whose result is fetched later with ``queue.get(job_id)``.
+
+        Returns:
+            int: The job id.
+        """
+        self.queue.prune()
+        running = self._running
+        # A job run in this process is recorded as running, so workers started meanwhile leave it alone
+        job_id = self.queue.enqueue(kind, payload, owner=self.owner, worker=None if running else "local")
+        with self._lock:
+            self._counts["submitted"] += 1
+        if running:
+            self._wakeup.release()
+        else:
+            self.local_executor.submit(self._run_local, job_id, kind, payload)
+        return job_id
+
+    def _run_local(self, job_id, kind, payload):
+        try:
+            self.queue.finish(job_id, result=run_job(self.handlers, kind, payload))
+        except Exception as e:
+            self.queue.finish(job_id, error=f"{type(e).__name__}: {e}")
+
+    def _collect(self):
+        while self._running:
+            try:
+                job_id, worker, worker_stats = self._finished.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                if worker_stats is not None:
+                    self._worker_stats[worker] = worker_stats
+                future = self._futures.pop(job_id, None)
+            if future is None:
+                continue  # an enqueued job; its client polls the queue
+            # Whatever happens to this job, its future is resolved and the collector keeps running
+            try:
+                job = self.queue.get(job_id)
+                self.queue.delete([job_id])
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            if job is None:
+                future.set_exception(RuntimeError(f"Job {job_id} disappeared from the queue"))
+            elif job["status"] == "done":
+                future.set_result(job["result"])
+            else:
+                future.set_exception(RuntimeError(job["error"]))
+
+    def _supervise(self):
+        # Restart dead workers and give their jobs to the others
+        while self._running:
+            time.sleep(1.0)
+            for name, process in list(self._workers.items()):
+                if self._running and not process.is_alive():
+                    print(f"Job worker {name} exited with {process.exitcode}, restarting")
+                    requeued = self.queue.requeue(name)
+                    self._spawn(name)
+                    for _ in range(requeued):
+                        self._wakeup.release()
+                    with self._lock:
+                        self._counts["restarts"] += 1
+
+    def worker_stats(self):
+        """
+        Returns:
+            dict: Worker name -> what its module's ``stats()`` returned with its last
+            finished job (counters restart with a restarted worker).
+        """
+        with self._lock:
+            return {name: stats for name, stats in self._worker_stats.items() if name in self._workers}
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts, pending=len(self._futures))
+        return dict(
+            counts,
+            processes=sum(process.is_alive() for process in self._workers.values()),
+            jobs=self.queue.stats(),
+        )
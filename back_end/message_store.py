@@ -0,0 +1,423 @@
+import sqlite3
+import threading
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailbox_state (
+    user TEXT PRIMARY KEY,
+    uidvalidity INTEGER NOT NULL,
+    last_uid INTEGER NOT NULL DEFAULT 0,
+    exists_count INTEGER,
+    change_seq INTEGER NOT NULL DEFAULT 0,
+    delta_floor INTEGER NOT NULL DEFAULT 0,
+    model_version TEXT,
+    history_uid INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    user TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    gmail_id TEXT,
+    subject TEXT,
+    sender TEXT,
+    body TEXT,
+    category TEXT,
+    body_type TEXT,
+    text TEXT,
+    sanitized_body TEXT,
+    added_seq INTEGER NOT NULL DEFAULT 0,
+    changed_seq INTEGER NOT NULL DEFAULT 0,
+    history INTEGER NOT NULL DEFAULT 0,
+    model_version TEXT,
+    PRIMARY KEY (user, uid)
+);
+CREATE TABLE IF NOT EXISTS removed_messages (
+    user TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    gmail_id TEXT,
+    removed_seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS removed_messages_seq ON removed_messages (user, removed_seq);
+"""
+
+# Columns added after the first release; stores created before them are migrated on open.
+# Rows from before the migration have a NULL body_type and an already sanitized body.
+ADDED_COLUMNS = {
+    "messages": {
+        "body_type": "TEXT",
+        "text": "TEXT",
+        "sanitized_body": "TEXT",
+        "added_seq": "INTEGER NOT NULL DEFAULT 0",
+        "changed_seq": "INTEGER NOT NULL DEFAULT 0",
+        "history": "INTEGER NOT NULL DEFAULT 0",
+        "model_version": "TEXT",
+    },
+    "mailbox_state": {
+        "exists_count": "INTEGER",
+        "change_seq": "INTEGER NOT NULL DEFAULT 0",
+        "delta_floor": "INTEGER NOT NULL DEFAULT 0",
+        "model_version": "TEXT",
+        "history_uid": "INTEGER",
+    },
+}
+
+# Characters of the classifier text returned as a preview with every message
+SNIPPET_LENGTH = 200
+
+# Removals remembered per user for delta syncs; older sync tokens get a full snapshot
+MAX_TOMBSTONES = 5000
+
+SUMMARY_COLUMNS = (
+    "uid, gmail_id, subject, sender, substr(coalesce(text, ''), 1, ?) AS snippet, category"
+)
+
+
+def _summary(row):
+    return {
+        "uid": row["uid"],
+        "gmail_id": row["gmail_id"],
+        "subject": row["subject"],
+        "from": row["sender"],
+        "snippet": row["snippet"],
+        "category": row["category"],
+    }
+
+
+class MessageStore:
+    """
+    Persistent per-user store of categorized messages and IMAP sync state.
+
+    For every user the store remembers the mailbox UIDVALIDITY and the highest UID
+    seen so far, so a refresh only has to fetch and classify ``UID last_uid+1:*``.
+    A new connection is opened per operation, which keeps the store safe to share
+    between Flask request threads.
+
+    Bodies are kept as fetched (unsanitized); the sanitized display HTML is only
+    rendered when a message is opened and cached in ``sanitized_body``.
+
+    Every change to a user's messages (added, recategorized, removed) is stamped
+    with the next value of the user's ``change_seq``, and removals leave a
+    tombstone, so ``changes_since`` can answer "what changed after seq N" for
+    clients that already hold a snapshot.
+
+    Messages older than the synced window, filled in by the history backfill, are
+    flagged ``history``: they can be paged through but are not part of the snapshot
+    and deltas sent to clients.
+
+    Every message records the ``model_version`` its category comes from, so after a
+    model or backend change only the stale messages are recategorized, and not all
+    at once (see ``classifier_inputs``).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._ready = False
+        self._setup_lock = threading.Lock()
+
+    def _setup(self):
+        # The file is created on first use, not when the store is constructed
+        with self._setup_lock:
+            if self._ready:
+                return
+            with closing(self._open()) as conn, conn:
+                conn.executescript(SCHEMA)
+                for table, added in ADDED_COLUMNS.items():
+                    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                    for name, column_type in added.items():
+                        if name not in columns:
+                            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                            if (table, name) == ("messages", "model_version"):
+                                # Until now the whole mailbox was recategorized at once
+                                conn.execute(
+                                    "UPDATE messages SET model_version = (SELECT model_version FROM mailbox_state "
+                                    "WHERE mailbox_state.user = messages.user)"
+                                )
+            self._ready = True
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _connect(self):
+        if not self._ready:
+            self._setup()
+        return self._open()
+
+    def get_sync_state(self, user):
+        """
+        Returns:
+            tuple: ``(uidvalidity, last_uid)`` for the user, or None if never synced.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT uidvalidity, last_uid FROM mailbox_state WHERE user = ?", (user,)
+            ).fetchone()
+        return (row["uidvalidity"], row["last_uid"]) if row else None
+
+    def get_mailbox_state(self, user):
+        """
+        Returns:
+            dict: ``uidvalidity``, ``last_uid``, ``exists`` (message count at the last
+            sync), ``change_seq``, ``delta_floor`` (oldest seq deltas can start from)
+            ``model_version`` and ``history_uid`` (the backfill has walked every UID from
+            there up; None before it starts) of the user, or None if never synced.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM mailbox_state WHERE user = ?", (user,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "uidvalidity": row["uidvalidity"],
+            "last_uid": row["last_uid"],
+            "exists": row["exists_count"],
+            "change_seq": row["change_seq"],
+            "delta_floor": row["delta_floor"],
+            "model_version": row["model_version"],
+            "history_uid": row["history_uid"],
+        }
+
+    def reset_mailbox(self, user, uidvalidity):
+        """
+        Forget every cached message of the user and start over with a new UIDVALIDITY.
+
+        The change sequence keeps counting, but deltas can no longer start before the
+        reset.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM messages WHERE user = ?", (user,))
+            conn.execute("DELETE FROM removed_messages WHERE user = ?", (user,))
+            conn.execute(
+                "INSERT INTO mailbox_state (user, uidvalidity) VALUES (?, ?) "
+                "ON CONFLICT (user) DO UPDATE SET uidvalidity = excluded.uidvalidity, last_uid = 0, "
+                "exists_count = NULL, model_version = NULL, history_uid = NULL, delta_floor = change_seq",
+                (user, uidvalidity),
+            )
+
+    def update_mailbox_state(self, user, exists=None, model_version=None, history_uid=None, last_uid=None):
+        """
+        Record the mailbox message count, the model the cached categories come from,
+        how far the history backfill got and/or a highest seen UID (it never decreases).
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE mailbox_state SET exists_count = coalesce(?, exists_count), "
+                "model_version = coalesce(?, model_version), history_uid = coalesce(?, history_uid), "
+                "last_uid = MAX(last_uid, coalesce(?, 0)) "
+                "WHERE user = ?",
+                (exists, model_version, history_uid, last_uid, user),
+            )
+
+    def _next_seq(self, conn, user):
+        conn.execute("UPDATE mailbox_state SET change_seq = change_seq + 1 WHERE user = ?", (user,))
+        return conn.execute("SELECT change_seq FROM mailbox_state WHERE user = ?", (user,)).fetchone()[0]
+
+    def save_messages(self, user, messages, history=False, model_version=None):
+        """
+        Insert categorized messages and advance the user's highest seen UID.
+
+        Args:
+            user (str): The user's email address.
+            messages (list): Dicts with the keys uid, gmail_id, subject, from, body,
+                body_type, text, category.
+            history (bool): The messages were backfilled from before the synced window.
+            model_version (str, optional): The model the categories come from.
+        """
+        if not messages:
+            return
+        with closing(self._connect()) as conn, conn:
+            seq = 0 if history else self._next_seq(conn, user)
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages "
+                "(user, uid, gmail_id, subject, sender, body, body_type, text, category, "
+                "added_seq, changed_seq, history, model_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user, m["uid"], m["gmail_id"], m["subject"], m["from"], m["body"],
+                     m["body_type"], m["text"], m["category"], seq, seq, int(history), model_version)
+                    for m in messages
+                ],
+            )
+            conn.execute(
+                "UPDATE mailbox_state SET last_uid = MAX(last_uid, ?) WHERE user = ?",
+                (max(m["uid"] for m in messages), user),
+            )
+
+    def remove_messages(self, user, uids):
+        """
+        Drop messages that were expunged from the mailbox, leaving tombstones for deltas.
+        """
+        if not uids:
+            return
+        with closing(self._connect()) as conn, conn:
+            seq = self._next_seq(conn, user)
+            for uid in uids:
+                conn.execute(
+                    "INSERT INTO removed_messages (user, uid, gmail_id, removed_seq) "
+                    "SELECT user, uid, gmail_id, ? FROM messages WHERE user = ? AND uid = ?",
+                    (seq, user, uid),
+                )
+                conn.execute("DELETE FROM messages WHERE user = ? AND uid = ?", (user, uid))
+
+            # Keep the newest MAX_TOMBSTONES; tokens older than what was pruned get a snapshot
+            cutoff = conn.execute(
+                "SELECT removed_seq FROM removed_messages WHERE user = ? "
+                "ORDER BY removed_seq DESC LIMIT 1 OFFSET ?",
+                (user, MAX_TOMBSTONES),
+            ).fetchone()
+            if cutoff is not None:
+                conn.execute(
+                    "DELETE FROM removed_messages WHERE user = ? AND removed_seq <= ?", (user, cutoff[0])
+                )
+                conn.execute(
+                    "UPDATE mailbox_state SET delta_floor = MAX(delta_floor, ?) WHERE user = ?",
+                    (cutoff[0], user),
+                )
+
+    def recategorize(self, user, categories, model_version):
+        """
+        Store new categories for cached messages; only messages whose category actually
+        changed are stamped with a new seq.
+
+        Args:
+            categories (dict): uid -> category.
+            model_version (str): The model the categories come from.
+        """
+        with closing(self._connect()) as conn, conn:
+            seq = conn.execute(
+                "SELECT change_seq FROM mailbox_state WHERE user = ?", (user,)
+            ).fetchone()[0] + 1
+            changed = 0
+            for uid, category in categories.items():
+                changed += conn.execute(
+                    "UPDATE messages SET category = ?, changed_seq = ? "
+                    "WHERE user = ? AND uid = ? AND category IS NOT ?",
+                    (category, seq, user, uid, category),
+                ).rowcount
+            conn.executemany(
+                "UPDATE messages SET model_version = ? WHERE user = ? AND uid = ?",
+                [(model_version, user, uid) for uid in categories],
+            )
+            if changed:
+                conn.execute("UPDATE mailbox_state SET change_seq = ? WHERE user = ?", (seq, user))
+
+    def classifier_inputs(self, user, stale_for, newest=None, limit=None):
+        """
+        Args:
+            stale_for (str): Only messages whose category does not come from this model version.
+            newest (int, optional): Only look at the ``newest`` most recent cached messages.
+            limit (int, optional): At most this many messages, newest first.
+
+        Returns:
+            list: ``(uid, subject, text, body, body_type)`` of the matching messages.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT uid, subject, text, body, body_type FROM "
+                "(SELECT * FROM messages WHERE user = ? ORDER BY uid DESC LIMIT ?) "
+                "WHERE model_version IS NOT ? ORDER BY uid DESC LIMIT ?",
+                (user, -1 if newest is None else newest, stale_for, -1 if limit is None else limit),
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def cached_uids(self, user, limit=None):
+        """
+        Returns:
+            list: UIDs of the user's ``limit`` most recent cached messages (all if None), ascending.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT uid FROM messages WHERE user = ? ORDER BY uid DESC LIMIT ?",
+                (user, -1 if limit is None else limit),
+            ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def recent_messages(self, user, limit=100, history=True):
+        """
+        Returns:
+            list: The user's ``limit`` most recent cached messages (all if None), oldest
+            first, with a text ``snippet`` instead of the body. ``history=False`` leaves
+            out backfilled messages.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM messages WHERE user = ? AND history <= ? "
+                "ORDER BY uid DESC LIMIT ?",
+                (SNIPPET_LENGTH, user, int(history), -1 if limit is None else limit),
+            ).fetchall()
+        return [_summary(row) for row in reversed(rows)]
+
+    def page_messages(self, user, before_uid=None, limit=50):
+        """
+        Returns:
+            list: Up to ``limit`` cached messages (history included) with a UID below
+            ``before_uid`` (or the newest ones), newest first.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM messages WHERE user = ? AND uid < ? "
+                "ORDER BY uid DESC LIMIT ?",
+                (SNIPPET_LENGTH, user, 2 ** 63 - 1 if before_uid is None else before_uid, limit),
+            ).fetchall()
+        return [_summary(row) for row in rows]
+
+    def changes_since(self, user, seq):
+        """
+        Messages added, recategorized and removed after change ``seq``.
+
+        Returns:
+            dict: ``added`` and ``recategorized`` (message summaries, oldest first) and
+            ``removed`` (gmail_ids), or None if ``seq`` is too old or from the future and
+            the caller needs a full snapshot.
+        """
+        with closing(self._connect()) as conn:
+            state = conn.execute(
+                "SELECT change_seq, delta_floor FROM mailbox_state WHERE user = ?", (user,)
+            ).fetchone()
+            if state is None or not state["delta_floor"] <= seq <= state["change_seq"]:
+                return None
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS}, added_seq FROM messages "
+                "WHERE user = ? AND changed_seq > ? AND history = 0 ORDER BY uid",
+                (SNIPPET_LENGTH, user, seq),
+            ).fetchall()
+            removed = conn.execute(
+                "SELECT gmail_id FROM removed_messages WHERE user = ? AND removed_seq > ? ORDER BY removed_seq",
+                (user, seq),
+            ).fetchall()
+        return {
+            "added": [_summary(row) for row in rows if row["added_seq"] > seq],
+            "recategorized": [_summary(row) for row in rows if row["added_seq"] <= seq],
+            "removed": [row["gmail_id"] for row in removed],
+        }
+
+    def find_uid(self, user, gmail_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT uid FROM messages WHERE user = ? AND gmail_id = ?", (user, gmail_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_message_body(self, user, uid):
+        """
+        Returns:
+            dict: ``body``, ``body_type`` and ``sanitized_body`` (None until first rendered)
+            of one message, or None if it is not cached.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT body, body_type, sanitized_body FROM messages WHERE user = ? AND uid = ?",
+                (user, uid),
+            ).fetchone()
+        if row is None:
+            return None
+        sanitized_body = row["sanitized_body"]
+        if row["body_type"] is None:
+            sanitized_body = row["body"]  # stored before bodies were sanitized lazily
+        return {"body": row["body"], "body_type": row["body_type"], "sanitized_body": sanitized_body}
+
+    def save_sanitized_body(self, user, uid, sanitized_body):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE messages SET sanitized_body = ? WHERE user = ? AND uid = ?",
+                (sanitized_body, user, uid),
+            )
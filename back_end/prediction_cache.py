@@ -0,0 +1,193 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    namespace TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    version TEXT NOT NULL,
+    category TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, digest)
+);
+"""
+
+# Rows per SELECT ... IN (...), below SQLite's default host parameter limit
+_SQL_CHUNK = 500
+
+
+def content_digest(key):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predicted categories, keyed by a hash of the model input.
+
+    Entries live in a namespace (one per backend) and belong to one model version,
+    the signature of the loaded artifact; when a namespace is used with a new
+    version, its entries are dropped, so a retrained model never serves stale
+    predictions. Entries also expire after ``ttl`` seconds.
+
+    With a ``path``, entries are written through to SQLite and survive restarts,
+    and lookups that miss in memory are answered from disk. Disk rows are pruned
+    when the model version changes and, once expired, when the cache is opened.
+
+    Args:
+        max_entries (int): Entries kept in memory (0 disables the cache).
+        ttl (float): Seconds an entry stays valid.
+        path (str, optional): SQLite file to persist entries to.
+    """
+
+    def __init__(self, max_entries=50_000, ttl=7 * 24 * 3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # (namespace, digest) -> (category, expires_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._ready = False
+        self._setup_lock = threading.Lock()
+
+    def _setup(self):
+        # The file is created on first use, not when the cache is constructed
+        with self._setup_lock:
+            if self._ready:
+                return
+            with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+                conn.executescript(SCHEMA)
+                conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+            self._ready = True
+
+    def _connect(self):
+        if not self._ready:
+            self._setup()
+        return sqlite3.connect(self.path, timeout=30)
+
+    def predict(self, namespace, version, keys, inputs, predict):
+        """
+        Categories for ``inputs``, calling ``predict`` only for keys not cached yet.
+
+        Args:
+            namespace (str): Cache namespace, e.g. the backend name.
+            version (str): Version of the model behind ``predict``.
+            keys (list): Cache key per input (texts that predict identically share a key).
+            inputs (list): Model inputs.
+            predict (callable): ``predict(list_of_inputs)`` -> categories, for the misses.
+
+        Returns:
+            list: One category per input.
+        """
+        if not self.max_entries:
+            with self._lock:
+                self._counts["misses"] += len(inputs)
+            return list(predict(inputs))
+
+        digests = [content_digest(key) for key in keys]
+        self._use_version(namespace, version)
+        found = self._lookup(namespace, version, set(digests))
+
+        # Duplicates within the batch are predicted once
+        missing = {}
+        for index, digest in enumerate(digests):
+            if digest not in found and digest not in missing:
+                missing[digest] = index
+        if missing:
+            categories = predict([inputs[index] for index in missing.values()])
+            new = dict(zip(missing, (str(category) for category in categories)))
+            self._store(namespace, version, new)
+            found.update(new)
+
+        with self._lock:
+            self._counts["misses"] += len(missing)
+            self._counts["hits"] += len(digests) - len(missing)
+        return [found[digest] for digest in digests]
+
+    def _use_version(self, namespace, version):
+        with self._lock:
+            current = self._versions.get(namespace)
+            self._versions[namespace] = version
+            if current is None or current == version:
+                return
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+            self._counts["invalidations"] += 1
+        if self.path:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM predictions WHERE namespace = ? AND version != ?", (namespace, version))
+
+    def _lookup(self, namespace, version, digests):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for digest in digests:
+                entry = self._entries.get((namespace, digest))
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[(namespace, digest)]
+                    continue
+                self._entries.move_to_end((namespace, digest))
+                found[digest] = entry[0]
+
+        missing = [digest for digest in digests if digest not in found]
+        if self.path and missing:
+            rows = []
+            with closing(self._connect()) as conn:
+                for start in range(0, len(missing), _SQL_CHUNK):
+                    chunk = missing[start:start + _SQL_CHUNK]
+                    rows += conn.execute(
+                        "SELECT digest, category, expires_at FROM predictions "
+                        f"WHERE namespace = ? AND version = ? AND expires_at > ? AND digest IN ({','.join('?' * len(chunk))})",
+                        (namespace, version, now, *chunk),
+                    ).fetchall()
+            with self._lock:
+                self._counts["disk_hits"] += len(rows)
+                for digest, category, expires_at in rows:
+                    self._put((namespace, digest), category, expires_at)
+                    found[digest] = category
+        return found
+
+    def _store(self, namespace, version, categories):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for digest, category in categories.items():
+                self._put((namespace, digest), category, expires_at)
+        if self.path:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO predictions (namespace, digest, version, category, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(namespace, digest, version, category, expires_at) for digest, category in categories.items()],
+                )
+
+    def _put(self, key, category, expires_at):
+        self._entries[key] = (category, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return dict(
+                self._counts,
+                entries=len(self._entries),
+                hit_rate=self._counts["hits"] / lookups if lookups else None,
+            )
+
+
+def combine_stats(stats):
+    """
+    Add up the ``stats()`` of several caches, e.g. one per process.
+    """
+    totals = {key: sum(s[key] for s in stats) for key in
+              ("hits", "disk_hits", "misses", "evictions", "invalidations", "entries")}
+    lookups = totals["hits"] + totals["misses"]
+    return dict(totals, hit_rate=totals["hits"] / lookups if lookups else None)
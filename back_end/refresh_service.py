@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RefreshService:
+    """
+    Runs mailbox refreshes off the request thread, many mailboxes at once.
+
+    IMAP work is I/O-bound, so refreshes run on a wide thread pool (``max_workers``)
+    and a slow mailbox only occupies one of its threads. CPU-bound work (MIME parsing,
+    HTML sanitizing) is handed to a small separate pool so it overlaps with the
+    network I/O of the same and other refreshes. Concurrent refreshes with the same
+    key (e.g. a user double-clicking refresh) share one run instead of queueing.
+
+    Args:
+        max_workers (int): Refreshes running concurrently.
+        cpu_workers (int): Threads for parsing work submitted through ``cpu_pool``.
+    """
+
+    def __init__(self, max_workers=32, cpu_workers=2):
+        self.io_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self.cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="parse")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._counts = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Run ``fn(*args, **kwargs)`` on the pool, or join the run already in flight for ``key``.
+
+        Returns:
+            concurrent.futures.Future: The (possibly shared) result of the refresh.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None and not future.done():
+                self._counts["coalesced"] += 1
+                return future
+            future = self.io_pool.submit(fn, *args, **kwargs)
+            self._in_flight[key] = future
+            self._counts["submitted"] += 1
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            failed = future.cancelled() or future.exception() is not None
+            self._counts["failed" if failed else "completed"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, in_flight=len(self._in_flight))
+
+    def shutdown(self, wait=True):
+        self.io_pool.shutdown(wait=wait)
+        self.cpu_pool.shutdown(wait=wait)
@@ -1,17 +1,28 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import imaplib
-import email
-from email.header import decode_header
 import os
-import pickle
+import sys
 from dotenv import load_dotenv
-from config import EMAIL
-from bs4 import BeautifulSoup
+from config import EMAIL, JOB_QUEUE_PATH, MESSAGE_STORE_PATH
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from imap_fetch import FETCH_BATCH_SIZE, iter_partial_batches
+from imap_idle import MailboxWatcher
+from imap_pool import ImapConnectionPool
+from job_queue import WorkerPool
+from backfill import BackfillService
+from message_store import SNIPPET_LENGTH, MessageStore
+from prediction_cache import combine_stats
+from refresh_service import RefreshService
+from text_extract import extract_text
 import bleach
+from html import escape
 import re
 import base64
 import json
+import datetime
+import queue
+import time
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))  # ✅ Moved here before usage
 
@@ -41,21 +52,47 @@ def get_decoded_password(email):
 registered_users = set()
 load_dotenv()
 
+IMAP_HOST = "imap.gmail.com"
+store = MessageStore(MESSAGE_STORE_PATH)
+
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
-MODEL_PATH = os.path.join(PROJECT_ROOT, "machine_learning", "models", "svm.pkl")
-VECTORIZER_PATH = os.path.join(PROJECT_ROOT, "machine_learning", "models", "tfidf_vectorizer.pkl")
+sys.path.append(PROJECT_ROOT)  # for utils, model_registry and the machine_learning package
+from model_registry import registry
+from utils import load_config
+import categorize
+from categorize import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DISTILBERT_MODEL_NAME,
+    JOB_HANDLERS,
+    PIPELINE_NAME,
+    SERVED_MODELS,
+    categorize_batch,
+    warm_up,
+)
+
+CONFIG = load_config()
 
-# Load trained model and vectorizer
-with open(MODEL_PATH, 'rb') as model_file:
-    model = pickle.load(model_file)
-with open(VECTORIZER_PATH, 'rb') as vectorizer_file:
-    vectorizer = pickle.load(vectorizer_file)
+# Number of most recent messages categorized and returned per refresh
+FETCH_WINDOW = CONFIG["serving"]["fetch_window"]
+# SEARCH SINCE bound of syncs and the history backfill (0 or None: unbounded)
+HISTORY_DAYS = CONFIG["serving"]["history_days"]
+PAGE_SIZE = CONFIG["serving"]["page_size"]
+MAX_PAGE_SIZE = 10 * PAGE_SIZE
 
-def categorize_email(subject, body):
-    combined_text = f"{subject} {body}"
-    text_vectorized = vectorizer.transform([combined_text])
-    predicted_category = model.predict(text_vectorized)[0]
-    return predicted_category
+# IMAP refreshes run on a shared thread pool instead of the request thread
+REFRESH_TIMEOUT = CONFIG["serving"]["refresh_timeout"]
+# Seconds a refresh waits for one parse/classify job before giving up on it
+JOB_TIMEOUT = CONFIG["serving"]["job_timeout"]
+# Bytes of the displayed text part downloaded per message (attachments are never fetched)
+MAX_BODY_BYTES = CONFIG["serving"]["max_body_bytes"]
+# Streaming refreshes start with a small batch for a fast first result
+STREAM_FIRST_BATCH = CONFIG["serving"]["stream_first_batch"]
+STREAM_FORMATS = ("ndjson", "sse")
+refresh_service = RefreshService(
+    max_workers=CONFIG["serving"]["refresh_workers"],
+    cpu_workers=CONFIG["serving"]["parse_workers"],
+)
 
 def sanitize_html(html):
     html = re.sub(r'<(script|style)[^>]*>.*?</\1>', '', html, flags=re.DOTALL | re.IGNORECASE)
@@ -75,77 +112,523 @@ def sanitize_html(html):
     clean = re.sub(r'(\n\s*){3,}', '\n\n', clean)
     return clean
 
-@app.route('/update-emails')
-def update_emails():
+def render_body(body, body_type):
+    """
+    Display HTML for a stored body, sanitized only when an email is opened.
+    """
+    if body_type == "html":
+        return sanitize_html(body)
+    return escape(body).replace("\n", "<br>")
+
+# Parsing and classification run in worker processes once started (see __main__ below);
+# until then, and with serving.job_workers set to 0, on the refresh service's parse threads
+job_pool = WorkerPool(
+    JOB_QUEUE_PATH,
+    "classify_worker",
+    JOB_HANDLERS,
+    refresh_service.cpu_pool,
+    processes=CONFIG["serving"]["job_workers"],
+)
+
+def classify(batch, backend=None):
+    """
+    categorize_emails for large batches: FETCH_BATCH_SIZE chunks spread over the worker pool.
+    """
+    futures = [
+        job_pool.submit("categorize", (batch[start:start + FETCH_BATCH_SIZE], backend))
+        for start in range(0, len(batch), FETCH_BATCH_SIZE)
+    ]
+    return [category for future in futures for category in future.result(timeout=JOB_TIMEOUT)]
+
+def model_version(backend):
+    """
+    Identifies the model behind a backend's categories; changes when it is retrained.
+    """
+    name = DISTILBERT_MODEL_NAME if backend == "distilbert" else PIPELINE_NAME
+    return f"{backend}:{registry.get_versioned(name)[1]}"
+
+def served_backend(state):
+    """
+    Backend the user's cached categories come from (the last one a refresh used).
+    """
+    version = state["model_version"] if state else None
+    return version.partition(":")[0] if version else DEFAULT_BACKEND
+
+def recategorize_cached(user_email, backend, version, classify_batch=classify, **selection):
+    """
+    Re-run the classifier over cached messages whose category comes from another model.
+
+    ``selection`` (``newest``, ``limit``) picks which of them; see MessageStore.classifier_inputs.
+
+    Returns:
+        int: Messages recategorized.
+    """
+    inputs = store.classifier_inputs(user_email, stale_for=version, **selection)
+    if not inputs:
+        return 0
+    # Rows cached before the text column existed only have their (sanitized) body
+    batch = [(subject, text if text is not None else extract_text(body or ""))
+             for uid, subject, text, body, body_type in inputs]
+    categories = classify_batch(batch, backend=backend)
+    store.recategorize(user_email, {row[0]: category for row, category in zip(inputs, categories)}, version)
+    return len(inputs)
+
+IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def since_criterion():
+    # IMAP dates are day-month-year with English month names, whatever the locale
+    if not HISTORY_DAYS:
+        return None
+    day = datetime.date.today() - datetime.timedelta(days=HISTORY_DAYS)
+    return f"SINCE {day.day}-{IMAP_MONTHS[day.month - 1]}-{day.year}"
+
+def search_criteria(criteria):
+    since = since_criterion()
+    return f"{since} {criteria}" if since else criteria
+
+def sync_mailbox(mail, user_email, backend=None, on_messages=None, first_batch=FETCH_BATCH_SIZE):
+    """
+    Fetch and categorize only the messages that arrived since the last sync.
+
+    The first sync (or a UIDVALIDITY change) fetches the last FETCH_WINDOW messages,
+    found with a sequence-range SEARCH (bounded by HISTORY_DAYS) instead of listing
+    every UID in the mailbox; older mail is left to the history backfill. The UIDNEXT
+    reported then is where later syncs resume, even when that window was empty.
+    Later syncs skip IMAP entirely while UIDNEXT and the message count are unchanged;
+    otherwise one ``UID SEARCH`` from the oldest UID of the cached window finds both
+    new messages and expunged ones, which are dropped from the store.
+    New messages are categorized by ``backend`` (default: serving.backend in config.yaml);
+    if that model differs from the one the cache was categorized with, the cached
+    messages of the window are recategorized first. Older ones are left to the
+    history backfill, so a model switch costs a refresh at most FETCH_WINDOW predictions.
+
+    New messages are parsed and categorized one fetched batch at a time on the worker
+    pool, and saved while the next batch is being fetched. Batches start at ``first_batch`` messages and
+    double up to FETCH_BATCH_SIZE, so a small first batch gives an early first result
+    without paying a FETCH round trip per few messages. With ``on_messages``,
+    the refreshed window is also reported as it becomes ready: first the cached
+    messages that stay in it, then every new batch once it is categorized.
+    """
+    backend = backend or DEFAULT_BACKEND
+    status, data = mail.select("inbox")
+    exists = int(data[0])
+    uidvalidity = int(mail.response("UIDVALIDITY")[1][0])
+    uidnext = mail.response("UIDNEXT")[1][0]
+    version = model_version(backend)
+
+    state = store.get_mailbox_state(user_email)
+    if state is None or state["uidvalidity"] != uidvalidity:
+        store.reset_mailbox(user_email, uidvalidity)
+        new_uids = []
+        if exists:
+            status, data = mail.uid("SEARCH", None, search_criteria(f"{max(exists - FETCH_WINDOW + 1, 1)}:*"))
+            new_uids = data[0].split()[-FETCH_WINDOW:]
+    else:
+        last_uid = state["last_uid"]
+        cached = store.cached_uids(user_email, limit=FETCH_WINDOW)
+        if uidnext is not None and int(uidnext) <= last_uid + 1 and exists == state["exists"]:
+            new_uids = []  # nothing arrived and nothing was expunged since the last sync
+        else:
+            # Nothing cached yet: stay within HISTORY_DAYS, as the first sync did
+            criteria = f"UID {cached[0]}:*" if cached else search_criteria(f"UID {last_uid + 1}:*")
+            status, data = mail.uid("SEARCH", None, criteria)
+            present = {int(uid) for uid in data[0].split()}
+            store.remove_messages(user_email, [uid for uid in cached if uid not in present])
+            new_uids = [str(uid).encode() for uid in sorted(present) if uid > last_uid]
+
+        if state["model_version"] != version:
+            recategorize_cached(user_email, backend, version, newest=FETCH_WINDOW)
+
+    if on_messages is not None:
+        on_messages(store.recent_messages(user_email, limit=max(FETCH_WINDOW - len(new_uids), 0)))
+    # New messages older than the window's last FETCH_WINDOW are saved but not reported
+    unreported = max(len(new_uids) - FETCH_WINDOW, 0)
+
+    def save_batch(new_messages):
+        nonlocal unreported
+        store.save_messages(user_email, new_messages, model_version=version)
+        if on_messages is not None:
+            reported = [summarize(m) for m in new_messages[unreported:]]
+            unreported = max(unreported - len(new_messages), 0)
+            on_messages(reported)
+
+    # Parse and categorize each batch on the worker pool while the next batch is being
+    # fetched, and save the previous one meanwhile
+    pending = None
+    for chunk in growing_chunks(new_uids, first_batch, FETCH_BATCH_SIZE):
+        for batch in iter_partial_batches(mail, chunk, max_body_bytes=MAX_BODY_BYTES, batch_size=len(chunk)):
+            parsed = job_pool.submit("categorize_batch", (batch, backend))
+            if pending is not None:
+                save_batch(pending.result(timeout=JOB_TIMEOUT))
+            pending = parsed
+    if pending is not None:
+        save_batch(pending.result(timeout=JOB_TIMEOUT))
+    store.update_mailbox_state(
+        user_email, exists=exists, model_version=version,
+        last_uid=int(uidnext) - 1 if uidnext is not None else None,
+    )
+
+    return store.recent_messages(user_email, limit=FETCH_WINDOW)
+
+def backfill_step(mail, user_email, limit, backend=None):
+    """
+    Recategorize up to ``limit`` cached messages left behind by a model change, or
+    once none are left, categorize up to ``limit`` messages older than everything
+    stored, newest first. Both use the backend of the user's last refresh.
+
+    Walks UID ranges downwards from where the previous step stopped (``history_uid``),
+    doubling the range while it comes back empty, so sparse UIDs cost a few SEARCHes
+    and the full UID list is never requested. Messages older than HISTORY_DAYS are
+    skipped. Runs on the backfill service's own connection and threads: batches are
+    parsed and classified in place, so backfills never take a slot of ``job_pool`` (and
+    through it of the refresh CPU pool) away from interactive syncs.
+
+    Returns:
+        int: Messages recategorized or backfilled; 0 once the history is complete (or
+        the mailbox changed UIDVALIDITY, which the next refresh resets).
+    """
+    mail.select("inbox", readonly=True)
+    uidvalidity = int(mail.response("UIDVALIDITY")[1][0])
+    state = store.get_mailbox_state(user_email)
+    if state is None or state["uidvalidity"] != uidvalidity:
+        return 0
+    backend = backend or served_backend(state)
+    version = model_version(backend)
+    recategorized = recategorize_cached(user_email, backend, version, classify_batch=categorize.categorize_emails, limit=limit)
+    if recategorized:
+        return recategorized
+
+    cursor = state["history_uid"]
+    if cursor is None:
+        cached = store.cached_uids(user_email)
+        cursor = cached[0] if cached else state["last_uid"] + 1
+    span, uids = limit, []
+    while not uids and cursor > 1:
+        low = max(cursor - span, 1)
+        status, data = mail.uid("SEARCH", None, search_criteria(f"UID {low}:{cursor - 1}"))
+        found = sorted(uid for uid in map(int, data[0].split()) if uid < cursor)
+        uids = found[-limit:]
+        cursor = uids[0] if len(found) > limit else low
+        span *= 2
+
+    if uids:
+        parsed = [
+            categorize_batch(batch, backend)
+            for batch in iter_partial_batches(mail, uids, max_body_bytes=MAX_BODY_BYTES)
+        ]
+        store.save_messages(
+            user_email, [m for messages in parsed for m in messages], history=True, model_version=version
+        )
+    store.update_mailbox_state(user_email, history_uid=cursor)
+    return len(uids)
+
+def growing_chunks(items, first, largest):
+    """
+    Split ``items`` into chunks of ``first``, ``2 * first``, ... items, at most ``largest``.
+    """
+    start, size = 0, max(1, min(first, largest))
+    while start < len(items):
+        yield items[start:start + size]
+        start += size
+        size = min(size * 2, largest)
+
+def summarize(message):
+    # A freshly categorized message as the endpoints list it (no body)
+    return {
+        "uid": message["uid"],
+        "gmail_id": message["gmail_id"],
+        "subject": message["subject"],
+        "from": message["from"],
+        "snippet": message["text"][:SNIPPET_LENGTH],
+        "category": message["category"],
+    }
+
+def connect_imap(user_email, app_password):
+    mail = imaplib.IMAP4_SSL(IMAP_HOST)
+    mail.login(user_email, app_password)
+    return mail
+
+# Authenticated sessions are kept open per user between refreshes
+imap_pool = ImapConnectionPool(
+    connect_imap,
+    max_idle=CONFIG["serving"]["imap_max_idle"],
+    health_check_interval=CONFIG["serving"]["imap_health_check_interval"],
+)
+
+def refresh_mailbox(user_email, app_password, backend=None, **sync_options):
+    """
+    Sync the inbox on the user's pooled IMAP session. Runs on the refresh service's thread pool.
+    """
+    with imap_pool.connection(user_email, app_password) as mail:
+        messages = sync_mailbox(mail, user_email, backend=backend, **sync_options)
+    start_backfill(user_email, app_password)
+    return messages
+
+# Older mail is categorized in the background, on separate sessions and threads,
+# and only while no interactive refresh is running
+HISTORY_BACKFILL = CONFIG["serving"]["history_backfill"]
+backfill_service = BackfillService(
+    connect_imap,
+    backfill_step,
+    chunk_size=CONFIG["serving"]["backfill_chunk"],
+    rate=CONFIG["serving"]["backfill_rate"],
+    max_workers=CONFIG["serving"]["backfill_workers"],
+    busy=lambda: refresh_service.stats()["in_flight"] > 0,
+)
+
+def history_complete(state):
+    return state is not None and state["history_uid"] is not None and state["history_uid"] <= 1
+
+def start_backfill(user_email, app_password):
+    # Also started to recategorize what a model change left behind the window
+    if not HISTORY_BACKFILL:
+        return
+    state = store.get_mailbox_state(user_email)
+    if not history_complete(state) or store.classifier_inputs(user_email, stale_for=state["model_version"], limit=1):
+        backfill_service.start(user_email, app_password)
+
+def on_new_mail(user_email, app_password):
+    # Pushed by IDLE: classify new mail now so the next poll finds it in the store
+    refresh_service.submit((user_email, DEFAULT_BACKEND), refresh_mailbox, user_email, app_password, DEFAULT_BACKEND)
+
+IMAP_IDLE = CONFIG["serving"]["imap_idle"]
+mailbox_watcher = MailboxWatcher(connect_imap, on_new_mail)
+
+def refresh_request_args():
+    """
+    Validate the ``email`` and ``model`` query parameters of a refresh.
+
+    Returns:
+        tuple: ``((user_email, app_password, backend), None)``, or ``(None, error_response)``.
+    """
     user_email = request.args.get("email")
     if not user_email:
-        return jsonify({"error": "Missing user email"}), 400
+        return None, (jsonify({"error": "Missing user email"}), 400)
+    backend = request.args.get("model", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        return None, (jsonify({"error": f"Unknown model '{backend}', expected one of {list(BACKENDS)}"}), 400)
 
     try:
         app_password = get_decoded_password(user_email)
     except Exception as e:
-        return jsonify({"error": str(e)}), 401
+        return None, (jsonify({"error": str(e)}), 401)
+    return (user_email, app_password, backend), None
 
-    mail = imaplib.IMAP4_SSL("imap.gmail.com")
-    mail.login(user_email, app_password)
-    mail.select("inbox")
+def run_refresh(user_email, app_password, backend):
+    """
+    Refresh the mailbox on the shared pool, waiting at most REFRESH_TIMEOUT.
 
-    status, messages = mail.search(None, "ALL")
-    email_ids = messages[0].split()[-100:]
+    Returns:
+        list: The recent messages after the refresh, or None if it is still running
+        (it keeps running and lands in the store).
+    """
+    if IMAP_IDLE:
+        mailbox_watcher.watch(user_email, app_password)
+
+    # Concurrent refreshes of the same mailbox share one IMAP session
+    future = refresh_service.submit((user_email, backend), refresh_mailbox, user_email, app_password, backend)
+    try:
+        return future.result(timeout=REFRESH_TIMEOUT)
+    except FutureTimeoutError:
+        return None
+
+def stream_refresh(user_email, app_password, backend):
+    """
+    Refresh the mailbox and yield the window's messages as soon as each is categorized.
+
+    Yields:
+        tuple: ``("email", summary)`` per message, then ``("done", info)`` with the
+        number of messages sent, the sync token and whether the refresh timed out.
+    """
+    if IMAP_IDLE:
+        mailbox_watcher.watch(user_email, app_password)
+
+    feed = queue.Queue()
+    future = refresh_service.submit(
+        (user_email, backend), refresh_mailbox, user_email, app_password, backend,
+        on_messages=feed.put, first_batch=STREAM_FIRST_BATCH,
+    )
+    future.add_done_callback(lambda done: feed.put(None))
+
+    sent, reported, timed_out = 0, False, False
+    while True:
+        try:
+            messages = feed.get(timeout=REFRESH_TIMEOUT)
+        except queue.Empty:
+            timed_out = True  # the refresh keeps running and lands in the store
+            break
+        if messages is None:
+            break
+        reported = True
+        for message in messages:
+            sent += 1
+            yield "email", message
+
+    if not timed_out and future.exception() is not None:
+        yield "error", {"error": str(future.exception())}
+        return
+    if not reported:
+        # Joined a refresh already in flight, or timed out: send what is stored
+        for message in store.recent_messages(user_email, limit=FETCH_WINDOW):
+            sent += 1
+            yield "email", message
+
+    state = store.get_mailbox_state(user_email)
+    token = f"{state['uidvalidity']}.{state['change_seq']}" if state and not timed_out else None
+    yield "done", {"count": sent, "token": token, "timed_out": timed_out}
+
+def format_event(stream_format, event, data):
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+@app.route('/update-emails')
+def update_emails():
+    """
+    Categorized window of the user's most recent messages, grouped by category.
+
+    With ``stream=ndjson`` or ``stream=sse`` nothing is grouped or buffered: every
+    message is sent as an ``email`` event as soon as it is categorized (cached ones
+    first), followed by one ``done`` event.
+    """
+    stream_format = request.args.get("stream")
+    if stream_format is not None and stream_format not in STREAM_FORMATS:
+        return jsonify({"error": f"Unknown stream format '{stream_format}', expected one of {list(STREAM_FORMATS)}"}), 400
+    args, error = refresh_request_args()
+    if error:
+        return error
+    user_email = args[0]
+
+    if stream_format is not None:
+        events = (format_event(stream_format, event, data) for event, data in stream_refresh(*args))
+        mimetype = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+        return Response(events, mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    messages = run_refresh(*args)
+    if messages is None:
+        # Answer from the cache
+        messages = store.recent_messages(user_email, limit=FETCH_WINDOW)
 
     categorized_emails = {}
+    for message in messages:
+        categorized_emails.setdefault(message["category"], []).append(message)
 
-    for email_id in email_ids:
-        status, data = mail.fetch(email_id, "(RFC822 X-GM-MSGID)")
-        msg = email.message_from_bytes(data[0][1])
-
-        gm_msg_id = None
-        for part in data:
-            if isinstance(part, tuple):
-                raw_header = part[0].decode(errors="ignore")
-                match = re.search(r'X-GM-MSGID (\d+)', raw_header)
-                if match:
-                    gm_msg_id = match.group(1)
-
-        subject, encoding = decode_header(msg["Subject"])[0]
-        if isinstance(subject, bytes):
-            subject = subject.decode(encoding or "utf-8")
-        from_ = msg.get("From")
-
-        body = "Unable to Read Body"
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                if content_type == "text/html" and "attachment" not in content_disposition:
-                    raw_html = part.get_payload(decode=True).decode(errors="ignore")
-                    body = sanitize_html(raw_html)
-                    break
-                elif content_type == "text/plain" and not body:
-                    body = part.get_payload(decode=True).decode(errors="ignore")
-        else:
-            content_type = msg.get_content_type()
-            if content_type == "text/html":
-                raw_html = msg.get_payload(decode=True).decode(errors="ignore")
-                body = sanitize_html(raw_html)
-            elif content_type == "text/plain":
-                body = msg.get_payload(decode=True).decode(errors="ignore")
-
-        category = categorize_email(subject, body)
-        if category not in categorized_emails:
-            categorized_emails[category] = []
-
-        categorized_emails[category].append({
-            "subject": subject,
-            "from": from_,
-            "category": category,
-            "body": body,
-            "gmail_id": gm_msg_id
-        })
-
-    mail.logout()
     return jsonify(categorized_emails)
 
+@app.route('/sync')
+def sync():
+    """
+    Delta refresh for clients that keep a copy of the categorized inbox.
+
+    ``token`` is the token of the client's last sync. The response lists only the
+    messages added, recategorized and removed (as gmail_ids) since then, plus the new
+    token. Without a usable token (first sync, UIDVALIDITY change, token older than
+    the kept tombstones) ``reset`` is true and ``added`` holds every synced message
+    (backfilled history is left to /emails), which replaces the client's copy. Bodies are never included; see /email-body.
+    """
+    args, error = refresh_request_args()
+    if error:
+        return error
+    user_email = args[0]
+
+    run_refresh(*args)  # on timeout the delta covers what is stored so far
+    state = store.get_mailbox_state(user_email)
+    if state is None:
+        # First sync still running: nothing to send yet, the next call gets the snapshot
+        return jsonify({"token": None, "reset": True, "added": [], "recategorized": [], "removed": []})
+
+    changes = None
+    uidvalidity, _, seq = request.args.get("token", "").partition(".")
+    if uidvalidity == str(state["uidvalidity"]) and seq.isdigit():
+        changes = store.changes_since(user_email, int(seq))
+    reset = changes is None
+    if reset:
+        changes = {"added": store.recent_messages(user_email, limit=None, history=False), "recategorized": [], "removed": []}
+
+    return jsonify({"token": f"{state['uidvalidity']}.{state['change_seq']}", "reset": reset, **changes})
+
+@app.route('/emails')
+def email_page():
+    """
+    One page of the user's categorized messages, newest first, backfilled history included.
+
+    Served from the store without touching IMAP. ``cursor`` is the ``next_cursor``
+    of the previous page; it is null on the last page stored so far, and
+    ``history.complete`` tells whether the backfill may still add older pages.
+    """
+    user_email = request.args.get("email")
+    if not user_email:
+        return jsonify({"error": "Missing user email"}), 400
+    page_size = request.args.get("page_size", PAGE_SIZE, type=int)
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"page_size must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    cursor = request.args.get("cursor", type=int)
+
+    messages = store.page_messages(user_email, before_uid=cursor, limit=page_size)
+    return jsonify({
+        "emails": messages,
+        "next_cursor": messages[-1]["uid"] if len(messages) == page_size else None,
+        "history": {
+            "complete": history_complete(store.get_mailbox_state(user_email)),
+            "backfill": backfill_service.status(user_email),
+        },
+    })
+
+@app.route('/email-body')
+def email_body():
+    """
+    Sanitized display HTML of one stored message (by ``uid`` or ``gmail_id``),
+    rendered on first open and cached.
+    """
+    user_email = request.args.get("email")
+    uid = request.args.get("uid", type=int)
+    gmail_id = request.args.get("gmail_id")
+    if not user_email or (uid is None and not gmail_id):
+        return jsonify({"error": "Missing user email or uid"}), 400
+
+    if uid is None:
+        uid = store.find_uid(user_email, gmail_id)
+    message = store.get_message_body(user_email, uid) if uid is not None else None
+    if message is None:
+        return jsonify({"error": "Message not found"}), 404
+    body = message["sanitized_body"]
+    if body is None:
+        body = render_body(message["body"], message["body_type"])
+        store.save_sanitized_body(user_email, uid, body)
+    return jsonify({"uid": uid, "body": body})
+
+@app.route('/classify', methods=['POST'])
+def classify_job():
+    """
+    Queue the classification of ``{"emails": [{"subject", "body"}], "model"}`` and return the job id.
+    """
+    data = request.get_json(silent=True) or {}
+    emails = data.get("emails")
+    backend = data.get("model", DEFAULT_BACKEND)
+    if not isinstance(emails, list) or not all(isinstance(e, dict) for e in emails):
+        return jsonify({"error": "Expected a list of emails with subject and body"}), 400
+    if backend not in BACKENDS:
+        return jsonify({"error": f"Unknown model '{backend}', expected one of {list(BACKENDS)}"}), 400
+
+    batch = [(e.get("subject", ""), e.get("body", "")) for e in emails]
+    job_id = job_pool.enqueue("categorize", (batch, backend))
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+@app.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """
+    Status and, once done, result of a queued job. ``wait`` (seconds, at most
+    REFRESH_TIMEOUT) long-polls until the job finishes.
+    """
+    deadline = time.monotonic() + min(request.args.get("wait", 0, type=float), REFRESH_TIMEOUT)
+    job = job_pool.queue.get(job_id)
+    while job is not None and job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.02)
+        job = job_pool.queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job_id": job_id, **job})
+
 @app.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -163,5 +646,69 @@ def register():
 
     return jsonify({'message': 'Registration successful'}), 200
 
+def process_stats():
+    """
+    Prediction-cache and model counters of every process that classifies: this one
+    ("web") and the job workers, which report theirs with each finished job.
+    """
+    return {"web": categorize.process_stats(), **job_pool.worker_stats()}
+
+@app.route('/models')
+def model_stats():
+    # Per process: the web process and every job worker load their own models
+    return jsonify({name: stats["models"] for name, stats in process_stats().items()})
+
+@app.route('/refresh-stats')
+def refresh_stats():
+    return jsonify({**refresh_service.stats(), "connections": imap_pool.stats()})
+
+@app.route('/metrics')
+def metrics():
+    processes = process_stats()
+    return jsonify({
+        "models": {name: stats["models"] for name, stats in processes.items()},
+        "refresh": refresh_service.stats(),
+        "connections": imap_pool.stats(),
+        # Totals over all processes, and each process's own counters
+        "prediction_cache": dict(
+            combine_stats([stats["prediction_cache"] for stats in processes.values()]),
+            processes={name: stats["prediction_cache"] for name, stats in processes.items()},
+        ),
+        "backfill": backfill_service.stats(),
+        "jobs": job_pool.stats(),
+    })
+
+@app.route('/ready')
+def ready():
+    """
+    Readiness probe: 503 until this process has loaded and warmed up its served models.
+    """
+    models = {name: registry.loaded(name) for name in SERVED_MODELS}
+    is_ready = categorize.models_warm.is_set() and all(models.values())
+    return jsonify({"ready": is_ready, "models": models, "pid": os.getpid()}), 200 if is_ready else 503
+
+@app.route('/mailbox-status')
+def mailbox_status():
+    """
+    Cheap "what changed" check for polling: answered from the store, no IMAP round-trip.
+    """
+    user_email = request.args.get("email")
+    if not user_email:
+        return jsonify({"error": "Missing user email"}), 400
+
+    state = store.get_mailbox_state(user_email)
+    return jsonify({
+        "synced": state is not None,
+        "uidvalidity": state["uidvalidity"] if state else None,
+        "last_uid": state["last_uid"] if state else None,
+        "token": f"{state['uidvalidity']}.{state['change_seq']}" if state else None,
+        "watching": mailbox_watcher.watching(user_email),
+    })
+
 if __name__ == "__main__":
+    # Development server; in production run gunicorn with wsgi.py (see gunicorn.conf.py)
+    warm_up()
+    # The debug reloader runs this file in a watcher process too; only the serving child needs workers
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_pool.start()
     app.run(debug=True)
@@ -1,116 +1,714 @@
 # test_app.py
+import base64
 import email
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
 from unittest.mock import patch, MagicMock
 import pytest
-from server import app  
+import categorize
+from imap_pool import ImapConnectionPool
+from message_store import MessageStore
+from prediction_cache import PredictionCache
+import server
+from server import app
 
-# Test when there are more than 5 emails available.
-@patch('server.imaplib.IMAP4_SSL')  # Updated patch target
-def test_update_emails_more_than_five(mock_imap):
-    # Create a fake IMAP instance.
-    instance = MagicMock()
-    mock_imap.return_value = instance
+USER = "user@example.com"
+
+
+def build_fetch_response(sequence_set, items="(UID RFC822 X-GM-MSGID)"):
+    """
+    Build the data part of an imaplib FETCH response for a sequence set like b'6:10'.
+
+    Answers the header-first requests (BODYSTRUCTURE + headers, then BODY.PEEK[1])
+    as well as full RFC822 fetches.
+    """
+    if isinstance(sequence_set, bytes):
+        sequence_set = sequence_set.decode()
+    numbers = []
+    for part in sequence_set.split(","):
+        start, _, end = part.partition(":")
+        numbers.extend(range(int(start), int(end or start) + 1))
+
+    data = []
+    for number in numbers:
+        headers = f"Subject: Test email {number}\r\nFrom: sender@example.com\r\n\r\n".encode()
+        body = b"This is a test email."
+        if "BODYSTRUCTURE" in items:
+            structure = f'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" {len(body)} 1 NIL NIL NIL NIL)'
+            header = (
+                f"{number} (UID {number} X-GM-MSGID {1000 + number} BODYSTRUCTURE {structure} "
+                f"BODY[HEADER.FIELDS (SUBJECT FROM)] {{{len(headers)}}}"
+            )
+            data.append((header.encode(), headers))
+        elif "BODY.PEEK[1]" in items:
+            data.append((f"{number} (UID {number} BODY[1]<0> {{{len(body)}}}".encode(), body))
+        else:
+            raw = email.message_from_bytes(headers + body).as_bytes()
+            header = f"{number} (UID {number} X-GM-MSGID {1000 + number} RFC822 {{{len(raw)}}}"
+            data.append((header.encode(), raw))
+        data.append(b")")
+    return data
 
-    # Simulate successful login and selection.
+
+class FakeMailbox:
+    """
+    Mutable mailbox state behind the mocked IMAP connection; UIDs equal sequence numbers.
+    """
+    def __init__(self, count, uidvalidity=1):
+        self.uids = list(range(1, count + 1))
+        self.uidvalidity = uidvalidity
+        self.older_than_since = set()  # UIDs a SINCE criterion leaves out
+
+
+def fake_imap(mailbox):
+    # Create a fake IMAP instance with a successful login and selection.
+    instance = MagicMock()
     instance.login.return_value = ('OK', [b'Logged in'])
-    instance.select.return_value = ('OK', [b''])
-
-    # Simulate search returning 10 email IDs.
-    instance.search.return_value = ('OK', [b'1 2 3 4 5 6 7 8 9 10'])
-
-    # For each fetch, create a dummy email with a unique subject.
-    def fetch_side_effect(email_id, message_parts):
-        email_num = email_id.decode()  # e.g., b'6' -> "6"
-        raw_email = (
-            f"Subject: Test email {email_num}\n"
-            "From: sender@example.com\n"
-            "\n"
-            "This is a test email."
-        )
-        msg = email.message_from_string(raw_email)
-        return ('OK', [(None, msg.as_bytes())])
-
-    instance.fetch.side_effect = fetch_side_effect
+    instance.select.side_effect = lambda name, readonly=False: ('OK', [str(len(mailbox.uids)).encode()])
+
+    def response(code):
+        if code == "UIDVALIDITY":
+            return (code, [str(mailbox.uidvalidity).encode()])
+        return (code, [str(max(mailbox.uids, default=0) + 1).encode()])
+
+    def search(criteria):
+        # "n:*" always matches the last message
+        uids = mailbox.uids
+        while criteria:
+            key = criteria.pop(0)
+            if key == "SINCE":
+                criteria.pop(0)
+                uids = [u for u in uids if u not in mailbox.older_than_since]
+                continue
+            by_uid = key == "UID"
+            start, _, end = (criteria.pop(0) if by_uid else key).partition(":")
+            numbers = [u if by_uid else n for n, u in enumerate(mailbox.uids, start=1)]
+            last = max(numbers, default=0)
+            low, high = int(start), last if end == "*" else int(end or start)
+            matched = [u for n, u in zip(numbers, mailbox.uids) if low <= n <= high]
+            if end == "*" and not matched:
+                matched = mailbox.uids[-1:]
+            uids = [u for u in uids if u in matched]
+        return uids
+
+    def uid(command, *args):
+        if command == "SEARCH":
+            return ('OK', [" ".join(str(u) for u in search(args[-1].split())).encode()])
+        if command == "FETCH":
+            return ('OK', build_fetch_response(args[0], args[1]))
+        raise AssertionError(f"Unexpected UID command {command}")
+
+    instance.response.side_effect = response
+    instance.uid.side_effect = uid
     instance.logout.return_value = ('OK', [b'Logged out'])
+    return instance
+
+
+def uid_fetch_calls(instance):
+    # Sequence sets of the header-first FETCH commands (one per batch)
+    return [
+        c.args[1] for c in instance.uid.call_args_list
+        if c.args[0] == "FETCH" and "BODYSTRUCTURE" in c.args[2]
+    ]
+
+
+def body_fetch_calls(instance):
+    return [c.args[2] for c in instance.uid.call_args_list if c.args[0] == "FETCH" and "BODYSTRUCTURE" not in c.args[2]]
+
+
+@pytest.fixture(autouse=True)
+def message_store(tmp_path):
+    # Give every test its own empty sync-state store, prediction cache and no pooled IMAP sessions;
+    # the history backfill is started explicitly by the tests that need it.
+    with patch('server.store', MessageStore(str(tmp_path / "store.sqlite3"))) as store, \
+            patch('categorize.prediction_cache', PredictionCache()), \
+            patch('server.imap_pool', ImapConnectionPool(server.connect_imap)), \
+            patch('server.HISTORY_BACKFILL', False):
+        yield store
+
+
+def test_import_creates_no_database_files(tmp_path):
+    # The stores open their SQLite files on first use, not when the server is imported
+    paths = {name: str(tmp_path / f"{name}.sqlite3") for name in ("MESSAGE_STORE_PATH", "PREDICTION_CACHE_PATH", "JOB_QUEUE_PATH")}
+    subprocess.run([sys.executable, "-c", "import server"], cwd=os.path.dirname(os.path.abspath(server.__file__)),
+                   env={**os.environ, **paths}, check=True, capture_output=True)
+
+    assert os.listdir(tmp_path) == []
+
+
+def returned_emails(data):
+    # The endpoint groups emails by category; flatten them back into mailbox order.
+    emails = [item for items in data.values() for item in items]
+    return sorted(emails, key=lambda item: int(item['gmail_id']))
+
+
+# Test when more than 100 emails are available: only the last 100 are fetched, in one command.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_fetches_window_in_one_command(mock_imap, mock_password):
+    instance = fake_imap(FakeMailbox(150))
+    mock_imap.return_value = instance
 
-    # Use the Flask test client to make a request.
     with app.test_client() as client:
-        response = client.get('/update-emails')
+        response = client.get(f'/update-emails?email={USER}')
         data = response.get_json()
 
-    # We expect exactly 5 emails to be returned (the last 5 of 10).
     assert response.status_code == 200
-    assert isinstance(data, list)
-    assert len(data) == 5
-
-    # Since the last five email IDs are: 6, 7, 8, 9, 10, verify each subject.
-    expected_ids = [b'6', b'7', b'8', b'9', b'10']
-    for i, email_item in enumerate(data):
-        expected_subject = f"Test email {expected_ids[i].decode()}"
-        assert email_item['subject'] == expected_subject
-        assert email_item['from'] == "sender@example.com"
+    assert isinstance(data, dict)
+    assert uid_fetch_calls(instance) == ['51:150']
+    # Only the text part is downloaded, capped at max_body_bytes
+    assert body_fetch_calls(instance) == [f"(UID BODY.PEEK[1]<0.{server.MAX_BODY_BYTES}>)"]
 
+    emails = returned_emails(data)
+    assert len(emails) == 100
+    assert emails[0]['subject'] == "Test email 51"
+    assert emails[-1]['subject'] == "Test email 150"
+    assert emails[-1]['gmail_id'] == "1150"
 
-# Test when fewer than 5 emails are available.
-@patch('server.imaplib.IMAP4_SSL')
-def test_update_emails_less_than_five(mock_imap):
-    instance = MagicMock()
-    mock_imap.return_value = instance
 
-    instance.login.return_value = ('OK', [b'Logged in'])
-    instance.select.return_value = ('OK', [b''])
-
-    # Simulate search returning 3 email IDs.
-    instance.search.return_value = ('OK', [b'1 2 3'])
-
-    def fetch_side_effect(email_id, message_parts):
-        email_num = email_id.decode()
-        raw_email = (
-            f"Subject: Test email {email_num}\n"
-            "From: sender@example.com\n"
-            "\n"
-            "This is a test email."
-        )
-        msg = email.message_from_string(raw_email)
-        return ('OK', [(None, msg.as_bytes())])
-
-    instance.fetch.side_effect = fetch_side_effect
-    instance.logout.return_value = ('OK', [b'Logged out'])
+# Test when fewer emails than the window are available.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_less_than_window(mock_imap, mock_password):
+    mock_imap.return_value = fake_imap(FakeMailbox(3))
 
     with app.test_client() as client:
-        response = client.get('/update-emails')
+        response = client.get(f'/update-emails?email={USER}')
         data = response.get_json()
 
     # Since there are only 3 emails, the endpoint should return all 3.
     assert response.status_code == 200
-    assert isinstance(data, list)
-    assert len(data) == 3
+    emails = returned_emails(data)
+    assert len(emails) == 3
 
-    expected_ids = [b'1', b'2', b'3']
-    for i, email_item in enumerate(data):
-        expected_subject = f"Test email {expected_ids[i].decode()}"
-        assert email_item['subject'] == expected_subject
+    for i, email_item in enumerate(emails, start=1):
+        assert email_item['subject'] == f"Test email {i}"
         assert email_item['from'] == "sender@example.com"
+        assert email_item['category'] in data
 
 
 # Test when no emails are available.
+@patch('server.get_decoded_password', return_value='app-password')
 @patch('server.imaplib.IMAP4_SSL')
-def test_update_emails_empty(mock_imap):
-    instance = MagicMock()
+def test_update_emails_empty(mock_imap, mock_password):
+    instance = fake_imap(FakeMailbox(0))
     mock_imap.return_value = instance
 
-    instance.login.return_value = ('OK', [b'Logged in'])
-    instance.select.return_value = ('OK', [b''])
+    with app.test_client() as client:
+        response = client.get(f'/update-emails?email={USER}')
+        data = response.get_json()
+
+    # Expect no categories and no FETCH when the mailbox is empty.
+    assert response.status_code == 200
+    assert data == {}
+    assert uid_fetch_calls(instance) == []
 
-    # Simulate search returning an empty result.
-    instance.search.return_value = ('OK', [b''])
-    instance.logout.return_value = ('OK', [b'Logged out'])
+
+# Test that a refresh only fetches and classifies the messages that arrived since the last one.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_incremental_sync(mock_imap, mock_password):
+    mailbox = FakeMailbox(10)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
 
     with app.test_client() as client:
-        response = client.get('/update-emails')
-        data = response.get_json()
+        client.get(f'/update-emails?email={USER}')
+
+        # Nothing changed: UIDNEXT tells us so without a SEARCH or FETCH.
+        instance.uid.reset_mock()
+        with patch('categorize.categorize_emails', wraps=categorize.categorize_emails) as categorized:
+            response = client.get(f'/update-emails?email={USER}')
+        assert categorized.call_count == 0
+        assert instance.uid.call_count == 0
+        assert len(returned_emails(response.get_json())) == 10
+
+        # Two new messages: one FETCH and one batched prediction over two emails.
+        mailbox.uids.extend([11, 12])
+        instance.uid.reset_mock()
+        with patch('categorize.categorize_emails', wraps=categorize.categorize_emails) as categorized:
+            response = client.get(f'/update-emails?email={USER}')
+        assert categorized.call_count == 1
+        assert len(categorized.call_args.args[0]) == 2
+        assert uid_fetch_calls(instance) == ['11:12']
+
+    emails = returned_emails(response.get_json())
+    assert [item['subject'] for item in emails] == [f"Test email {i}" for i in range(1, 13)]
+
+
+# Test that refreshes reuse one logged-in IMAP session and that the status endpoint needs no IMAP.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_reuses_pooled_session(mock_imap, mock_password):
+    mailbox = FakeMailbox(4)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
+
+    with app.test_client() as client:
+        client.get(f'/update-emails?email={USER}')
+        mailbox.uids.append(5)
+        client.get(f'/update-emails?email={USER}')
+        status = client.get(f'/mailbox-status?email={USER}').get_json()
+
+    assert mock_imap.call_count == 1
+    assert instance.login.call_count == 1
+    assert instance.logout.call_count == 0
+    assert status["last_uid"] == 5 and status["synced"] is True
+
+
+# Test that a UIDVALIDITY change discards the cached messages and resyncs.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_uidvalidity_change(mock_imap, mock_password, message_store):
+    mailbox = FakeMailbox(5)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
+
+    with app.test_client() as client:
+        client.get(f'/update-emails?email={USER}')
+        mailbox.uidvalidity = 2
+        instance.uid.reset_mock()
+        response = client.get(f'/update-emails?email={USER}')
+
+    assert uid_fetch_calls(instance) == ['1:5']
+    assert message_store.get_sync_state(USER) == (2, 5)
+    assert len(returned_emails(response.get_json())) == 5
+
+
+def test_categorize_emails_matches_per_message_path():
+    batch = [
+        ("Team meeting moved to 3pm", "Please update the project timeline before the meeting."),
+        ("50% off everything this weekend", "Shop our biggest sale of the year."),
+        ("Dinner plans?", "Are you free next week?"),
+        ("URGENT: server down", "Production is down, please respond immediately."),
+    ]
+
+    assert categorize.categorize_emails(batch) == [categorize.categorize_email(s, b) for s, b in batch]
+    assert categorize.categorize_emails([]) == []
+
+
+def test_categorize_emails_caches_near_identical_emails():
+    batch = [
+        ("Your order #1042 has shipped", "Track it at example.com/1042."),
+        ("Your order #2231 has shipped!", "Track it at example.com/2231."),
+    ]
+
+    first = categorize.categorize_emails(batch)
+    again = categorize.categorize_emails(batch[::-1])
+    with app.test_client() as client:
+        stats = client.get('/metrics').get_json()["prediction_cache"]
+
+    # Only digits and punctuation differ, so the SVM input and the cache key are the same
+    assert first[0] == first[1] == again[0]
+    assert stats["misses"] == 1 and stats["hits"] == 3
+
+
+# Test that /metrics and /models include what the job worker processes reported.
+def test_metrics_include_job_workers():
+    categorize.categorize_emails([("Lunch?", "Free at noon?")])
+    worker = {
+        "prediction_cache": dict(PredictionCache().stats(), hits=6, misses=2, entries=2),
+        "models": {server.PIPELINE_NAME: {"loads": 1}},
+    }
+    with app.test_client() as client, patch.object(server.job_pool, 'worker_stats', return_value={"w-0": worker}):
+        metrics = client.get('/metrics').get_json()
+        models = client.get('/models').get_json()
+
+    cache = metrics["prediction_cache"]
+    assert (cache["hits"], cache["misses"], cache["hit_rate"]) == (6, 3, 6 / 9)
+    assert cache["processes"]["w-0"]["hits"] == 6 and cache["processes"]["web"]["misses"] == 1
+    assert set(models) == set(metrics["models"]) == {"web", "w-0"}
+    assert models["w-0"] == {server.PIPELINE_NAME: {"loads": 1}}
+
+
+# Test that a request can pick the DistilBERT backend instead of the configured default.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_selects_backend_per_request(mock_imap, mock_password):
+    mock_imap.return_value = fake_imap(FakeMailbox(3))
+    distilbert = MagicMock()
+    distilbert.predict.side_effect = lambda texts: ["Urgent"] * len(texts)
+    get_versioned = server.registry.get_versioned
+
+    def registry_get(name):
+        return (distilbert, "1") if name == server.DISTILBERT_MODEL_NAME else get_versioned(name)
+
+    with app.test_client() as client, patch.object(server.registry, 'get_versioned', side_effect=registry_get):
+        response = client.get(f'/update-emails?email={USER}&model=distilbert')
+        unknown = client.get(f'/update-emails?email={USER}&model=bert-large')
 
-    # Expect an empty list when no emails are found.
     assert response.status_code == 200
-    assert isinstance(data, list)
-    assert len(data) == 0
+    assert list(response.get_json()) == ["Urgent"]
+    assert distilbert.predict.call_count == 1
+    # DistilBERT reads the preprocessed text it was fine-tuned on (processed_content), not the raw email
+    assert distilbert.predict.call_args.args[0][0] == "test email this is a test email"
+    assert unknown.status_code == 400
+
+
+def test_parse_email_reads_plain_only_multipart():
+    message = email.message.EmailMessage()
+    message["Subject"] = "Lunch?"
+    message["From"] = "friend@example.com"
+    message.set_content("Are you free at noon?")
+    message.add_attachment(b"%PDF-1.4", maintype="application", subtype="pdf", filename="menu.pdf")
+    message.add_attachment("not the body", filename="notes.txt")
+
+    subject, from_, body, body_type = categorize.parse_email(message.as_bytes())
+
+    assert (subject, from_, body_type) == ("Lunch?", "friend@example.com", "plain")
+    assert body.strip() == "Are you free at noon?"
+
+
+def test_parse_partial_decodes_truncated_parts():
+    html = "<p>Quarterly report attached – please review</p>" * 20
+    payload = base64.encodebytes(html.encode())[:301]  # cut mid base64 quantum, like <0.n> does
+    part = {"subtype": "html", "charset": "utf-8", "encoding": "base64", "section": "1.1", "size": 2000}
+    headers = b"Subject: =?utf-8?q?R=C3=A9sum=C3=A9?=\r\nFrom: boss@example.com\r\n\r\n"
+
+    subject, from_, body, body_type = categorize.parse_partial(headers, part, payload)
+
+    assert subject == "Résumé"
+    assert from_ == "boss@example.com"
+    assert body.startswith("<p>Quarterly report attached – please review</p>")
+    assert body_type == "html"
+    assert categorize.parse_partial(headers, None, None)[2] == "Unable to Read Body"
+
+
+# Test that HTML is classified as extracted text and only sanitized when the body is opened.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_email_body_is_sanitized_on_open(mock_imap, mock_password, message_store):
+    mock_imap.return_value = fake_imap(FakeMailbox(2))
+    html = '<div><p>Flash <b>sale</b></p><script>track()</script><p></p></div>'
+    parse_partial = categorize.parse_partial
+
+    def parse_html(header, part, payload):
+        return parse_partial(header, part, payload)[:2] + (html, "html")
+
+    with app.test_client() as client, patch('categorize.parse_partial', side_effect=parse_html), \
+            patch('server.sanitize_html', wraps=server.sanitize_html) as sanitize, \
+            patch('categorize.categorize_emails', wraps=categorize.categorize_emails) as categorized:
+        emails = returned_emails(client.get(f'/update-emails?email={USER}').get_json())
+        assert sanitize.call_count == 0
+        assert categorized.call_args.args[0][0] == ("Test email 1", "Flash sale")
+        assert emails[0]['snippet'] == "Flash sale" and 'body' not in emails[0]
+
+        first = client.get(f'/email-body?email={USER}&uid={emails[0]["uid"]}')
+        again = client.get(f'/email-body?email={USER}&uid={emails[0]["uid"]}')
+        missing = client.get(f'/email-body?email={USER}&uid=99')
+
+    assert first.get_json()["body"] == again.get_json()["body"] == "<div><p>Flash <b>sale</b></p></div>"
+    assert sanitize.call_count == 1  # rendered once, then served from the store
+    assert missing.status_code == 404
+
+
+def test_email_body_escapes_plain_text(message_store):
+    message_store.reset_mailbox(USER, 1)
+    message_store.save_messages(USER, [{
+        "uid": 1, "gmail_id": "1001", "subject": "Hi", "from": "a@example.com",
+        "body": "1 < 2\nbye", "body_type": "plain", "text": "1 < 2 bye", "category": "Personal",
+    }])
+
+    with app.test_client() as client:
+        response = client.get(f'/email-body?email={USER}&uid=1')
+
+    assert response.get_json()["body"] == "1 &lt; 2<br>bye"
+
+
+def test_message_store_migrates_legacy_rows(tmp_path):
+    path = str(tmp_path / "legacy.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE messages (user TEXT NOT NULL, uid INTEGER NOT NULL, gmail_id TEXT, "
+                     "subject TEXT, sender TEXT, body TEXT, category TEXT, PRIMARY KEY (user, uid))")
+        conn.execute("INSERT INTO messages VALUES (?, 1, '1001', 'Hi', 'a@example.com', '<p>old</p>', 'Work')", (USER,))
+    conn.close()
+
+    store = MessageStore(path)
+
+    assert store.recent_messages(USER)[0]["snippet"] == ""
+    assert store.get_message_body(USER, 1)["sanitized_body"] == "<p>old</p>"  # already sanitized
+
+
+# Test that /sync sends the snapshot once, then only what was added or expunged since the token.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_sync_returns_deltas(mock_imap, mock_password):
+    mailbox = FakeMailbox(10)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
+
+    with app.test_client() as client:
+        first = client.get(f'/sync?email={USER}')
+        snapshot = first.get_json()
+        unchanged = client.get(f'/sync?email={USER}&token={snapshot["token"]}').get_json()
+
+        mailbox.uids.remove(3)
+        mailbox.uids.append(11)
+        instance.uid.reset_mock()
+        delta = client.get(f'/sync?email={USER}&token={unchanged["token"]}').get_json()
+        warm = client.get(f'/sync?email={USER}&token={delta["token"]}')
+        stale = client.get(f'/sync?email={USER}&token=7.{snapshot["token"].split(".")[1]}').get_json()
+        body = client.get(f'/email-body?email={USER}&gmail_id=1011').get_json()
+
+    assert snapshot["reset"] is True and len(snapshot["added"]) == 10
+    assert 'body' not in snapshot["added"][0]
+    assert unchanged == {"token": snapshot["token"], "reset": False, "added": [], "recategorized": [], "removed": []}
+    assert uid_fetch_calls(instance) == ['11']
+    assert [item["gmail_id"] for item in delta["added"]] == ["1011"]
+    assert delta["removed"] == ["1003"] and delta["recategorized"] == []
+    assert len(warm.data) * 5 < len(first.data)  # a warm refresh is just the token
+    assert stale["reset"] is True and len(stale["added"]) == 10
+    assert body["uid"] == 11 and body["body"] == "This is a test email."
+
+
+# Test that a different model recategorizes the cached messages and reports only those that changed.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_sync_reports_recategorized_messages(mock_imap, mock_password):
+    instance = fake_imap(FakeMailbox(4))
+    mock_imap.return_value = instance
+    distilbert = MagicMock()
+    distilbert.predict.side_effect = lambda texts: ["Personal"] * len(texts)
+    get_versioned = server.registry.get_versioned
+
+    def registry_get(name):
+        return (distilbert, "1") if name == server.DISTILBERT_MODEL_NAME else get_versioned(name)
+
+    with app.test_client() as client, patch.object(server.registry, 'get_versioned', side_effect=registry_get):
+        snapshot = client.get(f'/sync?email={USER}').get_json()
+        instance.uid.reset_mock()
+        delta = client.get(f'/sync?email={USER}&model=distilbert&token={snapshot["token"]}').get_json()
+        again = client.get(f'/sync?email={USER}&model=distilbert&token={delta["token"]}').get_json()
+
+    before = {item["gmail_id"]: item["category"] for item in snapshot["added"]}
+    after = {item["gmail_id"]: item["category"] for item in delta["recategorized"]}
+    assert instance.uid.call_count == 0  # the mailbox did not change, only the model
+    assert after == {gmail_id: "Personal" for gmail_id, category in before.items() if category != "Personal"}
+    assert after  # some categories changed
+    assert delta["added"] == [] and again["recategorized"] == []
+
+
+def test_message_store_prunes_tombstones(message_store):
+    message_store.reset_mailbox(USER, 1)
+    message_store.save_messages(USER, [{
+        "uid": uid, "gmail_id": str(1000 + uid), "subject": "Hi", "from": "a@example.com",
+        "body": "hi", "body_type": "plain", "text": "hi", "category": "Personal",
+    } for uid in range(1, 4)])
+    token_seq = message_store.get_mailbox_state(USER)["change_seq"]
+
+    with patch('message_store.MAX_TOMBSTONES', 1):
+        message_store.remove_messages(USER, [1])
+        message_store.remove_messages(USER, [2])
+
+    # The removal of message 1 is forgotten, so that token can only get a snapshot
+    assert message_store.changes_since(USER, token_seq) is None
+    assert message_store.changes_since(USER, token_seq + 1)["removed"] == ["1002"]
+    assert message_store.cached_uids(USER) == [3]
+
+
+def stream_events(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+# Test that the NDJSON stream sends every email as its batch is categorized, then a done event.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_streams_ndjson(mock_imap, mock_password):
+    mailbox = FakeMailbox(25)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
+
+    with app.test_client() as client, patch('server.STREAM_FIRST_BATCH', 10), \
+            patch('categorize.categorize_emails', wraps=categorize.categorize_emails) as categorized:
+        response = client.get(f'/update-emails?email={USER}&stream=ndjson')
+        events = stream_events(response)
+        grouped = client.get(f'/update-emails?email={USER}').get_json()
+
+    assert response.mimetype == "application/x-ndjson"
+    assert uid_fetch_calls(instance) == ['1:10', '11:25']  # batches grow after the first
+    assert [len(c.args[0]) for c in categorized.call_args_list] == [10, 15]
+    assert [e["event"] for e in events] == ["email"] * 25 + ["done"]
+    assert [e["data"] for e in events[:-1]] == returned_emails(grouped)
+    assert events[-1]["data"] == {"count": 25, "token": "1.2", "timed_out": False}
+
+
+# Test that the SSE stream sends the cached part of the window first, then the new mail.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_update_emails_streams_sse_incrementally(mock_imap, mock_password):
+    mailbox = FakeMailbox(100)
+    mock_imap.return_value = fake_imap(mailbox)
+
+    with app.test_client() as client:
+        client.get(f'/update-emails?email={USER}')
+        mailbox.uids.extend([101, 102])
+        response = client.get(f'/update-emails?email={USER}&stream=sse')
+        unknown = client.get(f'/update-emails?email={USER}&stream=xml')
+
+    chunks = response.data.decode().split("\n\n")[:-1]
+    events = [(c.split("\n")[0][len("event: "):], json.loads(c.split("\n")[1][len("data: "):])) for c in chunks]
+    assert response.mimetype == "text/event-stream"
+    assert [data["uid"] for event, data in events[:-1]] == list(range(3, 103))
+    assert events[-1] == ("done", {"count": 100, "token": "1.2", "timed_out": False})
+    assert unknown.status_code == 400
+
+
+def search_calls(instance):
+    return [c.args[-1] for c in instance.uid.call_args_list if c.args[0] == "SEARCH"]
+
+
+# Test that the first sync asks for the window by sequence range and date, never for every UID.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_first_sync_searches_only_the_window(mock_imap, mock_password):
+    instance = fake_imap(FakeMailbox(150))
+    mock_imap.return_value = instance
+
+    with app.test_client() as client, patch('server.FETCH_WINDOW', 30):
+        emails = returned_emails(client.get(f'/update-emails?email={USER}').get_json())
+
+    assert search_calls(instance) == [f"{server.since_criterion()} 121:*"]
+    assert [item['uid'] for item in emails] == list(range(121, 151))
+
+
+# Test that a first sync with nothing recent resumes from UIDNEXT instead of searching every UID.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_empty_first_window_resumes_from_uidnext(mock_imap, mock_password):
+    mailbox = FakeMailbox(5000)
+    mailbox.older_than_since = set(mailbox.uids)
+    instance = fake_imap(mailbox)
+    mock_imap.return_value = instance
+
+    with app.test_client() as client:
+        first = returned_emails(client.get(f'/update-emails?email={USER}').get_json())
+        mailbox.uids.append(5001)
+        second = returned_emails(client.get(f'/update-emails?email={USER}').get_json())
+
+    assert first == []
+    assert search_calls(instance)[1].endswith("UID 5001:*")
+    assert uid_fetch_calls(instance) == ["5001"]
+    assert [item['uid'] for item in second] == [5001]
+
+
+# Test that the backfill walks the history in chunks into the store, outside the synced snapshot.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_backfill_pages_through_history(mock_imap, mock_password, message_store):
+    instance = fake_imap(FakeMailbox(250))
+    mock_imap.return_value = instance
+
+    with app.test_client() as client:
+        snapshot = client.get(f'/sync?email={USER}').get_json()
+        steps = [server.backfill_step(instance, USER, 100) for _ in range(3)]
+        delta = client.get(f'/sync?email={USER}&token={snapshot["token"]}').get_json()
+
+        pages, cursor = [], None
+        while True:
+            page = client.get(f'/emails?email={USER}&page_size=60' + (f'&cursor={cursor}' if cursor else '')).get_json()
+            pages.append([item['uid'] for item in page['emails']])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        too_big = client.get(f'/emails?email={USER}&page_size=100000')
+        reset = client.get(f'/sync?email={USER}').get_json()
+
+    assert steps == [100, 50, 0]
+    assert uid_fetch_calls(instance)[1:] == ['51:150', '1:50']
+    assert delta["added"] == [] and delta["token"] == snapshot["token"]
+    assert reset["reset"] is True and len(reset["added"]) == len(snapshot["added"]) == 100
+    assert [len(p) for p in pages] == [60, 60, 60, 60, 10]
+    assert sum(pages, []) == list(range(250, 0, -1))
+    assert page['history']['complete'] is True
+    assert too_big.status_code == 400
+
+
+# Test that a backend switch recategorizes only the window inline and the rest in backfill steps.
+@patch('server.get_decoded_password', return_value='app-password')
+@patch('server.imaplib.IMAP4_SSL')
+def test_backend_switch_leaves_older_messages_to_the_backfill(mock_imap, mock_password, message_store):
+    instance = fake_imap(FakeMailbox(250))
+    mock_imap.return_value = instance
+    distilbert = MagicMock()
+    distilbert.predict.side_effect = lambda texts: ["Personal"] * len(texts)
+    get_versioned = server.registry.get_versioned
+
+    def registry_get(name):
+        return (distilbert, "1") if name == server.DISTILBERT_MODEL_NAME else get_versioned(name)
+
+    with app.test_client() as client, patch.object(server.registry, 'get_versioned', side_effect=registry_get):
+        snapshot = client.get(f'/sync?email={USER}').get_json()
+        assert [server.backfill_step(instance, USER, 100) for _ in range(3)] == [100, 50, 0]
+
+        with patch('categorize.categorize_emails', wraps=categorize.categorize_emails) as categorized:
+            client.get(f'/sync?email={USER}&model=distilbert&token={snapshot["token"]}')
+        inline = sum(len(c.args[0]) for c in categorized.call_args_list)
+        steps = [server.backfill_step(instance, USER, 100) for _ in range(3)]
+        page = client.get(f'/emails?email={USER}&page_size=500').get_json()
+        stale = message_store.classifier_inputs(USER, stale_for=server.model_version("distilbert"))
+
+    assert inline == 100  # the window only
+    assert steps == [100, 50, 0]
+    assert {item['category'] for item in page['emails']} == {"Personal"}
+    assert stale == []
+
+
+# Test that sparse UIDs are found with a few widening range SEARCHes.
+def test_backfill_widens_search_over_sparse_uids(message_store):
+    mailbox = FakeMailbox(0)
+    mailbox.uids = [3, 7] + list(range(10_000, 10_010))
+    instance = fake_imap(mailbox)
+    message_store.reset_mailbox(USER, 1)
+    message_store.save_messages(USER, [{
+        "uid": uid, "gmail_id": str(1000 + uid), "subject": "Hi", "from": "a@example.com",
+        "body": "hi", "body_type": "plain", "text": "hi", "category": "Personal",
+    } for uid in range(10_000, 10_010)], model_version=server.model_version(server.DEFAULT_BACKEND))
+
+    with patch('server.job_pool') as job_pool:
+        assert server.backfill_step(instance, USER, 5) == 2
+        assert server.backfill_step(instance, USER, 5) == 0
+    assert not job_pool.mock_calls  # backfills classify on their own threads
+    assert len(search_calls(instance)) == 11  # ranges of 5, 10, 20, ... down to UID 1
+    assert message_store.cached_uids(USER)[:2] == [3, 7]
+    assert message_store.get_mailbox_state(USER)["history_uid"] == 1
+
+
+# Test that /classify only queues the job and /jobs/<id> returns its result.
+def test_classify_job_is_queued_and_polled(tmp_path):
+    batch = [("50% off everything this weekend", "Shop our biggest sale of the year."), ("Lunch?", "Free at noon?")]
+    pool = server.WorkerPool(
+        str(tmp_path / "jobs.sqlite3"), "classify_worker", server.JOB_HANDLERS, server.refresh_service.cpu_pool
+    )
+
+    with app.test_client() as client, patch('server.job_pool', pool):
+        queued = client.post('/classify', json={"emails": [{"subject": s, "body": b} for s, b in batch]})
+        job = client.get(f'/jobs/{queued.get_json()["job_id"]}?wait=10').get_json()
+        invalid = client.post('/classify', json={"emails": "not a list"})
+        missing = client.get('/jobs/999')
+
+    assert queued.status_code == 202
+    assert job["status"] == "done" and job["result"] == categorize.categorize_emails(batch)
+    assert invalid.status_code == 400 and missing.status_code == 404
+
+
+# Test that /ready reports 503 until the served models are loaded and warmed up.
+def test_ready_after_warm_up():
+    with app.test_client() as client, patch('categorize.models_warm', threading.Event()):
+        before = client.get('/ready')
+        server.warm_up()
+        after = client.get('/ready')
+
+    assert before.status_code == 503 and before.get_json()["ready"] is False
+    assert after.status_code == 200
+    assert after.get_json()["models"] == {server.PIPELINE_NAME: True}
+
+
+def test_update_emails_requires_email():
+    with app.test_client() as client:
+        response = client.get('/update-emails')
+
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+import re
+from html.parser import HTMLParser
+
+# lxml is optional: it parses in C in a single pass, html.parser is the pure-Python fallback
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - depends on the environment
+    lxml_html = None
+
+# Elements whose text is never shown to the reader
+SKIPPED_TAGS = ("script", "style", "head", "title", "noscript", "template")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Zero-width, bidi and soft-hyphen characters newsletters pad their preheaders with
+_INVISIBLE_RE = re.compile(r"[\u200b-\u200f\u202a-\u202e\u2060-\u206f\ufeff\u034f\u00ad]+")
+
+
+def normalize_text(text):
+    return _WHITESPACE_RE.sub(" ", _INVISIBLE_RE.sub("", text)).strip()
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _lxml_text(html):
+    document = lxml_html.document_fromstring(html)
+    etree.strip_elements(document, *SKIPPED_TAGS, etree.Comment, with_tail=False)
+    return " ".join(document.itertext())
+
+
+def _html_parser_text(html):
+    collector = _TextCollector()
+    collector.feed(html)
+    collector.close()
+    return " ".join(collector.parts)
+
+
+def extract_text(html):
+    """
+    Visible text of an HTML body, for the classifier.
+
+    One parse, no sanitizing: scripts, styles and the head are dropped, tags are
+    replaced by spaces and whitespace and zero-width characters are collapsed.
+    The result is never rendered, so it does not need to be safe HTML.
+    """
+    if not html or not html.strip():
+        return ""
+    if lxml_html is not None:
+        try:
+            return normalize_text(_lxml_text(html))
+        except (etree.ParserError, ValueError):
+            pass  # e.g. a document with nothing but comments; fall back to html.parser
+    return normalize_text(_html_parser_text(html))
@@ -0,0 +1,22 @@
+"""
+Production entry point of the backend (Linux/macOS, ``pip install gunicorn``):
+
+    gunicorn -c back_end/gunicorn.conf.py
+
+gunicorn imports this module once in its master process (``preload_app``) and
+forks the workers afterwards, so the models loaded here are shared copy-on-write
+instead of being unpickled again by every worker. Each worker then runs one
+warm-up prediction before it accepts requests; /ready answers 200 from then on.
+"""
+import gc
+
+import categorize
+import server
+
+categorize.load_models()
+# Move everything allocated so far (mostly the models) to a generation the collector
+# never scans: a collection in a worker would otherwise write to these objects' GC
+# headers and copy the pages they live on
+gc.freeze()
+
+app = server.app
@@ -0,0 +1,13 @@
+import os
+import shutil
+import tempfile
+
+# Keep the server's SQLite files (back_end/config.py) out of the source tree while testing;
+# the worker processes the tests spawn inherit the environment too.
+STATE_DIR = tempfile.mkdtemp(prefix="nextmove-tests-")
+for name in ("MESSAGE_STORE_PATH", "PREDICTION_CACHE_PATH", "JOB_QUEUE_PATH"):
+    os.environ[name] = os.path.join(STATE_DIR, name[:-len("_PATH")].lower() + ".sqlite3")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
@@ -1,23 +1,43 @@
 import React, { useState } from 'react';
+import { fetchEmailBody } from '../utils/email';
+import { loadData, STORAGE_KEYS } from '../utils/storage';
 
-function EmailCard({ subject, from, category, body, currentFolder, gmail_id }) {
+function EmailCard({ subject, from, category, snippet, currentFolder, gmail_id }) {
   const [expanded, setExpanded] = useState(false);
+  const [body, setBody] = useState(null);
   const showCategory = category?.toLowerCase() !== currentFolder?.toLowerCase();
 
+  const toggle = async () => {
+    setExpanded(!expanded);
+    if (expanded || body !== null) return;
+    try {
+      const user = loadData(STORAGE_KEYS.USER, {});
+      setBody(await fetchEmailBody(user.email, gmail_id));
+    } catch (error) {
+      console.error('Error loading email body:', error);
+    }
+  };
+
   return (
-    <div className="email-card" onClick={() => setExpanded(!expanded)}>
+    <div className="email-card" onClick={toggle}>
       <p className="card-header"><strong>Subject:</strong> {subject}</p>
       <p className="card-subject"><strong>From:</strong> {from}</p>
       {showCategory && (
         <p className="card-body"><strong>Category:</strong> {category}</p>
       )}
 
+      {(!expanded || body === null) && snippet && (
+        <p className="card-snippet">{snippet}</p>
+      )}
+
       {expanded && (
         <>
-          <div
-            className="email-body"
-            dangerouslySetInnerHTML={{ __html: body }}
-          />
+          {body !== null && (
+            <div
+              className="email-body"
+              dangerouslySetInnerHTML={{ __html: body }}
+            />
+          )}
           {gmail_id && (
             <a href={`https://mail.google.com/mail/u/0/#search/${encodeURIComponent(subject)}`}
               target="_blank"
@@ -18,13 +18,13 @@ function FolderScreen({ folder, onBack, onLogout }) {
         <h1 className='title'>{folder}</h1>
         <div id="email-list">
           {emails.length > 0 ? (
-            emails.map((email, index) => (
+            emails.map((email) => (
               <EmailCard
-                key={index}
+                key={email.gmail_id}
                 subject={email.subject}
                 from={email.from}
                 category={email.category}
-                body={email.body}
+                snippet={email.snippet}
                 currentFolder={folder}
                 gmail_id={email.gmail_id}
               />
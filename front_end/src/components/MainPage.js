@@ -1,11 +1,16 @@
 import React, { useState, useEffect } from 'react';
 import Navbar from './NavBar';
-import { saveData, loadData, STORAGE_KEYS } from '../utils/storage';
+import { loadData, STORAGE_KEYS } from '../utils/storage';
+import { refreshEmails } from '../utils/email';
+
+// How often to ask the backend whether new mail was synced (cheap, no IMAP involved)
+const STATUS_POLL_MS = 30000;
 
 function MainPage({ onLogout, onFolderSelect }) {
   const [folders, setFolders] = useState([]);
   const [emailCounts, setEmailCounts] = useState({});
   const [loading, setLoading] = useState(false);
+  const [streamed, setStreamed] = useState(0);
 
   const defaultFolders = ['Personal', 'Promotional', 'Urgent', 'Work'];
 
@@ -27,6 +32,44 @@ function MainPage({ onLogout, onFolderSelect }) {
     updateFolderUI(storedEmails);
   }, []);
 
+  const fetchMailboxStatus = async (userEmail) => {
+    const response = await fetch(
+      `http://127.0.0.1:5000/mailbox-status?email=${encodeURIComponent(userEmail)}`
+    );
+    return response.json();
+  };
+
+  const fetchCategorizedEmails = async (userEmail) => {
+    // Folder counts grow as the first sync streams in
+    const onProgress = (partialEmails) => {
+      updateFolderUI(partialEmails);
+      setStreamed(Object.values(partialEmails).reduce((total, emails) => total + emails.length, 0));
+    };
+    const categorizedEmails = await refreshEmails(userEmail, onProgress);
+    if (!categorizedEmails.error) {
+      updateFolderUI(categorizedEmails); // ✅ refresh folders + counts
+    }
+    return categorizedEmails;
+  };
+
+  // Pick up mail the backend synced on its own (IMAP IDLE) without a button press
+  useEffect(() => {
+    const user = loadData(STORAGE_KEYS.USER, {});
+    if (!user.email) return undefined;
+
+    const interval = setInterval(async () => {
+      try {
+        const status = await fetchMailboxStatus(user.email);
+        if (status.synced && status.token !== loadData(STORAGE_KEYS.SYNC_TOKEN, null)) {
+          await fetchCategorizedEmails(user.email);
+        }
+      } catch (error) {
+        console.error("Error checking mailbox status:", error);
+      }
+    }, STATUS_POLL_MS);
+    return () => clearInterval(interval);
+  }, []);
+
   const handleSortEmails = async () => {
     const user = loadData(STORAGE_KEYS.USER, {});
     if (!user.email) {
@@ -35,12 +78,10 @@ function MainPage({ onLogout, onFolderSelect }) {
     }
 
     setLoading(true);
+    setStreamed(0);
 
     try {
-      const response = await fetch(
-        `http://127.0.0.1:5000/update-emails?email=${encodeURIComponent(user.email)}`
-      );
-      const categorizedEmails = await response.json();
+      const categorizedEmails = await fetchCategorizedEmails(user.email);
 
       console.log("🚀 RESPONSE FROM BACKEND:", categorizedEmails);
 
@@ -49,8 +90,6 @@ function MainPage({ onLogout, onFolderSelect }) {
         return;
       }
 
-      saveData(STORAGE_KEYS.EMAILS, categorizedEmails);
-      updateFolderUI(categorizedEmails); // ✅ refresh folders + counts
       alert("Emails sorted successfully!");
     } catch (error) {
       console.error("Error sorting emails:", error);
@@ -63,7 +102,7 @@ function MainPage({ onLogout, onFolderSelect }) {
     <>
       <Navbar onLogout={onLogout} />
 
-      {loading && (
+      {loading && streamed === 0 && (
         <div className="loading-overlay">
           <div className="spinner" />
           <p>Sorting emails, please wait...</p>
@@ -72,7 +111,10 @@ function MainPage({ onLogout, onFolderSelect }) {
 
       <div className="container">
         <h1 className="title">Email Categories</h1>
-        <button onClick={handleSortEmails}>Sort Emails</button>
+        <button onClick={handleSortEmails} disabled={loading}>Sort Emails</button>
+        {loading && streamed > 0 && (
+          <p className="sort-progress">Sorting emails... {streamed} so far</p>
+        )}
 
         <div id="folder-list">
           {folders.length > 0 ? (
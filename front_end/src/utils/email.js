@@ -10,6 +10,114 @@ export async function updateEmails() {
   }
 }
 
+// Merge a /sync response into the stored { category: [emails] } object
+export function applyDelta(categorizedEmails, delta) {
+  const changed = new Set([
+    ...delta.removed,
+    ...delta.recategorized.map(email => email.gmail_id),
+  ]);
+  const merged = {};
+  if (!delta.reset) {
+    Object.entries(categorizedEmails).forEach(([category, emails]) => {
+      merged[category] = emails.filter(email => !changed.has(email.gmail_id));
+    });
+  }
+  [...delta.added, ...delta.recategorized].forEach(email => {
+    (merged[email.category] = merged[email.category] || []).push(email);
+  });
+  Object.keys(merged).forEach(category => {
+    if (merged[category].length === 0) {
+      delete merged[category];
+    } else {
+      merged[category].sort((a, b) => a.uid - b.uid);
+    }
+  });
+  return merged;
+}
+
+// Only what changed since the stored sync token travels; bodies are fetched on open
+export async function syncEmails(userEmail) {
+  const token = loadData(STORAGE_KEYS.SYNC_TOKEN, null);
+  const params = new URLSearchParams({ email: userEmail });
+  if (token) {
+    params.set('token', token);
+  }
+  const response = await fetch(`http://127.0.0.1:5000/sync?${params}`);
+  const delta = await response.json();
+  if (delta.error) {
+    return delta;
+  }
+  const categorizedEmails = applyDelta(loadEmails(), delta);
+  saveData(STORAGE_KEYS.EMAILS, categorizedEmails);
+  saveData(STORAGE_KEYS.SYNC_TOKEN, delta.token);
+  return categorizedEmails;
+}
+
+// Read the NDJSON stream of /update-emails, calling onEmail as each email is categorized.
+// Resolves with the final "done" (or "error") event data.
+export async function streamEmails(userEmail, onEmail) {
+  const params = new URLSearchParams({ email: userEmail, stream: 'ndjson' });
+  const response = await fetch(`http://127.0.0.1:5000/update-emails?${params}`);
+  if (!response.ok) {
+    return response.json();
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  let result = { error: 'Stream ended early' };
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.filter(Boolean).forEach(line => {
+      const { event, data } = JSON.parse(line);
+      if (event === 'email') {
+        onEmail(data);
+      } else {
+        result = data;
+      }
+    });
+    if (done) {
+      return result;
+    }
+  }
+}
+
+// First sync streams the window so folders fill in progressively; later ones are deltas
+export async function refreshEmails(userEmail, onProgress) {
+  if (loadData(STORAGE_KEYS.SYNC_TOKEN, null)) {
+    return syncEmails(userEmail);
+  }
+
+  const categorizedEmails = {};
+  const result = await streamEmails(userEmail, email => {
+    (categorizedEmails[email.category] = categorizedEmails[email.category] || []).push(email);
+    onProgress({ ...categorizedEmails });
+  });
+  if (result.error) {
+    return result;
+  }
+  saveData(STORAGE_KEYS.EMAILS, categorizedEmails);
+  if (result.token) {
+    saveData(STORAGE_KEYS.SYNC_TOKEN, result.token);
+  }
+  return categorizedEmails;
+}
+
+// Bodies are sanitized by the backend on first open, so they are fetched per email
+export async function fetchEmailBody(userEmail, gmailId) {
+  const response = await fetch(
+    `http://127.0.0.1:5000/email-body?email=${encodeURIComponent(userEmail)}&gmail_id=${encodeURIComponent(gmailId)}`
+  );
+  const data = await response.json();
+  if (data.error) {
+    throw new Error(data.error);
+  }
+  return data.body;
+}
+
 export function loadEmails() {
   return loadData(STORAGE_KEYS.EMAILS, {});
 }
@@ -2,7 +2,8 @@ export const STORAGE_KEYS = {
     FOLDERS: 'folders',
     EMAILS: 'emails',
     DARK_MODE: 'darkMode',
-    USER: 'user'
+    USER: 'user',
+    SYNC_TOKEN: 'syncToken'
   };
   
   export function saveData(key, value) {
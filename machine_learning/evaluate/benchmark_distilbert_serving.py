@@ -0,0 +1,93 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.metrics import accuracy_score
+from transformers import DistilBertForSequenceClassification, DistilBertTokenizerFast
+from machine_learning.predict.distilbert_runtime import LABELS, TEXT_COLUMN, DistilBertRuntime
+from utils import load_config, load_dataset
+
+# Load configuration at the global level
+CONFIG = load_config()
+
+TEST_DATA_PATH = CONFIG["paths"]["data"]["test_set"]
+DISTILBERT_MODEL_PATH = CONFIG["paths"]["models"]["distilbert"]["checkpoints"]
+DISTILBERT_TOKENIZER_PATH = CONFIG["paths"]["models"]["distilbert"]["tokenizer"]
+EXPORTED_MODELS = ["distilbert_int8", "distilbert_onnx"]
+MAX_LENGTH = CONFIG["training"]["max_length"]
+BATCH_SIZE = CONFIG["serving"]["distilbert_batch_size"]
+
+
+def fp32_runtime(model_path, tokenizer_path):
+    """
+    The fine-tuned checkpoint as-is, wrapped in the serving runtime for a like-for-like comparison.
+    """
+    model = DistilBertForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    def run(input_ids, attention_mask):
+        with torch.inference_mode():
+            return model(
+                input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)
+            ).logits.numpy()
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained(tokenizer_path)
+    return DistilBertRuntime(run, tokenizer, labels=LABELS, max_length=MAX_LENGTH, batch_size=BATCH_SIZE)
+
+
+def per_email_latency(model, texts, samples=200):
+    """
+    Median and p99 latency (in ms) of categorizing a single email, as the server does.
+    """
+    timings = []
+    for text in texts[:samples]:
+        start = time.perf_counter()
+        model.predict([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def benchmark_distilbert_serving():
+    """
+    Compare the fp32 checkpoint with the exported int8 artifacts on per-email latency,
+    batch throughput, accuracy and agreement with the fp32 predictions.
+    """
+    print("Loading test data...")
+    test_data = load_dataset(TEST_DATA_PATH, columns=[TEXT_COLUMN, "label"])
+    texts, y_test = list(test_data[TEXT_COLUMN]), test_data["label"]
+
+    models = [("fp32 checkpoint", fp32_runtime(DISTILBERT_MODEL_PATH, DISTILBERT_TOKENIZER_PATH))]
+    for name in EXPORTED_MODELS:
+        path = CONFIG["paths"]["models"][name]
+        if not os.path.exists(path):
+            print(f"Skipping {name}: {path} not found (run machine_learning.predict.export_distilbert)")
+            continue
+        models.append((name, DistilBertRuntime.load(path)))
+
+    rows = []
+    fp32_pred, fp32_accuracy = None, None
+    for name, model in models:
+        print(f"Benchmarking {name}...")
+        p50, p99 = per_email_latency(model, texts)
+        start = time.perf_counter()
+        y_pred = model.predict(texts)
+        elapsed = time.perf_counter() - start
+        accuracy = accuracy_score(y_test, y_pred)
+        if fp32_pred is None:
+            fp32_pred, fp32_accuracy = y_pred, accuracy
+        rows.append({
+            "Model": name,
+            "Predict p50 (ms)": round(p50, 2),
+            "Predict p99 (ms)": round(p99, 2),
+            "Throughput (emails/s)": round(len(texts) / elapsed, 1),
+            "Accuracy": round(accuracy, 4),
+            "Accuracy delta": round(accuracy - fp32_accuracy, 4),
+            "Agreement with fp32": round(float(np.mean(y_pred == fp32_pred)), 4),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    benchmark_distilbert_serving()
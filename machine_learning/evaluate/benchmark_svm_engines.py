@@ -0,0 +1,94 @@
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.svm import SVC
+from machine_learning.predict.linear_model import LinearEmailClassifier
+from machine_learning.training.train_svm import build_linear_svm
+from machine_learning.vectorizers.feature_cache import get_feature_matrix
+from utils import load_config
+
+# Load configuration at the global level
+CONFIG = load_config()
+
+TRAIN_DATA_PATH = CONFIG["paths"]["data"]["train_set"]
+TEST_DATA_PATH = CONFIG["paths"]["data"]["test_set"]
+SVM_MODEL_PATH = CONFIG["paths"]["models"]["svm"]
+VECTORIZER_PATH = CONFIG["paths"]["models"]["tfidf_vectorizer"]
+FEATURE_CACHE_DIR = CONFIG["paths"]["data"]["features"]
+SVM_KERNEL = CONFIG["training"]["svm_kernel"]
+SVM_C = CONFIG["training"]["svm_c"]
+
+
+def time_training(build_model, X, y):
+    """
+    Fit a model and return it with the wall-clock training time in seconds.
+    """
+    start = time.perf_counter()
+    model = build_model()
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
+
+def per_email_latency(model, X, samples=200):
+    """
+    Median and p99 latency (in ms) of predicting a single email, as the server does.
+    """
+    timings = []
+    for i in range(min(samples, X.shape[0])):
+        row = X[i]
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def benchmark_svm_engines():
+    """
+    Compare the served libsvm SVC (svm.pkl), a freshly trained SVC(probability=True) and
+    the calibrated linear engine on training time, per-email latency and test accuracy.
+    """
+    print("Loading features...")
+    X_train, y_train = get_feature_matrix(TRAIN_DATA_PATH, VECTORIZER_PATH, FEATURE_CACHE_DIR)
+    X_test, y_test = get_feature_matrix(TEST_DATA_PATH, VECTORIZER_PATH, FEATURE_CACHE_DIR)
+
+    results = []
+
+    with open(SVM_MODEL_PATH, "rb") as f:
+        current_svm = pickle.load(f)
+    results.append(("svm.pkl (current)", None, current_svm))
+
+    print("Training SVC(probability=True)...")
+    svc, svc_time = time_training(lambda: SVC(kernel=SVM_KERNEL, C=SVM_C, probability=True), X_train, y_train)
+    results.append(("libsvm SVC", svc_time, svc))
+
+    print("Training calibrated LinearSVC...")
+    calibrated, linear_time = time_training(lambda: build_linear_svm(SVM_C), X_train, y_train)
+    linear = LinearEmailClassifier.from_calibrated(calibrated)
+    results.append(("linear engine", linear_time, linear))
+
+    # The exported weights must reproduce the scikit-learn model exactly
+    assert (linear.predict(X_test) == calibrated.predict(X_test)).all()
+    assert np.allclose(linear.predict_proba(X_test), calibrated.predict_proba(X_test))
+
+    rows = []
+    for name, train_time, model in results:
+        p50, p99 = per_email_latency(model, X_test)
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        batch_ms = (time.perf_counter() - start) * 1000
+        rows.append({
+            "Model": name,
+            "Train (s)": round(train_time, 3) if train_time is not None else "-",
+            "Predict p50 (ms)": round(p50, 3),
+            "Predict p99 (ms)": round(p99, 3),
+            f"Batch of {X_test.shape[0]} (ms)": round(batch_ms, 2),
+            "Accuracy": round(accuracy_score(y_test, y_pred), 4),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    benchmark_svm_engines()
@@ -1,10 +1,14 @@
+import time
+import numpy as np
 import pandas as pd
 import torch
 from sklearn.metrics import classification_report, confusion_matrix
 from transformers import DistilBertTokenizer, DistilBertForSequenceClassification
+from machine_learning.predict.distilbert_runtime import TEXT_COLUMN
+from machine_learning.vectorizers.feature_cache import get_feature_matrix
 from utils import (
     load_config,
-    get_trained_tfidf_vectorizer,
+    load_dataset,
     get_trained_logistic_regression_model,
     get_trained_naive_bayes_model,
     get_trained_svm_model,
@@ -17,25 +21,27 @@ CONFIG = load_config()
 
 # Extract paths and parameters
 TEST_DATA_PATH = CONFIG["paths"]["data"]["test_set"]
+VECTORIZER_PATH = CONFIG["paths"]["models"]["tfidf_vectorizer"]
+FEATURE_CACHE_DIR = CONFIG["paths"]["data"]["features"]
 RESULTS_CSV_PATH = CONFIG["paths"]["results"]["model_results"]
 DISTILBERT_MODEL_PATH = CONFIG["paths"]["models"]["distilbert"]["checkpoints"]
 DISTILBERT_TOKENIZER_PATH = CONFIG["paths"]["models"]["distilbert"]["tokenizer"]
+DISTILBERT_EVAL_BATCH_SIZE = CONFIG["training"]["eval_batch_size"]
+DISTILBERT_MAX_LENGTH = CONFIG["training"]["max_length"]
 
-def evaluate_pretrained_model(model, vectorizer, X, y, model_name, results_csv, clear_file=False):
+def evaluate_pretrained_model(model, X_tfidf, y, model_name, results_csv, clear_file=False):
     """
     Evaluate a pre-trained model on a test set and save results to CSV.
 
     Args:
         model: Pre-trained model to evaluate.
-        vectorizer: TF-IDF vectorizer to transform input data.
-        X (pd.Series): Test input data.
-        y (pd.Series): Test labels.
+        X_tfidf (scipy.sparse.csr_matrix): TF-IDF features of the test set (shared by all models).
+        y (np.ndarray): Test labels.
         model_name (str): Name of the model for logging.
         results_csv (str): Path to save evaluation results.
         clear_file (bool): Whether to clear the CSV file before saving.
     """
     print(f"\nEvaluating {model_name}...")
-    X_tfidf = vectorizer.transform(X)
     y_pred = model.predict(X_tfidf)
 
     # Calculate evaluation metrics
@@ -54,7 +60,41 @@ def evaluate_pretrained_model(model, vectorizer, X, y, model_name, results_csv,
     save_evaluation_results(results_csv, model_name, metrics, report, clear_file=clear_file)
 
 
-def evaluate_distilbert(model_path, tokenizer_path, test_data_path, results_csv, clear_file=False):
+def predict_distilbert(model, tokenizer, texts, batch_size=64, max_length=512, device=None):
+    """
+    Predict class indices in mini-batches, never holding more than one padded batch.
+
+    Emails are tokenized once without padding and sorted by length, so each batch
+    is padded only to its own longest email; predictions are returned in input order.
+
+    Args:
+        model: DistilBertForSequenceClassification in eval mode.
+        tokenizer: Matching tokenizer.
+        texts (list): Email texts.
+        batch_size (int): Emails per forward pass (None for a single pass).
+        max_length (int): Truncation length in tokens.
+        device (torch.device): Device the model is on.
+
+    Returns:
+        np.ndarray: Predicted class index per email.
+    """
+    input_ids = tokenizer(list(texts), truncation=True, max_length=max_length)["input_ids"]
+    order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+    batch_size = batch_size or max(len(order), 1)
+    y_pred = np.empty(len(order), dtype=np.int64)
+
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = tokenizer.pad({"input_ids": [input_ids[i] for i in indices]}, return_tensors="pt")
+            batch = {key: val.to(device) for key, val in batch.items()}
+            logits = model(**batch).logits
+            y_pred[indices] = torch.argmax(logits, dim=1).cpu().numpy()
+    return y_pred
+
+
+def evaluate_distilbert(model_path, tokenizer_path, test_data_path, results_csv, clear_file=False,
+                        batch_size=64, max_length=512):
     """
     Evaluate a fine-tuned DistilBERT model on the test set.
 
@@ -64,10 +104,12 @@ def evaluate_distilbert(model_path, tokenizer_path, test_data_path, results_csv,
         test_data_path (str): Path to the test dataset.
         results_csv (str): Path to save evaluation results.
         clear_file (bool): Whether to clear the CSV file before saving.
+        batch_size (int): Emails per forward pass (memory is bounded by one padded batch).
+        max_length (int): Truncation length in tokens.
     """
     print("Loading test data...")
-    test_data = pd.read_csv(test_data_path)
-    X_test, y_test = test_data["processed_content"], test_data["label"]
+    test_data = load_dataset(test_data_path, columns=[TEXT_COLUMN, "label"])
+    X_test, y_test = test_data[TEXT_COLUMN], test_data["label"]
 
     print("Loading model and tokenizer...")
     model = DistilBertForSequenceClassification.from_pretrained(model_path)
@@ -79,20 +121,11 @@ def evaluate_distilbert(model_path, tokenizer_path, test_data_path, results_csv,
     model.to(device)
     model.eval()
 
-    print("Tokenizing test data...")
-    test_encodings = tokenizer(
-        list(X_test),
-        truncation=True,
-        padding=True,
-        max_length=512,
-        return_tensors="pt"
-    )
-    test_encodings = {key: val.to(device) for key, val in test_encodings.items()}
-
-    print("Making predictions...")
-    with torch.no_grad():
-        outputs = model(**test_encodings)
-        y_pred = torch.argmax(outputs.logits, dim=1).cpu().numpy()
+    print(f"Making predictions (batch_size={batch_size})...")
+    start = time.perf_counter()
+    y_pred = predict_distilbert(model, tokenizer, X_test, batch_size=batch_size, max_length=max_length, device=device)
+    elapsed = time.perf_counter() - start
+    print(f"Predicted {len(y_pred)} emails in {elapsed:.1f}s ({len(y_pred) / elapsed:.1f} emails/s)")
 
     # Map predicted labels back to string categories
     label_mapping = {0: "Work", 1: "Personal", 2: "Promotional", 3: "Urgent"}
@@ -123,28 +156,28 @@ def evaluate_distilbert(model_path, tokenizer_path, test_data_path, results_csv,
 
 
 if __name__ == "__main__":
-    print("Loading pre-trained models and vectorizer...")
-    tfidf_vectorizer = get_trained_tfidf_vectorizer()
+    print("Loading pre-trained models...")
     logistic_regression_model = get_trained_logistic_regression_model()
     naive_bayes_model = get_trained_naive_bayes_model()
     svm_model = get_trained_svm_model()
 
-    print("Loading test data...")
-    test_data = pd.read_csv(TEST_DATA_PATH)
-    X_test, y_test = test_data["processed_content"], test_data["label"]
+    print("Loading test features...")
+    # processed_content is the served preprocessor's output, so these features are what the
+    # *_pipeline.pkl artifacts compute from raw text (checked by test_email_pipeline)
+    X_test_tfidf, y_test = get_feature_matrix(TEST_DATA_PATH, VECTORIZER_PATH, FEATURE_CACHE_DIR)
 
     print("Evaluating models...")
     # Evaluate traditional models
     evaluate_pretrained_model(
-        logistic_regression_model, tfidf_vectorizer, X_test, y_test, 
+        logistic_regression_model, X_test_tfidf, y_test,
         "Logistic Regression", RESULTS_CSV_PATH, clear_file=True
     )
     evaluate_pretrained_model(
-        naive_bayes_model, tfidf_vectorizer, X_test, y_test, 
+        naive_bayes_model, X_test_tfidf, y_test,
         "Naive Bayes", RESULTS_CSV_PATH
     )
     evaluate_pretrained_model(
-        svm_model, tfidf_vectorizer, X_test, y_test, 
+        svm_model, X_test_tfidf, y_test,
         "SVM", RESULTS_CSV_PATH
     )
 
@@ -153,7 +186,9 @@ if __name__ == "__main__":
         DISTILBERT_MODEL_PATH,
         DISTILBERT_TOKENIZER_PATH,
         TEST_DATA_PATH,
-        RESULTS_CSV_PATH
+        RESULTS_CSV_PATH,
+        batch_size=DISTILBERT_EVAL_BATCH_SIZE,
+        max_length=DISTILBERT_MAX_LENGTH
     )
 
     print(f"\nModel evaluation completed. Results saved to {RESULTS_CSV_PATH}")
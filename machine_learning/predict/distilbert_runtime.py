@@ -0,0 +1,120 @@
+import json
+import os
+import numpy as np
+
+# Class index -> category, as used when fine-tuning (train_distilbert.py)
+LABELS = ["Work", "Personal", "Promotional", "Urgent"]
+
+# Dataset column DistilBERT is fine-tuned, evaluated and benchmarked on: the
+# LexiconPreprocessor output, which the server also computes from the raw
+# "<subject> <body>" text before calling ``predict`` (the checkpoint was trained on it)
+TEXT_COLUMN = "processed_content"
+
+# Written next to the exported model by export_distilbert.py
+METADATA_FILE = "serving.json"
+
+
+class DistilBertRuntime:
+    """
+    CPU inference for an exported DistilBERT classifier (TorchScript or ONNX Runtime).
+
+    Emails are tokenized without padding, sorted by length and scored in mini-batches
+    padded only to their longest email, so short emails never pay for long ones.
+    The tokenizer and a small metadata file (labels, max_length) live in the same
+    directory as the model file.
+
+    Attributes:
+        classes_ (np.ndarray): Category per output column.
+        max_length (int): Truncation length in tokens.
+        batch_size (int): Emails per forward pass.
+    """
+
+    def __init__(self, run, tokenizer, labels=LABELS, max_length=512, batch_size=32):
+        self._run = run  # (input_ids, attention_mask) int64 arrays -> logits array
+        self.tokenizer = tokenizer
+        self.classes_ = np.asarray(labels)
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+    @classmethod
+    def load(cls, path, num_threads=None):
+        """
+        Load a '.pt' (TorchScript) or '.onnx' (ONNX Runtime) model exported by export_distilbert.py.
+        """
+        from transformers import AutoTokenizer
+
+        directory = os.path.dirname(path)
+        metadata = {}
+        if os.path.exists(os.path.join(directory, METADATA_FILE)):
+            with open(os.path.join(directory, METADATA_FILE), "r") as f:
+                metadata = json.load(f)
+        tokenizer = AutoTokenizer.from_pretrained(directory, use_fast=True)
+
+        if path.endswith(".onnx"):
+            run = _onnx_runner(path, num_threads)
+        else:
+            run = _torchscript_runner(path, num_threads)
+        return cls(
+            run,
+            tokenizer,
+            labels=metadata.get("labels", LABELS),
+            max_length=metadata.get("max_length", 512),
+            batch_size=metadata.get("batch_size", 32),
+        )
+
+    def decision_function(self, texts):
+        """
+        Returns:
+            np.ndarray: Logits, shape (n_texts, n_classes), in input order.
+        """
+        texts = list(texts)
+        input_ids = self.tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+        logits = np.empty((len(texts), len(self.classes_)), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad({"input_ids": [input_ids[i] for i in indices]}, return_tensors="np")
+            logits[indices] = self._run(
+                batch["input_ids"].astype(np.int64), batch["attention_mask"].astype(np.int64)
+            )
+        return logits
+
+    def predict(self, texts):
+        return self.classes_[np.argmax(self.decision_function(texts), axis=1)]
+
+    def predict_proba(self, texts):
+        logits = self.decision_function(texts)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _torchscript_runner(path, num_threads=None):
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    module = torch.jit.load(path, map_location="cpu")
+    module.eval()
+
+    def run(input_ids, attention_mask):
+        with torch.inference_mode():
+            output = module(torch.from_numpy(input_ids), torch.from_numpy(attention_mask))
+        logits = output[0] if isinstance(output, (tuple, list)) else output
+        return logits.numpy()
+
+    return run
+
+
+def _onnx_runner(path, num_threads=None):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def run(input_ids, attention_mask):
+        return session.run(["logits"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+    return run
@@ -0,0 +1,28 @@
+import pickle
+from sklearn.pipeline import Pipeline
+from utils import save_pickle
+
+
+def build_email_pipeline(preprocessor, vectorizer, classifier):
+    """
+    Bundle the fitted preprocessing, TF-IDF and classifier steps into one estimator.
+
+    ``pipeline.predict(["<subject> <body>", ...])`` is the whole path from raw email
+    text to a category, as served by the back end. The evaluation (test_models.py)
+    scores the same fitted vectorizer and classifier on the cached TF-IDF features
+    of processed_content; test_email_pipeline checks that both give the same predictions.
+    """
+    return Pipeline([("preprocess", preprocessor), ("tfidf", vectorizer), ("classifier", classifier)])
+
+
+def save_email_pipeline(classifier, pipeline_path, preprocessor_path, vectorizer_path):
+    """
+    Save a trained classifier together with the preprocessor and vectorizer it was trained on.
+    """
+    with open(preprocessor_path, "rb") as f:
+        preprocessor = pickle.load(f)
+    with open(vectorizer_path, "rb") as f:
+        vectorizer = pickle.load(f)
+
+    print(f"Saving pipeline to: {pipeline_path}")
+    save_pickle(build_email_pipeline(preprocessor, vectorizer, classifier), pipeline_path)
@@ -0,0 +1,117 @@
+# export_distilbert.py
+import argparse
+import json
+import os
+import torch
+from transformers import DistilBertForSequenceClassification, DistilBertTokenizerFast
+from machine_learning.predict.distilbert_runtime import LABELS, METADATA_FILE
+from utils import atomic_output, load_config
+
+
+def load_checkpoint(checkpoint_path):
+    # torchscript=True makes the model return plain tuples, which tracing and ONNX export need
+    model = DistilBertForSequenceClassification.from_pretrained(checkpoint_path, torchscript=True)
+    model.eval()
+    return model
+
+
+def example_inputs(tokenizer, max_length):
+    encodings = tokenizer(
+        ["Team meeting moved to 3pm", "Our biggest sale of the year ends tonight, shop now"],
+        truncation=True, padding=True, max_length=max_length, return_tensors="pt"
+    )
+    return encodings["input_ids"], encodings["attention_mask"]
+
+
+def export_torchscript_int8(model, inputs, output_path):
+    """
+    Dynamically quantize every Linear layer to int8 and save the traced model as TorchScript.
+    """
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, inputs, strict=False)
+    traced = torch.jit.freeze(traced)
+    with atomic_output(output_path) as tmp_path:
+        traced.save(tmp_path)
+
+
+def export_onnx_int8(model, inputs, output_path):
+    """
+    Export the model to ONNX with dynamic batch and sequence axes, then quantize its weights to int8.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fp32_path = output_path.replace(".onnx", ".fp32.onnx")
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"}}
+    torch.onnx.export(
+        model,
+        inputs,
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={**dynamic_axes, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+    with atomic_output(output_path) as tmp_path:
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+
+def export_distilbert(checkpoint_path, tokenizer_path, output_path, max_length=512, batch_size=32):
+    """
+    Export the fine-tuned DistilBERT checkpoint as an int8 CPU serving artifact.
+
+    The format follows the file extension: '.pt' for dynamically quantized
+    TorchScript, '.onnx' for ONNX Runtime with int8 weights. The tokenizer and the
+    serving metadata are saved next to the model (see DistilBertRuntime.load).
+
+    Args:
+        checkpoint_path (str): Fine-tuned model checkpoint.
+        tokenizer_path (str): Tokenizer directory.
+        output_path (str): Path of the exported model file.
+        max_length (int): Truncation length used at serving time.
+        batch_size (int): Emails per forward pass at serving time.
+    """
+    output_dir = os.path.dirname(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Loading checkpoint from: {checkpoint_path}")
+    tokenizer = DistilBertTokenizerFast.from_pretrained(tokenizer_path)
+    model = load_checkpoint(checkpoint_path)
+    inputs = example_inputs(tokenizer, max_length)
+
+    print(f"Exporting int8 model to: {output_path}")
+    if output_path.endswith(".onnx"):
+        export_onnx_int8(model, inputs, output_path)
+    elif output_path.endswith(".pt"):
+        export_torchscript_int8(model, inputs, output_path)
+    else:
+        raise ValueError(f"Unsupported export format: {output_path} (expected .pt or .onnx)")
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, METADATA_FILE), "w") as f:
+        json.dump({"labels": LABELS, "max_length": max_length, "batch_size": batch_size}, f, indent=2)
+    print("Export completed successfully.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export DistilBERT for CPU serving.")
+    parser.add_argument("--format", choices=["torchscript", "onnx", "all"], default="all")
+    args = parser.parse_args()
+
+    print("Loading configuration...")
+    config = load_config()
+
+    checkpoint_path = config["paths"]["models"]["distilbert"]["checkpoints"]
+    tokenizer_path = config["paths"]["models"]["distilbert"]["tokenizer"]
+    max_length = config["training"]["max_length"]
+    batch_size = config["serving"]["distilbert_batch_size"]
+
+    names = {"torchscript": ["distilbert_int8"], "onnx": ["distilbert_onnx"]}.get(
+        args.format, ["distilbert_int8", "distilbert_onnx"]
+    )
+    for name in names:
+        export_distilbert(
+            checkpoint_path, tokenizer_path, config["paths"]["models"][name],
+            max_length=max_length, batch_size=batch_size
+        )
@@ -0,0 +1,93 @@
+import numpy as np
+from utils import atomic_output
+
+
+class LinearEmailClassifier:
+    """
+    A linear classifier (weights plus bias) with sigmoid-calibrated probabilities.
+
+    Scoring a batch is a single sparse dot product, ``X @ coef_.T + intercept_``,
+    instead of libsvm's one-vs-one kernel evaluation. The model is stored as plain
+    NumPy arrays in an ``.npz`` file, so loading it does not depend on the
+    scikit-learn version that trained it.
+
+    With two classes there is a single weight row and sigmoid, scoring
+    ``classes_[1]``, as in scikit-learn's binary linear models.
+
+    Attributes:
+        classes_ (np.ndarray): Class labels, in score column order.
+        coef_ (np.ndarray): Weights, shape (n_classes, n_features), or (1, n_features) for two classes.
+        intercept_ (np.ndarray): Bias per class, shape (n_classes,), or (1,) for two classes.
+        prob_a_ (np.ndarray): Sigmoid slope per weight row (Platt scaling).
+        prob_b_ (np.ndarray): Sigmoid offset per weight row (Platt scaling).
+    """
+
+    def __init__(self, classes, coef, intercept, prob_a, prob_b):
+        self.classes_ = np.asarray(classes)
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64)
+        self.prob_a_ = np.asarray(prob_a, dtype=np.float64)
+        self.prob_b_ = np.asarray(prob_b, dtype=np.float64)
+        expected_rows = 1 if len(self.classes_) == 2 else len(self.classes_)
+        if self.coef_.shape[0] != expected_rows or len(self.prob_a_) != expected_rows:
+            raise ValueError(
+                f"{len(self.classes_)} classes need {expected_rows} weight rows and sigmoids, "
+                f"got {self.coef_.shape[0]} and {len(self.prob_a_)}"
+            )
+        # Transposed copy so scoring is a (n_samples, n_features) @ (n_features, n_classes) product
+        self._weights = np.ascontiguousarray(self.coef_.T)
+
+    @classmethod
+    def from_calibrated(cls, calibrated):
+        """
+        Build a classifier from a fitted ``CalibratedClassifierCV(LinearSVC(), method="sigmoid",
+        ensemble=False)``.
+        """
+        fitted = calibrated.calibrated_classifiers_[0]
+        estimator = fitted.estimator
+        prob_a = [calibrator.a_ for calibrator in fitted.calibrators]
+        prob_b = [calibrator.b_ for calibrator in fitted.calibrators]
+        return cls(calibrated.classes_, estimator.coef_, estimator.intercept_, prob_a, prob_b)
+
+    def decision_function(self, X):
+        """
+        Returns:
+            np.ndarray: Raw scores, shape (n_samples, n_classes), or (n_samples,) scores
+            of ``classes_[1]`` for two classes.
+        """
+        scores = np.asarray(X @ self._weights) + self.intercept_
+        return scores.ravel() if len(self.classes_) == 2 else scores
+
+    def predict(self, X):
+        """
+        Most probable class per row, matching ``CalibratedClassifierCV.predict``.
+        """
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_proba(self, X):
+        """
+        Calibrated class probabilities: a per-class sigmoid of the scores, normalized to sum to one.
+        With two classes, the sigmoid gives ``classes_[1]`` and ``classes_[0]`` gets the rest.
+        """
+        probabilities = 1.0 / (1.0 + np.exp(self.prob_a_ * self.decision_function(X) + self.prob_b_))
+        if len(self.classes_) == 2:
+            return np.column_stack([1.0 - probabilities, probabilities])
+        totals = probabilities.sum(axis=1, keepdims=True)
+        uniform = np.full_like(probabilities, 1.0 / len(self.classes_))
+        return np.divide(probabilities, totals, out=uniform, where=totals > 0)
+
+    def save(self, path):
+        with atomic_output(path) as tmp_path, open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                classes=self.classes_.astype(str),
+                coef=self.coef_,
+                intercept=self.intercept_,
+                prob_a=self.prob_a_,
+                prob_b=self.prob_b_,
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["classes"], data["coef"], data["intercept"], data["prob_a"], data["prob_b"])
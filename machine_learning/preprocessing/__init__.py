@@ -1 +1 @@
-from .text_preprocessing import preprocess_text
+from utils import preprocess_text
@@ -0,0 +1,59 @@
+import re
+from collections import Counter
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Alphabetic runs, the regex counterpart of spaCy's ``token.is_alpha``
+TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class LexiconPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Serving-speed replacement for ``utils.preprocess_text``.
+
+    spaCy only runs at fit time: every training text is processed once and the
+    preprocessor records how often each word survived the POS filter. Words
+    dropped in most of their occurrences (names, greetings, interjections, ...)
+    form the lexicon; at transform time a text is lowercased, split into
+    alphabetic tokens and filtered against that lexicon, with no model loaded.
+    Words never seen in training are kept.
+
+    Trainers and the server both run texts through ``transform``, so they see
+    exactly the same tokens.
+
+    Args:
+        min_keep_ratio (float): Fraction of a word's occurrences spaCy must have kept
+            for the word to be kept.
+    """
+
+    def __init__(self, min_keep_ratio=0.5):
+        self.min_keep_ratio = min_keep_ratio
+
+    def fit(self, X, y=None, processed=None):
+        """
+        Learn the lexicon from raw texts and their spaCy output.
+
+        Args:
+            X (list): Raw texts.
+            processed (list, optional): ``utils.preprocess_texts(X)``, if already computed.
+        """
+        if processed is None:
+            from utils import preprocess_texts
+            processed = preprocess_texts(X)
+
+        seen, kept = Counter(), Counter()
+        for text, clean in zip(X, processed):
+            seen.update(tokenize(text))
+            kept.update(clean.split())
+        self.dropped_ = frozenset(word for word, count in seen.items() if kept[word] < self.min_keep_ratio * count)
+        return self
+
+    def preprocess(self, text):
+        dropped = self.dropped_
+        return " ".join(token for token in tokenize(text) if token not in dropped)
+
+    def transform(self, X):
+        return [self.preprocess(text) for text in X]
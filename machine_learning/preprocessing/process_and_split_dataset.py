@@ -1,21 +1,33 @@
 # process_and_split_dataset.py
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from utils import load_config, preprocess_text, validate_dataset
+from machine_learning.preprocessing.lexicon_preprocessor import LexiconPreprocessor
+from utils import load_config, preprocess_texts, save_dataset, save_pickle, validate_dataset
 
 
-def process_and_split_dataset(input_file, train_output, test_output, test_size=0.2, random_state=42):
+def process_and_split_dataset(input_file, train_output, test_output, preprocessor_output, test_size=0.2,
+                              random_state=42, n_process=1, batch_size=256, csv_outputs=None):
     """
-    Processes the raw dataset, and splits it into training and test sets.
-    Saves training portion as 'train.csv'
-    Saves testing portion as 'test.csv'
+    Splits the raw dataset into training and test sets, and preprocesses both.
+    Saves training portion as 'train.arrow'
+    Saves testing portion as 'test.arrow'
+    The output format follows the file extension (see utils.save_dataset).
+
+    spaCy runs on the training texts only, to fit the LexiconPreprocessor; both
+    splits are then preprocessed by that preprocessor, which is saved so the
+    served pipeline applies the very same step. Each split keeps the raw
+    'content' (subject + body) next to 'processed_content'.
 
     Args:
         input_file (str): Path to the raw JSON dataset file.
         train_output (str): Path to save the training dataset.
         test_output (str): Path to save the test dataset.
+        preprocessor_output (str): Path to save the fitted LexiconPreprocessor.
         test_size (float): Proportion of data to include in the test set.
         random_state (int): Random state for reproducibility.
+        n_process (int): Number of spaCy worker processes (-1 uses every CPU core).
+        batch_size (int): Number of texts sent to spaCy per batch.
+        csv_outputs (tuple, optional): (train_csv, test_csv) paths for an additional CSV export.
     """
     # Ensure entire JSON dataset contains valid structure
     validate_dataset(input_file)
@@ -24,35 +36,46 @@ def process_and_split_dataset(input_file, train_output, test_output, test_size=0
     data = pd.read_json(input_file)
     print(f"Loaded raw dataset with {len(data)} entries.")
 
-    # Preprocess the 'subject' and 'body' columns
-    print("Preprocessing text...")
-    data['processed_content'] = data.apply(
-        lambda row: preprocess_text(row['subject'] or '') + ' ' + preprocess_text(row['body'] or ''),
-        axis=1
-    )
-
-    # Validate processed content
-    if data['processed_content'].isnull().any():
-        raise ValueError("Found missing values in 'processed_content' after preprocessing.")
+    # Combine 'subject' and 'body' the way the server does
+    data['content'] = [f"{subject or ''} {body or ''}" for subject, body in zip(data['subject'], data['body'])]
 
     # Split the dataset into training and test sets
     print("Splitting dataset into training and test sets...")
     train_df, test_df = train_test_split(
-        data[['label', 'processed_content']],  # Keep only relevant columns
+        data[['label', 'content']],  # Keep only relevant columns
         test_size=test_size,
         random_state=random_state,
         stratify=data['label']
     )
 
+    # Learn which tokens spaCy keeps, from the training texts only
+    print(f"Preprocessing training text with spaCy (n_process={n_process}, batch_size={batch_size})...")
+    train_texts = train_df['content'].tolist()
+    processed = preprocess_texts(train_texts, n_process=n_process, batch_size=batch_size)
+    preprocessor = LexiconPreprocessor().fit(train_texts, processed=processed)
+    print(f"Lexicon drops {len(preprocessor.dropped_)} words")
+
+    print(f"Saving preprocessor to: {preprocessor_output}")
+    save_pickle(preprocessor, preprocessor_output)
+
+    train_df = train_df.assign(processed_content=preprocessor.transform(train_texts))
+    test_df = test_df.assign(processed_content=preprocessor.transform(test_df['content']))
+
     print(f"Training set size: {len(train_df)}")
     print(f"Test set size: {len(test_df)}")
 
     # Save the datasets
     print(f"Saving training data to: {train_output}")
-    train_df.to_csv(train_output, index=False)
+    save_dataset(train_df, train_output)
 
     print(f"Saving test data to: {test_output}")
-    test_df.to_csv(test_output, index=False)
+    save_dataset(test_df, test_output)
+
+    if csv_outputs:
+        train_csv, test_csv = csv_outputs
+        print(f"Exporting CSV copies to: {train_csv}, {test_csv}")
+        save_dataset(train_df, train_csv)
+        save_dataset(test_df, test_csv)
 
     print("Processing and splitting complete.")
 
@@ -64,5 +87,14 @@ if __name__ == "__main__":
     dataset_path = config["paths"]["data"]["dataset"]
     train_set_path = config["paths"]["data"]["train_set"]
     test_set_path = config["paths"]["data"]["test_set"]
+    preprocessor_path = config["paths"]["models"]["preprocessor"]
+    n_process = config["training"]["spacy_n_process"]
+    batch_size = config["training"]["spacy_batch_size"]
+    csv_outputs = None
+    if config["training"]["export_csv"]:
+        csv_outputs = (config["paths"]["data"]["train_set_csv"], config["paths"]["data"]["test_set_csv"])
 
-    process_and_split_dataset(dataset_path, train_set_path, test_set_path)
+    process_and_split_dataset(
+        dataset_path, train_set_path, test_set_path, preprocessor_path,
+        n_process=n_process, batch_size=batch_size, csv_outputs=csv_outputs
+    )
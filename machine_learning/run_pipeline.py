@@ -0,0 +1,363 @@
+# run_pipeline.py
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from machine_learning.vectorizers.feature_cache import feature_cache_path, file_digest
+from utils import load_config
+
+
+class Stage:
+    """
+    One step of the training pipeline.
+
+    Args:
+        name (str): Stage name, used for dependencies and in the state file.
+        func (callable): Module-level function taking the config dict (it must be
+            picklable when the stage runs in the process pool).
+        deps (list): Names of the stages that must run first.
+        inputs (list | callable): Dotted config keys of the files the stage reads
+            (e.g. "paths.data.train_set"), or a function config -> list of paths.
+        outputs (list | callable): Same, for the files the stage writes.
+        params (list): Dotted config keys of the parameters the stage uses.
+        sources (list): Source files whose code determines the stage's result.
+        parallel (bool): Run in the process pool alongside other parallel stages.
+    """
+
+    def __init__(self, name, func, deps=(), inputs=(), outputs=(), params=(), sources=(), parallel=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = list(params)
+        self.sources = list(sources)
+        self.parallel = parallel
+
+
+def config_value(config, key):
+    value = config
+    for part in key.split("."):
+        value = value[part]
+    return value
+
+
+def _paths(spec, config):
+    if callable(spec):
+        return list(spec(config))
+    return [config_value(config, key) for key in spec]
+
+
+def stage_fingerprint(stage, config):
+    """
+    Content hash of everything a stage's result depends on: its input files, the
+    config parameters it reads and its source code.
+    """
+    digest = hashlib.sha256()
+    for path in _paths(stage.inputs, config) + stage.sources:
+        digest.update(f"{path}:{file_digest(path) if os.path.exists(path) else 'missing'}\n".encode())
+    for key in stage.params:
+        digest.update(f"{key}={json.dumps(config_value(config, key), sort_keys=True)}\n".encode())
+    return digest.hexdigest()
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state_path, state):
+    directory = os.path.dirname(state_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def run_pipeline(stages, config, state_path, force=(), max_workers=None, dry_run=False):
+    """
+    Run the stages in dependency order, skipping every stage whose fingerprint
+    matches the last successful run and whose outputs still exist.
+
+    Stages are checked only once their dependencies have finished, so a stage
+    whose upstream re-ran but produced identical files is still skipped.
+    Ready parallel stages run concurrently in one process pool; the others run
+    in this process.
+
+    Args:
+        stages (list): Stage objects; dependencies must refer to stages in the list.
+        config (dict): Loaded configuration.
+        state_path (str): JSON file recording the fingerprint of each completed stage.
+        force (iterable): Stage names to run regardless of their fingerprint ("all" for every stage).
+        max_workers (int): Size of the process pool for parallel stages.
+        dry_run (bool): Only report which stages would run (dependencies of a
+            stale stage are assumed unchanged).
+
+    Returns:
+        dict: Stage name -> "ran", "skipped" or "stale" (dry run).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {unknown}")
+    force = set(by_name) if "all" in force else set(force)
+    if force - set(by_name):
+        raise ValueError(f"Unknown stages: {sorted(force - set(by_name))}")
+
+    state = load_state(state_path)
+    results = {}
+    pending = list(stages)
+    running = {}
+
+    def is_fresh(stage, fingerprint):
+        return (
+            stage.name not in force
+            and state.get(stage.name, {}).get("fingerprint") == fingerprint
+            and all(os.path.exists(path) for path in _paths(stage.outputs, config))
+        )
+
+    def finish(stage, fingerprint, elapsed):
+        state[stage.name] = {"fingerprint": fingerprint, "seconds": round(elapsed, 3), "completed_at": time.time()}
+        save_state(state_path, state)
+        results[stage.name] = "ran"
+        print(f"[{stage.name}] done in {elapsed:.1f}s")
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            progressed = False
+            for stage in [s for s in pending if all(dep in results for dep in s.deps)]:
+                pending.remove(stage)
+                progressed = True
+                fingerprint = stage_fingerprint(stage, config)
+                if is_fresh(stage, fingerprint):
+                    results[stage.name] = "skipped"
+                    print(f"[{stage.name}] up to date, skipping")
+                elif dry_run:
+                    results[stage.name] = "stale"
+                    print(f"[{stage.name}] would run")
+                elif stage.parallel:
+                    print(f"[{stage.name}] starting in the process pool")
+                    future = executor.submit(stage.func, config)
+                    running[future] = (stage, fingerprint, time.perf_counter())
+                else:
+                    print(f"[{stage.name}] running")
+                    start = time.perf_counter()
+                    stage.func(config)
+                    finish(stage, fingerprint, time.perf_counter() - start)
+
+            if running and not progressed:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, fingerprint, start = running.pop(future)
+                    future.result()  # Re-raise the stage's exception
+                    finish(stage, fingerprint, time.perf_counter() - start)
+            elif not running and not progressed and pending:
+                raise ValueError(f"Dependency cycle between stages: {[s.name for s in pending]}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+
+# --- Training stages ---
+
+def process_stage(config):
+    from machine_learning.preprocessing.process_and_split_dataset import process_and_split_dataset
+    data_paths, training = config["paths"]["data"], config["training"]
+    csv_outputs = None
+    if training["export_csv"]:
+        csv_outputs = (data_paths["train_set_csv"], data_paths["test_set_csv"])
+    process_and_split_dataset(
+        data_paths["dataset"], data_paths["train_set"], data_paths["test_set"],
+        config["paths"]["models"]["preprocessor"], test_size=training["test_size"], random_state=training["random_state"],
+        n_process=training["spacy_n_process"], batch_size=training["spacy_batch_size"],
+        csv_outputs=csv_outputs
+    )
+
+
+def vectorizer_stage(config):
+    from machine_learning.vectorizers.train_vectorizer import train_and_save_vectorizer
+    train_and_save_vectorizer(
+        config["paths"]["data"]["train_set"],
+        config["training"]["tfidf_max_features"],
+        tuple(config["training"]["tfidf_ngram_range"]),
+        config["paths"]["models"]["tfidf_vectorizer"]
+    )
+
+
+def features_stage(config):
+    from machine_learning.vectorizers.feature_cache import get_feature_matrix
+    for data_path in (config["paths"]["data"]["train_set"], config["paths"]["data"]["test_set"]):
+        get_feature_matrix(data_path, config["paths"]["models"]["tfidf_vectorizer"], config["paths"]["data"]["features"])
+
+
+def logistic_stage(config):
+    from machine_learning.training.train_logistic import train_logistic_regression
+    train_logistic_regression(
+        config["paths"]["data"]["train_set"],
+        config["training"]["logistic_regression_max_iter"],
+        config["paths"]["models"]["logistic_regression"],
+        config["paths"]["models"]["tfidf_vectorizer"],
+        config["paths"]["data"]["features"],
+        config["paths"]["models"]["preprocessor"],
+        config["paths"]["models"]["logistic_regression_pipeline"]
+    )
+
+
+def naive_bayes_stage(config):
+    from machine_learning.training.train_naive_bayes import train_naive_bayes
+    train_naive_bayes(
+        config["paths"]["data"]["train_set"],
+        config["training"]["naive_bayes_alpha"],
+        config["paths"]["models"]["naive_bayes"],
+        config["paths"]["models"]["tfidf_vectorizer"],
+        config["paths"]["data"]["features"],
+        config["paths"]["models"]["preprocessor"],
+        config["paths"]["models"]["naive_bayes_pipeline"]
+    )
+
+
+def svm_model_path(config):
+    return config["paths"]["models"]["svm_linear" if config["training"]["svm_engine"] == "linear" else "svm"]
+
+
+def svm_stage(config):
+    from machine_learning.training.train_svm import train_svm
+    train_svm(
+        config["paths"]["data"]["train_set"],
+        config["training"]["svm_kernel"],
+        config["training"]["svm_c"],
+        svm_model_path(config),
+        config["paths"]["models"]["tfidf_vectorizer"],
+        config["paths"]["data"]["features"],
+        config["paths"]["models"]["preprocessor"],
+        config["paths"]["models"]["svm_pipeline"],
+        config["training"]["svm_engine"]
+    )
+
+
+def distilbert_stage(config):
+    # torch/transformers are optional: only imported when this stage actually runs
+    import runpy
+    runpy.run_module("machine_learning.training.train_distilbert", run_name="__main__")
+
+
+def feature_cache_paths(config):
+    vectorizer_path = config["paths"]["models"]["tfidf_vectorizer"]
+    cache_dir = config["paths"]["data"]["features"]
+    return [
+        feature_cache_path(config["paths"]["data"][split], vectorizer_path, cache_dir)
+        for split in ("train_set", "test_set")
+    ]
+
+
+def split_outputs(config):
+    outputs = [
+        config["paths"]["data"]["train_set"], config["paths"]["data"]["test_set"], config["paths"]["models"]["preprocessor"]
+    ]
+    if config["training"]["export_csv"]:
+        outputs += [config["paths"]["data"]["train_set_csv"], config["paths"]["data"]["test_set_csv"]]
+    return outputs
+
+
+TRAINER_INPUTS = ["paths.data.train_set", "paths.models.tfidf_vectorizer", "paths.models.preprocessor"]
+PIPELINE_SOURCE = "machine_learning/predict/email_pipeline.py"
+
+
+def build_stages(include_distilbert=False):
+    """
+    The training DAG: process -> vectorizer -> features -> (logistic | naive_bayes | svm),
+    plus process -> distilbert when requested.
+    """
+    stages = [
+        Stage(
+            "process", process_stage,
+            inputs=["paths.data.dataset"], outputs=split_outputs,
+            params=["training.test_size", "training.random_state", "training.export_csv"],
+            sources=[
+                "machine_learning/preprocessing/process_and_split_dataset.py",
+                "machine_learning/preprocessing/lexicon_preprocessor.py",
+                "utils.py",
+            ],
+        ),
+        Stage(
+            "vectorizer", vectorizer_stage, deps=["process"],
+            inputs=["paths.data.train_set"], outputs=["paths.models.tfidf_vectorizer"],
+            params=["training.tfidf_max_features", "training.tfidf_ngram_range"],
+            sources=["machine_learning/vectorizers/train_vectorizer.py"],
+        ),
+        Stage(
+            "features", features_stage, deps=["vectorizer"],
+            inputs=["paths.data.train_set", "paths.data.test_set", "paths.models.tfidf_vectorizer"],
+            outputs=feature_cache_paths,
+            sources=["machine_learning/vectorizers/feature_cache.py"],
+        ),
+        Stage(
+            "logistic", logistic_stage, deps=["features"], parallel=True,
+            inputs=TRAINER_INPUTS,
+            outputs=["paths.models.logistic_regression", "paths.models.logistic_regression_pipeline"],
+            params=["training.logistic_regression_max_iter"],
+            sources=["machine_learning/training/train_logistic.py", PIPELINE_SOURCE],
+        ),
+        Stage(
+            "naive_bayes", naive_bayes_stage, deps=["features"], parallel=True,
+            inputs=TRAINER_INPUTS, outputs=["paths.models.naive_bayes", "paths.models.naive_bayes_pipeline"],
+            params=["training.naive_bayes_alpha"],
+            sources=["machine_learning/training/train_naive_bayes.py", PIPELINE_SOURCE],
+        ),
+        Stage(
+            "svm", svm_stage, deps=["features"], parallel=True,
+            inputs=TRAINER_INPUTS,
+            outputs=lambda config: [svm_model_path(config), config["paths"]["models"]["svm_pipeline"]],
+            params=["training.svm_engine", "training.svm_kernel", "training.svm_c"],
+            sources=[
+                "machine_learning/training/train_svm.py",
+                "machine_learning/predict/linear_model.py",
+                PIPELINE_SOURCE,
+            ],
+        ),
+    ]
+    if include_distilbert:
+        stages.append(Stage(
+            "distilbert", distilbert_stage, deps=["process"], parallel=True,
+            inputs=["paths.data.train_set"], outputs=["paths.models.distilbert.tokenizer"],
+            params=[
+                "training.num_of_classes", "training.random_state", "training.num_epochs",
+                "training.batch_size", "training.max_length", "training.warmup_steps", "training.weight_decay",
+            ],
+            sources=["machine_learning/training/train_distilbert.py", "machine_learning/predict/distilbert_runtime.py"],
+        ))
+    return stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping up-to-date stages.")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE",
+                        help="Re-run these stages even if unchanged ('all' for every stage).")
+    parser.add_argument("--distilbert", action="store_true", help="Also fine-tune DistilBERT (needs torch).")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size for the trainers.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run.")
+    args = parser.parse_args()
+
+    print("Loading configuration...")
+    config = load_config()
+
+    start = time.perf_counter()
+    results = run_pipeline(
+        build_stages(include_distilbert=args.distilbert),
+        config,
+        config["paths"]["data"]["pipeline_state"],
+        force=args.force,
+        max_workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    print(f"\nPipeline finished in {time.perf_counter() - start:.1f}s")
+    for name, result in results.items():
+        print(f"  {name:<12} {result}")
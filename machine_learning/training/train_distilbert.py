@@ -1,8 +1,18 @@
+import itertools
+import numpy as np
 import pandas as pd
 import torch
 from sklearn.model_selection import train_test_split
-from transformers import DistilBertTokenizer, DistilBertForSequenceClassification, Trainer, TrainingArguments
-from utils import load_config
+from transformers import (
+    DataCollatorWithPadding,
+    DistilBertTokenizer,
+    DistilBertForSequenceClassification,
+    Trainer,
+    TrainingArguments,
+)
+from transformers.trainer_pt_utils import LengthGroupedSampler
+from machine_learning.predict.distilbert_runtime import TEXT_COLUMN
+from utils import load_config, load_dataset
 
 # Load configuration at the global level
 CONFIG = load_config()
@@ -19,6 +29,7 @@ BATCH_SIZE = CONFIG["training"]["batch_size"]
 WARMUP_STEPS = CONFIG["training"]["warmup_steps"]
 WEIGHT_DECAY = CONFIG["training"]["weight_decay"]
 LOGGING_STEPS = CONFIG["training"]["logging_steps"]
+MAX_LENGTH = CONFIG["training"]["max_length"]
 
 # Check if CUDA (GPU) is available
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -26,32 +37,53 @@ print(f"Using device: {device}")
 
 # Tokenizer utility
 def tokenize_data(data, tokenizer):
+    # No padding here: batches are padded to their own longest example by the data collator
     return tokenizer(
-        list(data["processed_content"]),
+        list(data[TEXT_COLUMN]),
         truncation=True,
-        padding=True,
-        max_length=512,
-        return_tensors="pt"
+        max_length=MAX_LENGTH,
     )
 
 # PyTorch Dataset
 class EmailDataset(torch.utils.data.Dataset):
+    """
+    Pre-tokenized emails stored unpadded: one flat array of token IDs plus the
+    offset of each email, so an item is a slice rather than a rebuilt tensor dict.
+    """
     def __init__(self, encodings, labels):
-        self.encodings = encodings
-        self.labels = labels
+        input_ids = encodings["input_ids"]
+        self.lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.input_ids = np.fromiter(itertools.chain.from_iterable(input_ids), dtype=np.int64, count=self.offsets[-1])
+        self.labels = np.asarray(labels, dtype=np.int64)
 
     def __len__(self):
         return len(self.labels)
 
     def __getitem__(self, idx):
-        item = {key: val[idx] for key, val in self.encodings.items()}
-        item["labels"] = self.labels[idx]
-        return item
+        return {
+            "input_ids": self.input_ids[self.offsets[idx]:self.offsets[idx + 1]],
+            "labels": self.labels[idx],
+        }
+
+class LengthGroupedTrainer(Trainer):
+    """
+    Trainer whose ``group_by_length`` sampler uses the lengths ``EmailDataset`` computed
+    while tokenizing. The stock sampler only reads lengths from a ``datasets.Dataset``
+    column and otherwise measures every item of the training set again.
+    """
+    def _get_train_sampler(self, *args, **kwargs):
+        if not self.args.group_by_length or not hasattr(self.train_dataset, "lengths"):
+            return super()._get_train_sampler(*args, **kwargs)
+        return LengthGroupedSampler(
+            self.args.train_batch_size * self.args.gradient_accumulation_steps,
+            lengths=self.train_dataset.lengths.tolist(),
+        )
 
 # Data preparation utility
 def load_and_prepare_data(data_path, tokenizer, test_size=0.15, random_state=42):
     print("Loading and splitting data...")
-    data = pd.read_csv(data_path)
+    data = load_dataset(data_path, columns=[TEXT_COLUMN, "label"])
 
     # Map labels to integers
     label_mapping = { "Work": 0, "Personal": 1, "Promotional": 2, "Urgent": 3 }
@@ -72,10 +104,7 @@ def load_and_prepare_data(data_path, tokenizer, test_size=0.15, random_state=42)
     train_encodings = tokenize_data(train_df, tokenizer)
     val_encodings = tokenize_data(val_df, tokenizer)
 
-    train_labels = torch.tensor(train_df["label"].values, dtype=torch.long)  # Explicitly set dtype
-    val_labels = torch.tensor(val_df["label"].values, dtype=torch.long)
-
-    return EmailDataset(train_encodings, train_labels), EmailDataset(val_encodings, val_labels)
+    return EmailDataset(train_encodings, train_df["label"].values), EmailDataset(val_encodings, val_df["label"].values)
 
 if __name__ == "__main__":
     print("Loading tokenizer...")
@@ -83,6 +112,8 @@ if __name__ == "__main__":
 
     print("Preparing datasets...")
     train_dataset, val_dataset = load_and_prepare_data(TRAIN_DATA_PATH, tokenizer, random_state=RANDOM_STATE)
+    padded_tokens = len(train_dataset) * int(train_dataset.lengths.max())
+    print(f"Training tokens: {int(train_dataset.lengths.sum())} (vs {padded_tokens} padded to the longest email)")
 
     print("Loading model...")
     model = DistilBertForSequenceClassification.from_pretrained(
@@ -104,15 +135,17 @@ if __name__ == "__main__":
         save_strategy="epoch",
         metric_for_best_model="eval_loss",     # Metric used to determine the best model
         greater_is_better=False,               # Lower `eval_loss` is better
-        load_best_model_at_end=True
+        load_best_model_at_end=True,
+        group_by_length=True                   # Batch emails of similar length to minimize padding
     )
 
     print("Initializing Trainer...")
-    trainer = Trainer(
+    trainer = LengthGroupedTrainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
-        eval_dataset=val_dataset
+        eval_dataset=val_dataset,
+        data_collator=DataCollatorWithPadding(tokenizer)  # Pad each batch to its longest email
     )
 
     print("Starting training...")
@@ -1,12 +1,12 @@
 # train_naive_bayes.py
-import pandas as pd
 from sklearn.naive_bayes import MultinomialNB
-import pickle
-from utils import load_config, validate_data
+from machine_learning.predict.email_pipeline import save_email_pipeline
+from machine_learning.vectorizers.feature_cache import get_feature_matrix
+from utils import load_config, save_pickle
 
 
 def train_naive_bayes(
-    train_data_path, naive_bayes_alpha, model_path, vectorizer_path
+    train_data_path, naive_bayes_alpha, model_path, vectorizer_path, feature_cache_dir, preprocessor_path, pipeline_path
 ):
     """
     Train a Naive Bayes model using a pre-trained TF-IDF vectorizer.
@@ -16,24 +16,13 @@ def train_naive_bayes(
         naive_bayes_alpha (float): Smoothing parameter for Naive Bayes.
         model_path (str): Path to save the trained model.
         vectorizer_path (str): Path to load the pre-trained TF-IDF vectorizer.
+        feature_cache_dir (str): Directory of the cached TF-IDF feature matrices.
+        preprocessor_path (str): Path to load the fitted LexiconPreprocessor.
+        pipeline_path (str): Path to save the preprocessor + vectorizer + model pipeline served by the back end.
     """
-    # --- Load Training Data ---
-    print(f"Loading training data from: {train_data_path}")
-    train_data = pd.read_csv(train_data_path)
-
-    # --- Validate Data ---
-    validate_data(train_data, required_columns=['processed_content', 'label'])  # Ensure data is valid
-
-    X_train, y_train = train_data['processed_content'], train_data['label']
-
-    # --- Load Pre-trained Vectorizer ---
-    print(f"Loading pre-trained vectorizer from: {vectorizer_path}")
-    with open(vectorizer_path, "rb") as f:
-        tfidf = pickle.load(f)
-
-    # --- Transform Data ---
-    print("Transforming training data using the pre-trained vectorizer...")
-    X_train_tfidf = tfidf.transform(X_train)
+    # --- Load Training Features (shared TF-IDF cache) ---
+    print(f"Loading training features for: {train_data_path}")
+    X_train_tfidf, y_train = get_feature_matrix(train_data_path, vectorizer_path, feature_cache_dir)
 
     # --- Train Naive Bayes Model ---
     print(f"Training Naive Bayes model: alpha={naive_bayes_alpha}")
@@ -42,8 +31,8 @@ def train_naive_bayes(
 
     # --- Save Model ---
     print(f"Saving trained model to: {model_path}")
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    save_pickle(model, model_path)
+    save_email_pipeline(model, pipeline_path, preprocessor_path, vectorizer_path)
 
     print("Naive Bayes model training completed and saved successfully.")
 
@@ -57,6 +46,9 @@ if __name__ == "__main__":
     naive_bayes_alpha = config["training"]["naive_bayes_alpha"]
     model_path = config["paths"]["models"]["naive_bayes"]
     vectorizer_path = config["paths"]["models"]["tfidf_vectorizer"]
+    feature_cache_dir = config["paths"]["data"]["features"]
+    preprocessor_path = config["paths"]["models"]["preprocessor"]
+    pipeline_path = config["paths"]["models"]["naive_bayes_pipeline"]
 
     # Call the function with parsed parameters
     print("Starting Naive Bayes training...")
@@ -64,6 +56,9 @@ if __name__ == "__main__":
         train_data_path,
         naive_bayes_alpha,
         model_path,
-        vectorizer_path
+        vectorizer_path,
+        feature_cache_dir,
+        preprocessor_path,
+        pipeline_path
     )
     print("Naive Bayes training completed successfully.")
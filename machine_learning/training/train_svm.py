@@ -1,49 +1,70 @@
-import pandas as pd
-from sklearn.svm import SVC
-import pickle
-from utils import load_config, validate_data
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.svm import SVC, LinearSVC
+from machine_learning.predict.linear_model import LinearEmailClassifier
+from machine_learning.predict.email_pipeline import save_email_pipeline
+from machine_learning.vectorizers.feature_cache import get_feature_matrix
+from utils import load_config, save_pickle
+
+
+def build_linear_svm(svm_c, calibration_cv=3, random_state=42):
+    """
+    Build a linear SVM (liblinear) with sigmoid-calibrated probabilities.
+
+    Calibration is fitted on cross-validated scores, but with ``ensemble=False``
+    a single LinearSVC is trained on all data, so the result exports to one
+    weight matrix and bias vector (see ``LinearEmailClassifier``).
+    """
+    return CalibratedClassifierCV(
+        LinearSVC(C=svm_c, random_state=random_state, dual="auto"),
+        method="sigmoid",
+        cv=calibration_cv,
+        ensemble=False,
+    )
 
 
 def train_svm(
-    train_data_path, svm_kernel, svm_c, model_path, vectorizer_path
+    train_data_path, svm_kernel, svm_c, model_path, vectorizer_path, feature_cache_dir,
+    preprocessor_path, pipeline_path, svm_engine="libsvm"
 ):
     """
     Train an SVM model using a pre-trained TF-IDF vectorizer.
 
     Args:
         train_data_path (str): Path to the training dataset.
-        svm_kernel (str): Kernel type for the SVM (e.g., 'linear', 'rbf').
+        svm_kernel (str): Kernel type for the SVM (e.g., 'linear', 'rbf'). Only used by the 'libsvm' engine.
         svm_c (float): Regularization parameter for SVM.
         model_path (str): Path to save the trained model.
         vectorizer_path (str): Path to load the pre-trained TF-IDF vectorizer.
+        feature_cache_dir (str): Directory of the cached TF-IDF feature matrices.
+        preprocessor_path (str): Path to load the fitted LexiconPreprocessor.
+        pipeline_path (str): Path to save the preprocessor + vectorizer + model pipeline served by the back end.
+        svm_engine (str): 'libsvm' to pickle a probability-enabled SVC, or 'linear' to save
+            a calibrated LinearEmailClassifier (.npz) that is scored as a single dot product.
     """
-    # --- Load Training Data ---
-    print(f"Loading training data from: {train_data_path}")
-    train_data = pd.read_csv(train_data_path)
-
-    # --- Validate Data ---
-    validate_data(train_data, required_columns=['processed_content', 'label'])  # Ensure data is valid
-
-    X_train, y_train = train_data['processed_content'], train_data['label']
-
-    # --- Load Pre-trained Vectorizer ---
-    print(f"Loading pre-trained vectorizer from: {vectorizer_path}")
-    with open(vectorizer_path, "rb") as f:
-        tfidf = pickle.load(f)
-
-    # --- Transform Data ---
-    print("Transforming training data using the pre-trained vectorizer...")
-    X_train_tfidf = tfidf.transform(X_train)
+    # --- Load Training Features (shared TF-IDF cache) ---
+    print(f"Loading training features for: {train_data_path}")
+    X_train_tfidf, y_train = get_feature_matrix(train_data_path, vectorizer_path, feature_cache_dir)
 
     # --- Train SVM Model ---
-    print(f"Training SVM model: kernel={svm_kernel}, C={svm_c}")
-    model = SVC(kernel=svm_kernel, C=svm_c, probability=True)
-    model.fit(X_train_tfidf, y_train)
+    if svm_engine == "linear":
+        print(f"Training linear SVM model: C={svm_c}")
+        calibrated = build_linear_svm(svm_c)
+        calibrated.fit(X_train_tfidf, y_train)
+        model = LinearEmailClassifier.from_calibrated(calibrated)
+    elif svm_engine == "libsvm":
+        print(f"Training SVM model: kernel={svm_kernel}, C={svm_c}")
+        model = SVC(kernel=svm_kernel, C=svm_c, probability=True)
+        model.fit(X_train_tfidf, y_train)
+    else:
+        raise ValueError(f"Unknown SVM engine: {svm_engine}")
 
     # --- Save Model ---
     print(f"Saving trained model to: {model_path}")
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    if svm_engine == "linear":
+        model.save(model_path)
+    else:
+        save_pickle(model, model_path)
+    save_email_pipeline(model, pipeline_path, preprocessor_path, vectorizer_path)
 
     print("SVM model training completed and saved successfully.")
 
@@ -56,8 +77,12 @@ if __name__ == "__main__":
     train_data_path = config["paths"]["data"]["train_set"]  # Training dataset path
     svm_kernel = config["training"]["svm_kernel"]
     svm_c = config["training"]["svm_c"]
-    model_path = config["paths"]["models"]["svm"]
+    svm_engine = config["training"]["svm_engine"]
+    model_path = config["paths"]["models"]["svm_linear" if svm_engine == "linear" else "svm"]
     vectorizer_path = config["paths"]["models"]["tfidf_vectorizer"]
+    feature_cache_dir = config["paths"]["data"]["features"]
+    preprocessor_path = config["paths"]["models"]["preprocessor"]
+    pipeline_path = config["paths"]["models"]["svm_pipeline"]
 
     # Call the function with parsed parameters
     print("Starting SVM training...")
@@ -66,6 +91,10 @@ if __name__ == "__main__":
         svm_kernel,
         svm_c,
         model_path,
-        vectorizer_path
+        vectorizer_path,
+        feature_cache_dir,
+        preprocessor_path,
+        pipeline_path,
+        svm_engine
     )
     print("SVM training completed successfully.")
@@ -0,0 +1,131 @@
+# feature_cache.py
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from utils import load_config, load_dataset, validate_data
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_cache_key(data_path, vectorizer_path):
+    """
+    Cache key for the features of a dataset: a hash of the vectorizer plus the data.
+    """
+    digest = hashlib.sha256()
+    digest.update(file_digest(vectorizer_path).encode())
+    digest.update(file_digest(data_path).encode())
+    return digest.hexdigest()[:16]
+
+
+def _cache_path(cache_dir, data_path, key):
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(cache_dir, f"{name}-{key}.npz")
+
+
+def feature_cache_path(data_path, vectorizer_path, cache_dir):
+    """
+    Path of the cached features of a dataset for the current vectorizer and data contents.
+    """
+    return _cache_path(cache_dir, data_path, feature_cache_key(data_path, vectorizer_path))
+
+
+def save_features(path, X, y):
+    """
+    Save a CSR feature matrix and its labels to an uncompressed .npz file (written atomically).
+    """
+    X = sp.csr_matrix(X)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                data=X.data,
+                indices=X.indices,
+                indptr=X.indptr,
+                shape=np.array(X.shape),
+                labels=np.asarray(y).astype(str),
+            )
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_features(path):
+    """
+    Returns:
+        tuple: (scipy.sparse.csr_matrix, np.ndarray of labels)
+    """
+    with np.load(path, allow_pickle=False) as cached:
+        X = sp.csr_matrix((cached["data"], cached["indices"], cached["indptr"]), shape=tuple(cached["shape"]))
+        return X, cached["labels"]
+
+
+def get_feature_matrix(data_path, vectorizer_path, cache_dir):
+    """
+    Return the TF-IDF features and labels of a processed dataset, computing them at most once.
+
+    Features are cached as CSR matrices in cache_dir, keyed by a hash of the
+    vectorizer and the data file, so every trainer and the evaluator share one
+    transform per (vectorizer, dataset) pair. Stale cache files of the same dataset
+    are removed when a new key is written.
+
+    Args:
+        data_path (str): Path to the processed dataset (see utils.load_dataset).
+        vectorizer_path (str): Path to the fitted TF-IDF vectorizer.
+        cache_dir (str): Directory holding the cached .npz matrices.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix, np.ndarray of labels)
+    """
+    cache_path = feature_cache_path(data_path, vectorizer_path, cache_dir)
+    if os.path.exists(cache_path):
+        print(f"Loading cached features from: {cache_path}")
+        return load_features(cache_path)
+
+    print(f"Computing features for {data_path} (cache miss)...")
+    data = load_dataset(data_path, columns=["processed_content", "label"])
+    validate_data(data, required_columns=["processed_content", "label"])  # Ensure data is valid
+
+    with open(vectorizer_path, "rb") as f:
+        tfidf = pickle.load(f)
+    X = tfidf.transform(data["processed_content"])
+    y = data["label"].to_numpy()
+
+    # Trainers running in parallel may write the same key concurrently; only older keys are stale
+    for stale_path in glob.glob(_cache_path(cache_dir, data_path, "*")):
+        if stale_path != cache_path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+    save_features(cache_path, X, y)
+    print(f"Saved features to: {cache_path}")
+    return load_features(cache_path)
+
+
+if __name__ == "__main__":
+    print("Loading configuration...")
+    config = load_config()
+
+    vectorizer_path = config["paths"]["models"]["tfidf_vectorizer"]
+    cache_dir = config["paths"]["data"]["features"]
+
+    for data_path in (config["paths"]["data"]["train_set"], config["paths"]["data"]["test_set"]):
+        X, y = get_feature_matrix(data_path, vectorizer_path, cache_dir)
+        print(f"{data_path}: {X.shape[0]} rows x {X.shape[1]} features, {X.nnz} non-zeros")
@@ -1,8 +1,6 @@
 # train_vectorizer.py
-import pickle
 from sklearn.feature_extraction.text import TfidfVectorizer
-import pandas as pd
-from utils import load_config
+from utils import load_config, load_dataset, save_pickle
 
 
 def train_and_save_vectorizer(data_path, tfidf_max_features, tfidf_ngram_range, vectorizer_path):
@@ -15,7 +13,7 @@ def train_and_save_vectorizer(data_path, tfidf_max_features, tfidf_ngram_range,
         vectorizer_path (str): Path to save the TF-IDF vectorizer.
     """
     print(f"Loading data from: {data_path}")
-    data = pd.read_csv(data_path)
+    data = load_dataset(data_path, columns=['processed_content'])
     X = data['processed_content']
 
     print(f"Training TF-IDF vectorizer: max_features={tfidf_max_features}, ngram_range={tfidf_ngram_range}")
@@ -23,8 +21,7 @@ def train_and_save_vectorizer(data_path, tfidf_max_features, tfidf_ngram_range,
     tfidf.fit(X)
 
     print(f"Saving vectorizer to: {vectorizer_path}")
-    with open(vectorizer_path, "wb") as f:
-        pickle.dump(tfidf, f)
+    save_pickle(tfidf, vectorizer_path)
 
     print("Vectorizer trained and saved successfully.")
 
@@ -0,0 +1,215 @@
+import os
+import pickle
+import threading
+import time
+import tracemalloc
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_pickle(path):
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def load_linear_model(path):
+    from machine_learning.predict.linear_model import LinearEmailClassifier
+    return LinearEmailClassifier.load(path)
+
+
+def load_distilbert(path):
+    from machine_learning.predict.distilbert_runtime import DistilBertRuntime
+    return DistilBertRuntime.load(path)
+
+
+# Loader per artifact extension
+LOADERS = {
+    ".pkl": load_pickle,
+    ".npz": load_linear_model,
+    ".pt": load_distilbert,
+    ".onnx": load_distilbert,
+}
+
+
+class _Entry:
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.model = None
+        self.signature = None  # (mtime_ns, size) of the file the model was loaded from
+        self.last_check = 0.0
+        self.loads = 0
+        self.load_time = None
+        self.memory_bytes = None
+        self.loaded_at = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of trained model artifacts.
+
+    Each artifact is loaded lazily on first use and exactly once per process. When
+    the file on disk changes (mtime or size), the next ``get`` loads the new version
+    and swaps it in atomically: callers keep receiving the previous model until the
+    new one is fully loaded, and a failed reload keeps the previous model.
+
+    Args:
+        paths (dict): Model name -> artifact path (relative to the project root).
+            Defaults to ``paths.models`` in config.yaml.
+        check_interval (float): Minimum seconds between mtime checks per model.
+        measure_memory (bool): Record the memory each load allocates, with tracemalloc.
+            Tracing slows down every allocation in every thread while a model loads,
+            and loads are serialized, so leave it off in the server.
+    """
+
+    def __init__(self, paths=None, check_interval=1.0, measure_memory=False):
+        self._paths = paths
+        self.check_interval = check_interval
+        self.measure_memory = measure_memory
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # tracemalloc measurements must not overlap
+
+    def _model_paths(self):
+        if self._paths is None:
+            with open(os.path.join(PROJECT_ROOT, "config.yaml"), "r") as file:
+                models = yaml.safe_load(file)["paths"]["models"]
+            self._paths = {name: path for name, path in models.items() if isinstance(path, str)}
+        return self._paths
+
+    def _entry(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is None:
+                    paths = self._model_paths()
+                    if name not in paths:
+                        raise KeyError(f"Unknown model: {name}")
+                    path = os.path.join(PROJECT_ROOT, paths[name])
+                    loader = LOADERS.get(os.path.splitext(path)[1], load_pickle)
+                    entry = self._entries[name] = _Entry(path, loader)
+        return entry
+
+    def get(self, name):
+        """
+        Return the loaded model, loading or hot-reloading it if needed.
+        """
+        entry = self._entry(name)
+        now = time.monotonic()
+        if entry.model is not None and now - entry.last_check < self.check_interval:
+            return entry.model
+
+        with entry.lock:
+            entry.last_check = now
+            try:
+                stat = os.stat(entry.path)
+            except OSError as e:
+                if entry.model is None:
+                    raise
+                # Briefly missing (e.g. being replaced): keep serving the loaded model
+                entry.error = str(e)
+                return entry.model
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if entry.model is None or signature != entry.signature:
+                if self.measure_memory:
+                    with self._load_lock:
+                        self._load(entry, signature)
+                else:
+                    self._load(entry, signature)
+            else:
+                entry.error = None  # the loaded file is (back) in place
+        return entry.model
+
+    def get_versioned(self, name):
+        """
+        Like ``get``, but also return the version of the loaded artifact.
+
+        The version is derived from the file's mtime and size and is read together
+        with the model, so it always describes the model returned alongside it.
+
+        Returns:
+            tuple: ``(model, version)``.
+        """
+        self.get(name)
+        entry = self._entry(name)
+        with entry.lock:
+            return entry.model, "%d-%d" % entry.signature
+
+    def _load(self, entry, signature):
+        started_tracing = self.measure_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if self.measure_memory else None
+        start = time.perf_counter()
+        try:
+            model = entry.loader(entry.path)
+        except Exception as e:
+            entry.error = str(e)
+            if entry.model is None:
+                raise
+            print(f"Reloading {entry.path} failed, keeping the previous model: {e}")
+            return
+        finally:
+            load_time = time.perf_counter() - start
+            memory_after = tracemalloc.get_traced_memory()[0] if self.measure_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+
+        entry.model = model  # atomic swap: readers see either the old or the new model
+        entry.signature = signature
+        entry.loads += 1
+        entry.load_time = load_time
+        entry.memory_bytes = memory_after - memory_before if self.measure_memory else None
+        entry.loaded_at = time.time()
+        entry.error = None
+
+    def loaded(self, name):
+        """
+        Whether the model is in memory (without loading or checking it for changes).
+        """
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    def preload(self, names=None):
+        """
+        Load the given models (default: every configured model whose file exists).
+        """
+        if names is None:
+            names = [
+                name for name, path in self._model_paths().items()
+                if os.path.exists(os.path.join(PROJECT_ROOT, path))
+            ]
+        for name in names:
+            self.get(name)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per loaded model: path, size of the loaded artifact on disk (bytes),
+            number of loads, last load time (s), memory allocated by the last load
+            (bytes, None unless ``measure_memory``), load timestamp and last error.
+        """
+        return {
+            name: {
+                "path": os.path.relpath(entry.path, PROJECT_ROOT),
+                "file_bytes": entry.signature[1] if entry.signature else None,
+                "loads": entry.loads,
+                "load_time_s": entry.load_time,
+                "memory_bytes": entry.memory_bytes,
+                "loaded_at": entry.loaded_at,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# Shared instance used by the server and the evaluation code
+registry = ModelRegistry()
+
+
+def get_model(name):
+    return registry.get(name)
@@ -0,0 +1,113 @@
+"""
+Benchmark: bounded first-sync SEARCH and the history backfill against a large fake mailbox.
+
+1. The UID SEARCH a first sync needs: ``SEARCH ALL`` (what the window used to be cut
+   from) vs. the sequence-range + SINCE search, in response bytes and seconds.
+2. Interactive refresh latency (one new message per refresh) without and with the
+   history backfill running under its rate budget, plus the backfill's throughput.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_backfill --messages 20000 --history 2000 --rate 500
+"""
+import argparse
+import imaplib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import server  # noqa: E402
+from backfill import BackfillService  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox, make_message  # noqa: E402
+
+
+def timed_search(imap, criteria):
+    mail = imaplib.IMAP4(imap.host, imap.port)
+    mail.login("bench", "pw")
+    mail.select("inbox")
+    imap.reset_counts()
+    start = time.perf_counter()
+    status, data = mail.uid("SEARCH", None, criteria)
+    elapsed = time.perf_counter() - start
+    mail.logout()
+    return len(data[0].split()), imap.bytes_sent, elapsed
+
+
+def refresh_latencies(client, user, mailbox, refreshes, interval):
+    latencies = []
+    for _ in range(refreshes):
+        mailbox.append(make_message(len(mailbox.messages) + 1))
+        start = time.perf_counter()
+        assert client.get(f"/update-emails?email={user}").status_code == 200
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000, help="Messages in the fake inbox")
+    parser.add_argument("--history", type=int, default=2000, help="Messages within history_days (the backfill target)")
+    parser.add_argument("--rate", type=float, default=500, help="Backfill budget, messages per second")
+    parser.add_argument("--chunk", type=int, default=server.CONFIG["serving"]["backfill_chunk"], help="Messages per backfill step")
+    parser.add_argument("--refreshes", type=int, default=10, help="Interactive refreshes measured per run")
+    parser.add_argument("--latency", type=float, default=0.005, help="Injected latency per command (seconds)")
+    args = parser.parse_args()
+
+    server.registry.preload([server.PIPELINE_NAME])
+    mailbox = FakeMailbox.generate(args.messages, body_words=40)
+    with FakeImapServer(mailbox, latency=args.latency) as imap, tempfile.TemporaryDirectory() as store_dir, \
+            patch("server.get_decoded_password", return_value="app-password"), \
+            patch("server.imaplib.IMAP4_SSL", lambda host: imaplib.IMAP4(imap.host, imap.port)), \
+            server.app.test_client() as client:
+        print(f"Inbox: {args.messages} messages, window: {server.FETCH_WINDOW}")
+        print(f"{'first-sync search':<26}{'UIDs':>8}{'KB':>9}{'seconds':>9}")
+        window = f"{server.since_criterion()} {args.messages - server.FETCH_WINDOW + 1}:*"
+        for label, criteria in (("SEARCH ALL", "ALL"), ("sequence range + SINCE", window)):
+            count, size, elapsed = timed_search(imap, criteria)
+            print(f"{label:<26}{count:>8}{size / 1024:>9.1f}{elapsed:>9.3f}")
+
+        # The fake server has no dates, so the history_days horizon is a UID instead
+        horizon = args.messages - args.history
+
+        def horizon_criteria(criteria):
+            low, high = map(int, criteria[len("UID "):].split(":"))
+            return f"UID {max(low, horizon)}:{max(high, horizon)}"
+
+        latencies = {}
+        for label, backfill in (("no backfill", False), ("backfill", True)):
+            user = f"{label.replace(' ', '-')}@example.com"
+            service = BackfillService(
+                server.connect_imap, server.backfill_step, chunk_size=args.chunk, rate=args.rate,
+                busy=lambda: server.refresh_service.stats()["in_flight"] > 0, poll_interval=0.01,
+            )
+            with patch("server.store", MessageStore(os.path.join(store_dir, f"{user}.sqlite3"))), \
+                    patch("server.backfill_service", service), patch("server.HISTORY_BACKFILL", False):
+                client.get(f"/update-emails?email={user}")
+                start = time.perf_counter()
+                if backfill:
+                    with patch("server.search_criteria", horizon_criteria):
+                        service.start(user, "app-password")
+                        latencies[label] = refresh_latencies(client, user, mailbox, args.refreshes, 0.05)
+                        while service.status(user)["state"] in ("queued", "running"):
+                            time.sleep(0.05)
+                    elapsed = time.perf_counter() - start
+                    status = service.status(user)
+                else:
+                    latencies[label] = refresh_latencies(client, user, mailbox, args.refreshes, 0.05)
+            service.stop()
+
+        print(f"\n{'refreshes':<14}{'median ms':>10}{'max ms':>9}")
+        for label, values in latencies.items():
+            print(f"{label:<14}{statistics.median(values) * 1000:>10.1f}{max(values) * 1000:>9.1f}")
+        print(f"\nbackfill: {status['backfilled']} messages in {elapsed:.1f} s "
+              f"({status['backfilled'] / elapsed:.0f}/s, budget {args.rate:.0f}/s), state: {status['state']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: one-at-a-time categorize_email vs. batched categorize_emails.
+
+Uses the served model and vectorizer on emails from the raw dataset and reports
+per-batch time and per-email latency at 10, 100 and 1,000 messages.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_categorize
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "back_end"))
+# Keep the benchmark from touching the real message store and prediction cache
+os.environ.setdefault("MESSAGE_STORE_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+os.environ.setdefault("PREDICTION_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "bench-predictions.sqlite3"))
+
+import categorize  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+
+DATASET_PATH = os.path.join(PROJECT_ROOT, "machine_learning", "data", "raw", "dataset.json")
+
+
+def load_emails(count):
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    return list(islice(cycle((entry["subject"], entry["body"]) for entry in dataset), count))
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def one_at_a_time(batch):
+    return [categorize.categorize_email(subject, body) for subject, body in batch]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Measure the model itself: repeated runs would otherwise be answered by the prediction cache
+    categorize.prediction_cache = PredictionCache(max_entries=0)
+    emails = load_emails(max(args.sizes))
+    print(f"{'emails':>8}{'1-at-a-time (s)':>18}{'batched (s)':>14}{'speedup':>10}{'us/email batched':>19}")
+    for size in args.sizes:
+        batch = emails[:size]
+        single_time, single = best_of(args.repeat, one_at_a_time, batch)
+        batched_time, batched = best_of(args.repeat, categorize.categorize_emails, batch)
+        assert single == batched, "batched predictions differ from the per-message path"
+        print(
+            f"{size:>8}{single_time:>18.4f}{batched_time:>14.4f}"
+            f"{single_time / batched_time:>9.1f}x{batched_time / size * 1e6:>19.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: sequential per-message FETCH vs. batched sequence-set FETCH.
+
+Runs both strategies against a local fake IMAP server with an injected
+per-command latency and reports IMAP round-trips and wall time per request.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_imap_fetch --messages 500 --window 100 --latency 0.02
+"""
+import argparse
+import imaplib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+from imap_fetch import FETCH_ITEMS, fetch_messages  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox  # noqa: E402
+
+
+def fetch_sequential(mail, email_ids):
+    """The previous strategy: one FETCH command per message."""
+    messages = []
+    for email_id in email_ids:
+        status, data = mail.fetch(email_id, FETCH_ITEMS)
+        messages.append(data[0][1])
+    return messages
+
+
+def fetch_batched(mail, email_ids):
+    return [message["raw"] for message in fetch_messages(mail, email_ids)]
+
+
+def run_request(server, window, strategy):
+    """Simulate one /update-emails request and return (round_trips, seconds)."""
+    server.reset_counts()
+    start = time.perf_counter()
+
+    mail = imaplib.IMAP4(server.host, server.port)
+    mail.login("user@example.com", "app-password")
+    mail.select("inbox")
+    status, messages = mail.search(None, "ALL")
+    email_ids = messages[0].split()[-window:]
+    fetched = strategy(mail, email_ids)
+    mail.logout()
+
+    elapsed = time.perf_counter() - start
+    assert len(fetched) == len(email_ids)
+    return sum(server.command_counts.values()), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500, help="Messages in the fake inbox")
+    parser.add_argument("--window", type=int, default=100, help="Messages fetched per request")
+    parser.add_argument("--latency", type=float, default=0.02, help="Injected latency per command (seconds)")
+    parser.add_argument("--repeat", type=int, default=3, help="Requests per strategy")
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox.generate(args.messages)
+    with FakeImapServer(mailbox, latency=args.latency) as server:
+        print(f"Inbox: {args.messages} messages, window: {args.window}, latency: {args.latency * 1000:.0f} ms/command")
+        print(f"{'strategy':<12}{'round-trips':>14}{'seconds':>12}")
+        for name, strategy in (("sequential", fetch_sequential), ("batched", fetch_batched)):
+            results = [run_request(server, args.window, strategy) for _ in range(args.repeat)]
+            round_trips = results[0][0]
+            seconds = sorted(elapsed for _, elapsed in results)[len(results) // 2]
+            print(f"{name:<12}{round_trips:>14}{seconds:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
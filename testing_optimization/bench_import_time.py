@@ -0,0 +1,73 @@
+"""
+Import-time benchmark for lightweight project modules (python -X importtime).
+
+Reports the cumulative import time of each module and the slowest packages it
+pulls in. test_import_time.py uses measure_import to keep `import utils` under
+IMPORT_BUDGET_MS.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_import_time utils model_registry
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for `import utils` on a cold interpreter
+IMPORT_BUDGET_MS = 150
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_import(module, repeat=3):
+    """
+    Import a module in fresh interpreters and return its import cost.
+
+    Returns:
+        tuple: (best cumulative time in ms, list of (cumulative ms, package) for
+        the top-level packages imported by the fastest run, slowest first)
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        entries = []
+        for line in result.stderr.splitlines():
+            match = _LINE_RE.match(line)
+            if match:
+                depth = len(match.group(3)) // 2
+                entries.append((depth, int(match.group(2)) / 1000, match.group(4)))
+        # -X importtime prints a module's nested imports right before the module itself
+        index = max(i for i, (depth, ms, name) in enumerate(entries) if depth == 0 and name == module)
+        total = entries[index][1]
+        children = []
+        for depth, ms, name in reversed(entries[:index]):
+            if depth == 0:
+                break
+            if depth == 1:
+                children.append((ms, name))
+        if best is None or total < best[0]:
+            best = (total, sorted(children, reverse=True))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["utils"])
+    parser.add_argument("--top", type=int, default=8, help="Slowest imported packages to show")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, children = measure_import(module)
+        print(f"import {module}: {total:.1f} ms (budget for utils: {IMPORT_BUDGET_MS} ms)")
+        for ms, name in children[:args.top]:
+            print(f"  {ms:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
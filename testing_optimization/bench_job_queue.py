@@ -0,0 +1,79 @@
+"""
+Benchmark: parse + classify throughput in the web process vs. the job worker processes.
+
+Submits fetched batches as ``categorize_batch`` jobs, the way refreshes do, with 0
+worker processes (parse threads in the web process, sharing its GIL) and with 1, 2
+and 4 worker processes, while a thread in the "web process" keeps computing to
+stand in for request handling. Reports messages per second and how far the request
+thread got (its share of the GIL).
+
+Usage (from the project root):
+    python -m testing_optimization.bench_job_queue --messages 2000 --processes 0 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import server  # noqa: E402
+from job_queue import WorkerPool  # noqa: E402
+from testing_optimization.fake_imap_server import make_message  # noqa: E402
+
+
+def request_thread(stop_event, counter):
+    while not stop_event.is_set():
+        sum(i * i for i in range(2000))
+        counter[0] += 1
+
+
+def run(pool, batches):
+    stop_event, counter = threading.Event(), [0]
+    thread = threading.Thread(target=request_thread, args=(stop_event, counter))
+    thread.start()
+    start = time.perf_counter()
+    futures = [pool.submit("categorize_batch", (batch, server.DEFAULT_BACKEND)) for batch in batches]
+    count = sum(len(future.result()) for future in futures)
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    thread.join()
+    return count / elapsed, counter[0] / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000, help="Messages classified per run")
+    parser.add_argument("--batch", type=int, default=server.FETCH_BATCH_SIZE, help="Messages per job")
+    parser.add_argument("--processes", type=int, nargs="+", default=[0, 1, 2, 4], help="Worker process counts")
+    args = parser.parse_args()
+
+    server.registry.preload([server.PIPELINE_NAME])
+    fetched = [
+        {"uid": i, "gmail_id": 1000000 + i, "raw": make_message(i, body_words=80), "header": None, "part": None, "body": None}
+        for i in range(1, args.messages + 1)
+    ]
+    batches = [fetched[i:i + args.batch] for i in range(0, len(fetched), args.batch)]
+
+    print(f"{args.messages} messages in {len(batches)} jobs, {os.cpu_count()} CPUs")
+    print(f"{'workers':<10}{'messages/s':>12}{'requests loop/s':>17}")
+    with tempfile.TemporaryDirectory() as queue_dir:
+        for processes in args.processes:
+            pool = WorkerPool(
+                os.path.join(queue_dir, "jobs.sqlite3"), "classify_worker", server.JOB_HANDLERS,
+                ThreadPoolExecutor(max_workers=server.CONFIG["serving"]["parse_workers"]), processes=processes,
+            )
+            pool.start()
+            if processes:
+                run(pool, batches[:processes])  # wait until every worker has loaded the model
+            throughput, loop_rate = run(pool, batches)
+            pool.stop()
+            label = "in-process" if not processes else str(processes)
+            print(f"{label:<10}{throughput:>12.0f}{loop_rate:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
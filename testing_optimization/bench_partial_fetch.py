@@ -0,0 +1,82 @@
+"""
+Benchmark: full RFC822 fetch vs. header-first partial fetch on an attachment-heavy inbox.
+
+Both strategies fetch and parse the same window against a local fake IMAP server.
+The report shows round-trips, bytes sent by the server and wall time per refresh.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_partial_fetch --messages 100 --attachment-kb 500 --latency 0.02
+"""
+import argparse
+import imaplib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import categorize  # noqa: E402
+import server  # noqa: E402
+from imap_fetch import fetch_messages, iter_partial_batches  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox, make_message  # noqa: E402
+
+
+def fetch_full(mail, uids, max_body_bytes):
+    """The previous strategy: download every message in full, attachments included."""
+    return [categorize.parse_email(m["raw"]) for m in fetch_messages(mail, uids, items="(UID RFC822 X-GM-MSGID)", uid=True)]
+
+
+def fetch_partial(mail, uids, max_body_bytes):
+    return [
+        categorize.parse_partial(m["header"], m["part"], m["body"]) if m["raw"] is None else categorize.parse_email(m["raw"])
+        for batch in iter_partial_batches(mail, uids, max_body_bytes=max_body_bytes)
+        for m in batch
+    ]
+
+
+def run_refresh(imap, strategy, max_body_bytes):
+    """Fetch and parse the whole inbox once; return (round_trips, bytes, seconds, parsed)."""
+    mail = imaplib.IMAP4(imap.host, imap.port)
+    mail.login("user@example.com", "app-password")
+    mail.select("inbox")
+    status, data = mail.uid("SEARCH", None, "ALL")
+    imap.reset_counts()
+
+    start = time.perf_counter()
+    parsed = strategy(mail, data[0].split(), max_body_bytes)
+    elapsed = time.perf_counter() - start
+    mail.logout()
+    return sum(imap.command_counts.values()), imap.bytes_sent, elapsed, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100, help="Messages in the fake inbox")
+    parser.add_argument("--attachment-kb", type=int, default=500, help="PDF size on every other message")
+    parser.add_argument("--max-body-bytes", type=int, default=server.MAX_BODY_BYTES, help="Cap on the text part")
+    parser.add_argument("--latency", type=float, default=0.02, help="Injected latency per command (seconds)")
+    parser.add_argument("--repeat", type=int, default=3, help="Refreshes per strategy (median reported)")
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox(
+        make_message(i, attachment_bytes=args.attachment_kb * 1024 if i % 2 else 0)
+        for i in range(1, args.messages + 1)
+    )
+    with FakeImapServer(mailbox, latency=args.latency) as imap:
+        print(f"Inbox: {args.messages} messages, {args.attachment_kb} KB PDF on every other one, "
+              f"latency: {args.latency * 1000:.0f} ms/command")
+        print(f"{'strategy':<10}{'round-trips':>13}{'KB sent':>12}{'KB/message':>12}{'seconds':>10}")
+        results = {}
+        for name, strategy in (("full", fetch_full), ("partial", fetch_partial)):
+            runs = [run_refresh(imap, strategy, args.max_body_bytes) for _ in range(args.repeat)]
+            round_trips, sent, _, parsed = runs[0]
+            elapsed = sorted(run[2] for run in runs)[len(runs) // 2]
+            results[name] = parsed
+            print(f"{name:<10}{round_trips:>13}{sent / 1024:>12.0f}{sent / 1024 / args.messages:>12.1f}{elapsed:>10.3f}")
+
+    # Same subject, sender and body either way (bodies are far below the cap here)
+    assert results["full"] == results["partial"]
+
+
+if __name__ == "__main__":
+    main()
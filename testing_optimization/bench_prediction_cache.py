@@ -0,0 +1,85 @@
+"""
+Benchmark: categorize_emails with and without the prediction cache on repetitive mail.
+
+Simulates the first sync of many users. A share of every inbox (--shared) is the same
+newsletters and notifications, which differ per recipient only in order numbers,
+amounts and dates; the rest is individual mail from the dataset. Every user's window
+is categorized in one batch, as sync_mailbox does.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_prediction_cache --users 50 --window 100 --shared 0.6
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "back_end"))
+os.environ.setdefault("MESSAGE_STORE_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+
+import categorize  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+
+DATASET_PATH = os.path.join(PROJECT_ROOT, "machine_learning", "data", "raw", "dataset.json")
+
+
+def build_inboxes(users, window, shared, templates, seed=0):
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        dataset = [(entry["subject"], entry["body"]) for entry in json.load(f)]
+    rng = random.Random(seed)
+    pool = dataset[:templates]
+    individual = iter(rng.sample(dataset[templates:], len(dataset) - templates) * (users * window // len(dataset) + 1))
+
+    inboxes = []
+    for _ in range(users):
+        inbox = []
+        for _ in range(window):
+            if rng.random() < shared:
+                subject, body = rng.choice(pool)
+                number = rng.randrange(10_000, 99_999)
+                inbox.append((f"{subject} #{number}", f"{body}\nRef {number}, total ${rng.randrange(5, 500)}.00"))
+            else:
+                inbox.append(next(individual))
+        inboxes.append(inbox)
+    return inboxes
+
+
+def run(inboxes, cache):
+    categorize.prediction_cache = cache
+    start = time.perf_counter()
+    results = [categorize.categorize_emails(inbox) for inbox in inboxes]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="Users doing a first sync")
+    parser.add_argument("--window", type=int, default=100, help="Messages categorized per user")
+    parser.add_argument("--shared", type=float, default=0.6, help="Share of each inbox that is bulk mail")
+    parser.add_argument("--templates", type=int, default=40, help="Distinct newsletters/notifications")
+    parser.add_argument("--backend", default=categorize.DEFAULT_BACKEND, choices=categorize.BACKENDS)
+    args = parser.parse_args()
+
+    inboxes = build_inboxes(args.users, args.window, args.shared, args.templates)
+    categorize.categorize_emails(inboxes[0][:1], backend=args.backend)  # load the model outside the timing
+
+    uncached_time, uncached = run(inboxes, PredictionCache(max_entries=0))
+    cache = PredictionCache()
+    cached_time, cached = run(inboxes, cache)
+    assert cached == uncached, "cached predictions differ from the model"
+
+    emails = args.users * args.window
+    stats = cache.stats()
+    print(f"{emails} emails ({args.users} users x {args.window}), {args.shared:.0%} bulk mail, backend: {args.backend}")
+    print(f"{'cache':<10}{'seconds':>10}{'us/email':>11}{'predicted':>11}")
+    print(f"{'off':<10}{uncached_time:>10.3f}{uncached_time / emails * 1e6:>11.1f}{emails:>11}")
+    print(f"{'on':<10}{cached_time:>10.3f}{cached_time / emails * 1e6:>11.1f}{stats['misses']:>11}")
+    print(f"hit rate: {stats['hit_rate']:.1%}, speedup: {uncached_time / cached_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
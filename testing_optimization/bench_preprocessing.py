@@ -0,0 +1,53 @@
+"""
+Benchmark: per-text preprocess_text vs. batched preprocess_texts (nlp.pipe).
+
+Preprocesses subjects and bodies from the raw dataset (cycled up to --emails)
+and reports throughput for the per-text path and for nlp.pipe with 1..N worker
+processes, checking that every path produces identical output.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_preprocessing --emails 10000 --processes 1 2 4
+"""
+import argparse
+import json
+import os
+import time
+from itertools import cycle, islice
+
+from utils import load_config, preprocess_text, preprocess_texts
+
+
+def load_texts(count):
+    config = load_config()
+    with open(config["paths"]["data"]["dataset"], "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    entries = islice(cycle(dataset), count)
+    return [text for entry in entries for text in (entry["subject"] or "", entry["body"] or "")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, os.cpu_count()])
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    texts = load_texts(args.emails)
+    print(f"{len(texts)} texts ({args.emails} emails), batch_size={args.batch_size}")
+
+    start = time.perf_counter()
+    expected = [preprocess_text(text) for text in texts]
+    baseline = time.perf_counter() - start
+    print(f"{'preprocess_text loop':<28}{baseline:>8.2f} s{args.emails / baseline:>10.0f} emails/s")
+
+    for n_process in sorted(set(args.processes)):
+        start = time.perf_counter()
+        result = preprocess_texts(texts, n_process=n_process, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        assert result == expected, "preprocess_texts output differs from preprocess_text"
+        label = f"nlp.pipe n_process={n_process}"
+        print(f"{label:<28}{elapsed:>8.2f} s{args.emails / elapsed:>10.0f} emails/s{baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
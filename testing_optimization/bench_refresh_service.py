@@ -0,0 +1,79 @@
+"""
+Load test: concurrent /update-emails refreshes for many users against a fake IMAP server.
+
+Every user performs a first sync (the last --window messages are fetched, parsed and
+categorized) at the same time. The run is repeated with the refresh pool limited to
+one thread, which is how refreshes behave when they serialize behind each other.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_refresh_service --users 1 2 4 8 16 --latency 0.05
+"""
+import argparse
+import imaplib
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import server  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from refresh_service import RefreshService  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox  # noqa: E402
+
+
+def run_users(users, store_dir):
+    """Refresh ``users`` distinct mailboxes concurrently; return the wall time in seconds."""
+    store = MessageStore(os.path.join(store_dir, f"store-{time.perf_counter_ns()}.sqlite3"))
+    barrier = threading.Barrier(users)
+    statuses = []
+
+    def refresh(index):
+        with server.app.test_client() as client:
+            barrier.wait()
+            statuses.append(client.get(f"/update-emails?email=user{index}@example.com").status_code)
+
+    with patch("server.store", store):
+        threads = [threading.Thread(target=refresh, args=(i,)) for i in range(users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    assert statuses == [200] * users
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrent users")
+    parser.add_argument("--messages", type=int, default=200, help="Messages in the fake inbox")
+    parser.add_argument("--window", type=int, default=100, help="Messages fetched per first sync")
+    parser.add_argument("--latency", type=float, default=0.05, help="Injected latency per command (seconds)")
+    args = parser.parse_args()
+
+    server.FETCH_WINDOW = args.window
+    server.registry.preload([server.PIPELINE_NAME])
+
+    with FakeImapServer(FakeMailbox.generate(args.messages), latency=args.latency) as imap, \
+            tempfile.TemporaryDirectory() as store_dir, \
+            patch("server.get_decoded_password", return_value="app-password"), \
+            patch("server.imaplib.IMAP4_SSL", lambda host: imaplib.IMAP4(imap.host, imap.port)):
+        print(f"Inbox: {args.messages} messages, window: {args.window}, latency: {args.latency * 1000:.0f} ms/command")
+        print(f"{'users':>6}{'pool':>8}{'seconds':>10}{'refreshes/s':>14}")
+        for users in args.users:
+            for label, workers in (("1", 1), ("shared", 32)):
+                service = RefreshService(max_workers=workers)
+                with patch("server.refresh_service", service):
+                    elapsed = run_users(users, store_dir)
+                service.shutdown()
+                print(f"{users:>6}{label:>8}{elapsed:>10.3f}{users / elapsed:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: time to first result and peak memory of /update-emails, grouped vs streamed.
+
+Every run is a first sync of a fresh store against a fake IMAP server with per-command
+latency, for growing windows. The grouped response arrives all at once; the NDJSON
+stream sends each email once its batch is categorized (batches start at
+serving.stream_first_batch messages and double).
+Peak memory is the tracemalloc peak of the whole request.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_stream --windows 100 400 1600 --latency 0.02
+"""
+import argparse
+import imaplib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import server  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox  # noqa: E402
+
+
+def run(client, url):
+    """Returns (seconds to first chunk, seconds to last chunk, peak MB, bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first, size = None, 0
+    response = client.get(url, buffered=False)
+    for chunk in response.response:
+        first = first or time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak / 2 ** 20, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--windows", type=int, nargs="+", default=[100, 400, 1600], help="Messages per first sync")
+    parser.add_argument("--latency", type=float, default=0.02, help="Injected latency per command (seconds)")
+    args = parser.parse_args()
+
+    server.registry.preload([server.PIPELINE_NAME])
+    mailbox = FakeMailbox.generate(max(args.windows))
+    with FakeImapServer(mailbox, latency=args.latency) as imap, tempfile.TemporaryDirectory() as store_dir, \
+            patch("server.get_decoded_password", return_value="app-password"), \
+            patch("server.imaplib.IMAP4_SSL", lambda host: imaplib.IMAP4(imap.host, imap.port)), \
+            server.app.test_client() as client:
+        print(f"latency: {args.latency * 1000:.0f} ms/command, first stream batch: {server.STREAM_FIRST_BATCH}")
+        print(f"{'window':>7}{'mode':>9}{'first s':>9}{'total s':>9}{'peak MB':>9}{'KB':>8}")
+        for window in args.windows:
+            server.FETCH_WINDOW = window
+            for mode, query in (("grouped", ""), ("ndjson", "&stream=ndjson")):
+                # A new user per run, so every run is a first sync on a fresh store and session
+                user = f"{mode}-{window}@example.com"
+                with patch("server.store", MessageStore(os.path.join(store_dir, f"{user}.sqlite3"))):
+                    first, total, peak, size = run(client, f"/update-emails?email={user}{query}")
+                print(f"{window:>7}{mode:>9}{first:>9.3f}{total:>9.3f}{peak:>9.1f}{size / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
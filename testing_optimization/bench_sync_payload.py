@@ -0,0 +1,83 @@
+"""
+Benchmark: bytes sent to the extension per refresh, full payload vs /sync deltas.
+
+One user refreshes a warm inbox --rounds times; before every refresh --new messages
+arrive and --expunged ones are deleted on a fake IMAP server. Each refresh is answered
+three ways: the full /update-emails payload, the same payload with every sanitized
+body inlined (how the extension received mail before bodies were loaded on open) and
+the /sync delta against the previous token.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_sync_payload --messages 500 --window 100 --new 3 --expunged 1
+"""
+import argparse
+import imaplib
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import server  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox, make_message  # noqa: E402
+
+USER = "bench@example.com"
+
+
+def with_bodies(categorized):
+    payload = {}
+    for category, messages in categorized.items():
+        payload[category] = []
+        for message in messages:
+            stored = server.store.get_message_body(USER, message["uid"])
+            payload[category].append(dict(message, body=server.render_body(stored["body"], stored["body_type"])))
+    return len(json.dumps(payload).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500, help="Messages in the fake inbox")
+    parser.add_argument("--window", type=int, default=100, help="Messages fetched by the first sync")
+    parser.add_argument("--rounds", type=int, default=10, help="Refreshes after the first sync")
+    parser.add_argument("--new", type=int, default=3, help="Messages arriving before each refresh")
+    parser.add_argument("--expunged", type=int, default=1, help="Messages deleted before each refresh")
+    args = parser.parse_args()
+
+    server.FETCH_WINDOW = args.window
+    mailbox = FakeMailbox.generate(args.messages)
+    with FakeImapServer(mailbox) as imap, tempfile.TemporaryDirectory() as store_dir, \
+            patch("server.store", MessageStore(os.path.join(store_dir, "store.sqlite3"))), \
+            patch("server.get_decoded_password", return_value="app-password"), \
+            patch("server.imaplib.IMAP4_SSL", lambda host: imaplib.IMAP4(imap.host, imap.port)), \
+            server.app.test_client() as client:
+        snapshot = client.get(f"/sync?email={USER}")
+        token = snapshot.get_json()["token"]
+        print(f"Inbox: {args.messages} messages, window: {args.window}, "
+              f"per refresh: {args.new} new, {args.expunged} expunged")
+        print(f"first sync: /sync snapshot {len(snapshot.data) / 1024:.1f} KB")
+        print(f"{'round':>6}{'full KB':>10}{'+bodies KB':>12}{'delta KB':>10}")
+
+        totals = [0, 0, 0]
+        for round_number in range(1, args.rounds + 1):
+            for _ in range(args.expunged):
+                mailbox.expunge(server.store.cached_uids(USER)[0])
+            for index in range(args.new):
+                mailbox.append(make_message(args.messages + round_number * args.new + index))
+
+            delta = client.get(f"/sync?email={USER}&token={token}")
+            token = delta.get_json()["token"]
+            full = client.get(f"/update-emails?email={USER}")
+            sizes = (len(full.data), with_bodies(full.get_json()), len(delta.data))
+            totals = [total + size for total, size in zip(totals, sizes)]
+            print(f"{round_number:>6}" + "".join(f"{size / 1024:>{width}.1f}" for size, width in zip(sizes, (10, 12, 10))))
+
+        print(f"{'mean':>6}" + "".join(
+            f"{total / args.rounds / 1024:>{width}.1f}" for total, width in zip(totals, (10, 12, 10))
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: per-message cost of preparing an HTML body for the classifier.
+
+"before" is the previous path, sanitize_html (regex passes + bleach.clean) whose output,
+tags included, was the model input. "after" is the single-pass text extractor the
+classifier now uses; sanitize_html only runs when an email is opened.
+
+Pass --corpus with a directory of saved newsletters (.html or .eml files). Without one,
+newsletter-style table layouts are generated around dataset bodies; they are smaller
+than most real newsletters, so treat those numbers as a rough guide only.
+
+Usage (from the project root):
+    python -m testing_optimization.bench_text_extraction --corpus ~/newsletters --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import categorize  # noqa: E402
+import server  # noqa: E402
+from text_extract import _html_parser_text, extract_text, lxml_html, normalize_text  # noqa: E402
+from utils import load_config  # noqa: E402
+
+TEMPLATE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>{subject}</title>
+<style>body{{margin:0}} .btn{{background:#e4405f;color:#fff;padding:12px 24px}} @media (max-width:600px){{td{{display:block}}}}</style>
+<script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"event":"open","id":{index}}});</script></head>
+<body style="background:#f4f4f4"><span style="display:none">{preheader}&#8203;&zwnj;&#8203;&zwnj;</span>
+<table width="100%" cellpadding="0" cellspacing="0" role="presentation"><tr><td align="center">
+<table width="600" style="font-family:Arial,sans-serif;border:1px solid #ddd">{rows}</table>
+<p style="font-size:11px;color:#999">You are receiving this because you subscribed. <a href="https://example.com/u?id={index}">Unsubscribe</a></p>
+<img src="https://example.com/open.gif?id={index}" width="1" height="1" alt="">
+</td></tr></table></body></html>"""
+
+ROW = """<tr><td style="padding:16px"><div><span><p style="line-height:1.5">{text}</p></span></div>
+<a class="btn" href="https://example.com/c?id={index}&amp;row={row}" style="text-decoration:none">Read more</a></td></tr>
+<tr><td><p></p><br><br><br><br></td></tr>"""
+
+
+def synthetic_corpus(count):
+    with open(load_config()["paths"]["data"]["dataset"], "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    corpus = []
+    for index in range(count):
+        entry = entries[index % len(entries)]
+        body = entry["body"] or ""
+        rows = "".join(ROW.format(text=body, index=index, row=row) for row in range(8))
+        corpus.append(TEMPLATE.format(subject=entry["subject"], preheader=body[:90], index=index, rows=rows))
+    return corpus
+
+
+def load_corpus(directory):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(".eml"):
+            with open(path, "rb") as f:
+                subject, from_, body, body_type = categorize.parse_email(f.read())
+            if body_type == "html":
+                corpus.append(body)
+        elif name.endswith((".html", ".htm")):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                corpus.append(f.read())
+    return corpus
+
+
+def time_per_message(func, corpus, repeat):
+    """Median over ``repeat`` passes of the mean seconds per message."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in corpus:
+            func(html)
+        runs.append((time.perf_counter() - start) / len(corpus))
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of .html/.eml newsletters (default: synthetic)")
+    parser.add_argument("--messages", type=int, default=200, help="Synthetic messages when no corpus is given")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus (median reported)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.messages)
+    if not corpus:
+        sys.exit(f"No HTML messages found in {args.corpus}")
+    source = args.corpus or "synthetic newsletter layouts"
+    print(f"Corpus: {len(corpus)} HTML bodies from {source}, "
+          f"mean size {sum(map(len, corpus)) / len(corpus) / 1024:.1f} KB")
+
+    paths = [("before: sanitize_html", server.sanitize_html)]
+    if lxml_html is not None:
+        paths.append(("after: extract_text (lxml)", extract_text))
+    paths.append(("after: extract_text (html.parser)", lambda html: normalize_text(_html_parser_text(html))))
+
+    print(f"{'path':<36}{'ms/message':>12}{'speedup':>10}{'model input chars':>20}")
+    baseline = None
+    for name, func in paths:
+        seconds = time_per_message(func, corpus, args.repeat)
+        baseline = baseline or seconds
+        chars = sum(len(func(html)) for html in corpus) / len(corpus)
+        print(f"{name:<36}{seconds * 1000:>12.3f}{baseline / seconds:>9.1f}x{chars:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
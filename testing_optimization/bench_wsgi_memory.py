@@ -0,0 +1,123 @@
+"""
+Benchmark: per-worker memory of the gunicorn deployment with and without preloading.
+
+Starts ``gunicorn -c back_end/gunicorn.conf.py`` with 1, 2 and 4 workers, once with
+the models loaded in the master before forking (the default) and once with
+WSGI_PRELOAD=0 (every worker loads its own copy). When every worker answers /ready
+and has classified a few jobs, reads /proc/<pid>/smaps_rollup of the workers:
+RSS, USS (pages only that worker holds) and the PSS of the whole server.
+
+Linux only; needs gunicorn. Usage (from the project root):
+    python -m testing_optimization.bench_wsgi_memory --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(PROJECT_ROOT, "back_end", "gunicorn.conf.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url, data=None):
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def wait_until_ready(base, workers, timeout=120):
+    # /ready lands on whichever worker accepts; wait until every worker has answered 200
+    ready, deadline = set(), time.monotonic() + timeout
+    while len(ready) < workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"only {len(ready)} of {workers} workers became ready")
+        try:
+            status, body = get_json(f"{base}/ready")
+            if status == 200:
+                ready.add(body["pid"])
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.05)
+    return ready
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def measure(workers, preload, jobs):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(
+            os.environ,
+            WEB_CONCURRENCY=str(workers),
+            WSGI_PRELOAD="1" if preload else "0",
+            WSGI_BIND=f"127.0.0.1:{port}",
+            MESSAGE_STORE_PATH=os.path.join(data_dir, "messages.sqlite3"),
+            PREDICTION_CACHE_PATH=os.path.join(data_dir, "predictions.sqlite3"),
+            JOB_QUEUE_PATH=os.path.join(data_dir, "jobs.sqlite3"),
+        )
+        master = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", CONFIG_FILE],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            pids = wait_until_ready(base, workers)
+            emails = [{"subject": f"Weekly newsletter #{i}", "body": "Deals and news " * 20} for i in range(50)]
+            for _ in range(jobs):
+                status, queued = get_json(f"{base}/classify", json.dumps({"emails": emails}).encode())
+                get_json(f"{base}/jobs/{queued['job_id']}?wait=10")
+            per_worker = [memory_kb(pid) for pid in pids]
+            total_pss = memory_kb(master.pid)["pss"] + sum(m["pss"] for m in per_worker)
+        finally:
+            master.terminate()
+            master.wait(timeout=30)
+    return {
+        "rss": sum(m["rss"] for m in per_worker) / workers,
+        "uss": sum(m["uss"] for m in per_worker) / workers,
+        "total_pss": total_pss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    parser.add_argument("--jobs", type=int, default=20, help="/classify jobs sent before measuring")
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'workers':>8}{'RSS/worker MB':>15}{'USS/worker MB':>15}{'server PSS MB':>15}")
+    for preload in (False, True):
+        for workers in args.workers:
+            result = measure(workers, preload, args.jobs)
+            print(f"{'preload' if preload else 'per-worker':<12}{workers:>8}{result['rss'] / 1024:>15.1f}"
+                  f"{result['uss'] / 1024:>15.1f}{result['total_pss'] / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+A small in-process IMAP4rev1 server used by the back-end benchmarks and load tests.
+
+Only the subset of the protocol that the back end relies on is implemented:
+CAPABILITY, LOGIN, SELECT/EXAMINE, SEARCH, FETCH (including BODYSTRUCTURE,
+header fields and partial BODY[section]<start.count>), UID, NOOP, IDLE and LOGOUT,
+plus the Gmail X-GM-MSGID extension. Every command can be delayed by a fixed latency
+to simulate the round-trip to a remote server, and the server counts the commands it
+receives and the bytes it sends so benchmarks can report round-trips and transfer
+per request.
+"""
+import email
+import os
+import re
+import select
+import socketserver
+import threading
+import time
+from collections import Counter
+from email.message import EmailMessage
+
+
+def make_message(index, body_words=60, html=True, attachment_bytes=0):
+    """
+    Build a raw RFC822 message for the fake mailbox.
+
+    Args:
+        index (int): Message number, used in the subject and body.
+        body_words (int): Approximate number of words in the body.
+        html (bool): Whether to add a text/html alternative.
+        attachment_bytes (int): Size of a PDF attachment to add (0 for none).
+
+    Returns:
+        bytes: The encoded message.
+    """
+    msg = EmailMessage()
+    msg["Subject"] = f"Test email {index}"
+    msg["From"] = f"sender{index % 7}@example.com"
+    msg["To"] = "user@example.com"
+    text = " ".join(f"word{(index + i) % 97}" for i in range(body_words))
+    msg.set_content(text)
+    if html:
+        msg.add_alternative(f"<html><body><p>{text}</p></body></html>", subtype="html")
+    if attachment_bytes:
+        msg.add_attachment(
+            os.urandom(attachment_bytes), maintype="application", subtype="pdf", filename=f"report{index}.pdf"
+        )
+    return msg.as_bytes()
+
+
+def _quote(value):
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _param_list(params):
+    if not params:
+        return "NIL"
+    return "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in params) + ")"
+
+
+def _bodystructure(part):
+    """Render the BODYSTRUCTURE (with extension data) of an ``email.message.Message``."""
+    disposition = part.get_content_disposition()
+    disposition = (
+        f"({_quote(disposition.upper())} {_param_list(part.get_params(header='content-disposition')[1:])})"
+        if disposition else "NIL"
+    )
+    if part.is_multipart():
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        params = _param_list([(k, v) for k, v in part.get_params()[1:]])
+        return f"({children} {_quote(part.get_content_subtype().upper())} {params} {disposition} NIL NIL)"
+
+    payload = part.get_payload().encode()
+    fields = " ".join([
+        _quote(part.get_content_maintype().upper()),
+        _quote(part.get_content_subtype().upper()),
+        _param_list(part.get_params()[1:]),
+        "NIL", "NIL",
+        _quote(part.get("Content-Transfer-Encoding", "7BIT").upper()),
+        str(len(payload)),
+    ])
+    if part.get_content_maintype() == "text":
+        fields += " %d" % (payload.count(b"\n") + 1)
+    return f"({fields} NIL {disposition} NIL NIL)"
+
+
+def _section(message, section):
+    """Return the still-encoded payload of a body section such as "2" or "1.2"."""
+    part = message
+    for number in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(number) - 1]
+        elif number != "1":
+            raise ValueError(f"No section {section}")
+    payload = part.get_payload()
+    return payload.encode() if isinstance(payload, str) else b""
+
+
+_BODY_ITEM_RE = re.compile(r'^BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?$')
+
+
+class FakeMailbox:
+    """
+    An in-memory INBOX shared by every connection to a ``FakeImapServer``.
+    """
+
+    def __init__(self, messages=(), uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.lock = threading.Lock()
+        self.messages = []  # list of dicts: uid, gmail_id, raw
+        self._next_uid = 1
+        for raw in messages:
+            self.append(raw)
+
+    @classmethod
+    def generate(cls, count, **kwargs):
+        return cls(make_message(i, **kwargs) for i in range(1, count + 1))
+
+    def append(self, raw):
+        with self.lock:
+            uid = self._next_uid
+            self._next_uid += 1
+            self.messages.append({"uid": uid, "gmail_id": 1000000 + uid, "raw": raw})
+            return uid
+
+    def expunge(self, uid):
+        with self.lock:
+            self.messages = [m for m in self.messages if m["uid"] != uid]
+
+    @property
+    def uidnext(self):
+        return self._next_uid
+
+
+def _parse_set(sequence_set, maximum):
+    """Expand an IMAP sequence set into a set of integers."""
+    numbers = set()
+    for part in sequence_set.split(","):
+        if ":" in part:
+            start, end = part.split(":", 1)
+            start = maximum if start == "*" else int(start)
+            end = maximum if end == "*" else int(end)
+            if start > end:
+                start, end = end, start
+            numbers.update(range(start, end + 1))
+        else:
+            numbers.add(maximum if part == "*" else int(part))
+    return numbers
+
+
+def _split_items(items):
+    """Split a FETCH item list such as ``(UID BODY.PEEK[HEADER.FIELDS (FROM)])``."""
+    items = items.strip()
+    if items.startswith("(") and items.endswith(")"):
+        items = items[1:-1]
+    tokens, depth, current = [], 0, ""
+    for char in items:
+        if char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        if char == " " and depth == 0:
+            if current:
+                tokens.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._pending.append(data)
+
+    def flush(self):
+        data = b"".join(self._pending)
+        self.wfile.write(data)
+        self.server.record_bytes(len(data))
+        self._pending = []
+
+    def handle(self):
+        self.selected = False
+        self._pending = []
+        self.send("* OK [CAPABILITY IMAP4rev1] Fake IMAP ready\r\n")
+        self.flush()
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.decode(errors="replace").rstrip("\r\n")
+            if not line:
+                continue
+            tag, _, rest = line.partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+
+            uid_mode = command == "UID"
+            if uid_mode:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+
+            self.server.record(("UID " if uid_mode else "") + command)
+            if self.server.latency:
+                time.sleep(self.server.latency)
+
+            handler = getattr(self, f"do_{command.lower()}", None)
+            if handler is None:
+                self.send(f"{tag} BAD Unknown command {command}\r\n")
+                self.flush()
+                continue
+            keep_open = handler(tag, args, uid_mode)
+            self.flush()
+            if keep_open is False:
+                return
+
+    def do_capability(self, tag, args, uid_mode):
+        self.send("* CAPABILITY IMAP4rev1 IDLE X-GM-EXT-1\r\n")
+        self.send(f"{tag} OK CAPABILITY completed\r\n")
+
+    def do_login(self, tag, args, uid_mode):
+        self.send(f"{tag} OK LOGIN completed\r\n")
+
+    def do_noop(self, tag, args, uid_mode):
+        self.send(f"{tag} OK NOOP completed\r\n")
+
+    def do_select(self, tag, args, uid_mode):
+        mailbox = self.server.mailbox
+        self.selected = True
+        self.send(f"* {len(mailbox.messages)} EXISTS\r\n")
+        self.send("* 0 RECENT\r\n")
+        self.send(f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid\r\n")
+        self.send(f"* OK [UIDNEXT {mailbox.uidnext}] Predicted next UID\r\n")
+        self.send(f"{tag} OK [READ-WRITE] SELECT completed\r\n")
+
+    do_examine = do_select
+
+    def do_idle(self, tag, args, uid_mode):
+        self.send("+ idling\r\n")
+        self.flush()
+        mailbox = self.server.mailbox
+        with mailbox.lock:
+            seen = (len(mailbox.messages), mailbox.uidnext)
+        while True:
+            with mailbox.lock:
+                current = (len(mailbox.messages), mailbox.uidnext)
+            if current != seen:
+                if current[0] < seen[0] or current[1] == seen[1]:
+                    self.send(f"* {seen[0]} EXPUNGE\r\n")
+                if current[1] != seen[1]:
+                    self.send(f"* {current[0]} EXISTS\r\n")
+                self.flush()
+                seen = current
+            readable, _, _ = select.select([self.connection], [], [], 0.02)
+            if readable:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    self.send(f"{tag} OK IDLE terminated\r\n")
+                    return
+
+    def do_logout(self, tag, args, uid_mode):
+        self.send("* BYE Fake IMAP closing\r\n")
+        self.send(f"{tag} OK LOGOUT completed\r\n")
+        return False
+
+    def do_search(self, tag, args, uid_mode):
+        with self.server.mailbox.lock:
+            messages = list(self.server.mailbox.messages)
+        criteria = args.split()
+        if criteria and criteria[0].upper() == "CHARSET":
+            criteria = criteria[2:]
+
+        selected = list(enumerate(messages, start=1))
+        index = 0
+        while index < len(criteria):
+            key = criteria[index].upper()
+            if key == "UID":
+                max_uid = messages[-1]["uid"] if messages else 0
+                wanted = _parse_set(criteria[index + 1], max_uid)
+                selected = [(seq, m) for seq, m in selected if m["uid"] in wanted]
+                index += 2
+            elif key == "SINCE":
+                index += 2  # every generated message counts as recent
+            elif key[0].isdigit() or key[0] == "*":
+                wanted = _parse_set(key, len(messages))
+                selected = [(seq, m) for seq, m in selected if seq in wanted]
+                index += 1
+            else:
+                index += 1
+
+        result = "".join(f" {m['uid'] if uid_mode else seq}" for seq, m in selected)
+        self.send(f"* SEARCH{result}\r\n")
+        self.send(f"{tag} OK SEARCH completed\r\n")
+
+    def do_fetch(self, tag, args, uid_mode):
+        sequence_set, _, items = args.partition(" ")
+        with self.server.mailbox.lock:
+            messages = list(self.server.mailbox.messages)
+
+        if uid_mode:
+            max_uid = messages[-1]["uid"] if messages else 0
+            wanted = _parse_set(sequence_set, max_uid)
+            selected = [(seq, m) for seq, m in enumerate(messages, start=1) if m["uid"] in wanted]
+        else:
+            wanted = _parse_set(sequence_set, len(messages))
+            selected = [(seq, m) for seq, m in enumerate(messages, start=1) if seq in wanted]
+
+        requested = [item.upper() for item in _split_items(items)]
+        if uid_mode and "UID" not in requested:
+            requested.insert(0, "UID")
+
+        for seq, message in selected:
+            self.send(b"* %d FETCH (" % seq)
+            for position, item in enumerate(requested):
+                if position:
+                    self.send(b" ")
+                self.send(self.render_item(item, message))
+            self.send(b")\r\n")
+        self.send(f"{tag} OK FETCH completed\r\n")
+
+    @staticmethod
+    def parsed(message):
+        # A real server keeps the MIME structure indexed; parse each message only once
+        if "parsed" not in message:
+            message["parsed"] = email.message_from_bytes(message["raw"])
+        return message["parsed"]
+
+    def render_item(self, item, message):
+        raw = message["raw"]
+        if item == "UID":
+            return b"UID %d" % message["uid"]
+        if item == "X-GM-MSGID":
+            return b"X-GM-MSGID %d" % message["gmail_id"]
+        if item == "RFC822.SIZE":
+            return b"RFC822.SIZE %d" % len(raw)
+        if item == "FLAGS":
+            return b"FLAGS ()"
+        if item in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+            name = b"RFC822" if item == "RFC822" else b"BODY[]"
+            return name + b" {%d}\r\n" % len(raw) + raw
+        if item == "BODYSTRUCTURE":
+            return b"BODYSTRUCTURE " + _bodystructure(self.parsed(message)).encode()
+        match = _BODY_ITEM_RE.match(item)
+        if match:
+            section, start, count = match.groups()
+            parsed = self.parsed(message)
+            if section.startswith("HEADER.FIELDS"):
+                wanted = section[section.index("(") + 1:section.rindex(")")].split()
+                data = b"".join(
+                    f"{name}: {value}\r\n".encode() for name, value in parsed.items() if name.upper() in wanted
+                ) + b"\r\n"
+            else:
+                data = _section(parsed, section)
+            name = f"BODY[{section}]"
+            if start is not None:
+                data = data[int(start):int(start) + int(count)]
+                name += f"<{start}>"
+            return name.encode() + b" {%d}\r\n" % len(data) + data
+        raise ValueError(f"Unsupported FETCH item: {item}")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, mailbox, latency):
+        super().__init__(address, _ImapHandler)
+        self.mailbox = mailbox
+        self.latency = latency
+        self.command_counts = Counter()
+        self.bytes_sent = 0
+        self._count_lock = threading.Lock()
+
+    def record(self, command):
+        with self._count_lock:
+            self.command_counts[command] += 1
+
+    def record_bytes(self, count):
+        with self._count_lock:
+            self.bytes_sent += count
+
+
+class FakeImapServer:
+    """
+    Run a fake IMAP server on a background thread.
+
+    Example:
+        with FakeImapServer(FakeMailbox.generate(500), latency=0.02) as server:
+            mail = imaplib.IMAP4(server.host, server.port)
+    """
+
+    def __init__(self, mailbox=None, latency=0.0, host="127.0.0.1", port=0):
+        self.mailbox = mailbox if mailbox is not None else FakeMailbox()
+        self._server = _Server((host, port), self.mailbox, latency)
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def command_counts(self):
+        return self._server.command_counts
+
+    @property
+    def bytes_sent(self):
+        return self._server.bytes_sent
+
+    def reset_counts(self):
+        self._server.command_counts.clear()
+        self._server.bytes_sent = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
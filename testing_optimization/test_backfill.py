@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+from backfill import BackfillService, RateBudget  # noqa: E402
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_rate_budget_spreads_chunks():
+    budget = RateBudget(rate=200, burst=20)
+    start = time.monotonic()
+    for _ in range(6):
+        budget.acquire(20)
+    # The first chunk is the burst, the other five wait 0.1 s each
+    assert 0.45 < time.monotonic() - start < 1.0
+
+
+def test_zero_rate_disables_backfill():
+    with pytest.raises(ValueError):
+        RateBudget(rate=0, burst=20)
+
+    step = MagicMock()
+    service = BackfillService(lambda user, password: MagicMock(), step, rate=0)
+    assert service.start("user@example.com", "pw") is False
+    assert service.status("user@example.com")["state"] is None
+    service.stop()
+    assert not step.called
+
+
+def test_backfill_waits_for_refreshes_and_finishes():
+    remaining = [100, 100, 30]
+    busy = threading.Event()
+    busy.set()
+    connection = MagicMock()
+
+    def step(mail, user_email, limit):
+        assert mail is connection and limit == 100
+        return remaining.pop(0) if remaining else 0
+
+    service = BackfillService(
+        lambda user, password: connection, step, chunk_size=100, rate=10_000, busy=busy.is_set, poll_interval=0.01
+    )
+    assert service.start("user@example.com", "pw") is True
+    assert service.start("user@example.com", "pw") is False  # already queued or running
+
+    time.sleep(0.1)
+    assert remaining == [100, 100, 30]  # nothing fetched while a refresh is in flight
+    busy.clear()
+    wait_for(lambda: service.status("user@example.com")["state"] == "done")
+
+    assert service.status("user@example.com") == {"state": "done", "backfilled": 230, "error": None}
+    assert service.stats()["done"] == 1 and service.stats()["backfilled"] == 230
+    assert connection.logout.call_count == 1
+    service.stop()
+
+
+def test_failed_backfill_can_restart():
+    calls = []
+
+    def step(mail, user_email, limit):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise OSError("connection reset")
+        return 0
+
+    service = BackfillService(lambda user, password: MagicMock(), step, rate=10_000)
+    service.start("user@example.com", "pw")
+    wait_for(lambda: service.status("user@example.com")["state"] == "failed")
+    assert service.status("user@example.com")["error"] == "connection reset"
+
+    assert service.start("user@example.com", "pw") is True
+    wait_for(lambda: service.status("user@example.com")["state"] == "done")
+    service.stop()
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+
+from utils import load_dataset, save_dataset
+
+
+@pytest.mark.parametrize("extension", [".arrow", ".parquet", ".csv"])
+def test_dataset_round_trip_reads_only_requested_columns(tmp_path, extension):
+    data = pd.DataFrame({
+        "label": ["Work", "Personal", "Urgent"],
+        "processed_content": ["meeting move", "dinner plan, next week", "server down\nrespond"],
+    }, index=[7, 3, 11])
+    path = str(tmp_path / f"train{extension}")
+
+    save_dataset(data, path)
+
+    assert load_dataset(path).equals(data.reset_index(drop=True))
+    assert list(load_dataset(path, columns=["processed_content"]).columns) == ["processed_content"]
+
@@ -0,0 +1,27 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from machine_learning.evaluate.test_models import predict_distilbert
+
+WORDS = ["meeting", "moved", "to", "friday", "sale", "ends", "tonight", "server", "down", "dinner"]
+
+
+def test_batched_predictions_match_single_pass(tmp_path):
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    tokenizer = transformers.DistilBertTokenizer(str(vocab_file))
+    torch.manual_seed(0)
+    config = transformers.DistilBertConfig(
+        vocab_size=len(WORDS) + 5, dim=32, hidden_dim=64, n_layers=2, n_heads=2, num_labels=4
+    )
+    model = transformers.DistilBertForSequenceClassification(config).eval()
+    texts = [" ".join(WORDS[: (i * 3) % len(WORDS) + 1]) for i in range(9)]
+
+    with torch.no_grad():
+        encodings = tokenizer(texts, truncation=True, padding=True, max_length=512, return_tensors="pt")
+        expected = torch.argmax(model(**encodings).logits, dim=1).numpy()
+
+    assert list(predict_distilbert(model, tokenizer, texts, batch_size=2)) == list(expected)
+    assert list(predict_distilbert(model, tokenizer, texts, batch_size=None)) == list(expected)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from machine_learning.predict.distilbert_runtime import LABELS, DistilBertRuntime
+
+
+class WordTokenizer:
+    """
+    Minimal stand-in for a Hugging Face tokenizer: one token ID per word.
+    """
+    def __call__(self, texts, truncation=True, max_length=512):
+        return {"input_ids": [[len(word) for word in text.split()][:max_length] for text in texts]}
+
+    def pad(self, encodings, return_tensors="np"):
+        input_ids = encodings["input_ids"]
+        width = max(len(ids) for ids in input_ids)
+        padded = np.zeros((len(input_ids), width), dtype=np.int64)
+        mask = np.zeros_like(padded)
+        for row, ids in enumerate(input_ids):
+            padded[row, :len(ids)] = ids
+            mask[row, :len(ids)] = 1
+        return {"input_ids": padded, "attention_mask": mask}
+
+
+def test_runtime_batches_by_length_and_keeps_input_order():
+    widths = []
+
+    def run(input_ids, attention_mask):
+        # Class = number of real tokens modulo 4, so every prediction is checkable
+        widths.append(input_ids.shape[1])
+        logits = np.zeros((len(input_ids), len(LABELS)), dtype=np.float32)
+        logits[np.arange(len(input_ids)), attention_mask.sum(axis=1) % len(LABELS)] = 1.0
+        return logits
+
+    texts = ["a b c", "a", "a b c d e f", "a b", "a b c d e", "a b c d"]
+    runtime = DistilBertRuntime(run, WordTokenizer(), batch_size=2)
+
+    assert list(runtime.predict(texts)) == [LABELS[len(text.split()) % 4] for text in texts]
+    assert widths == [2, 4, 6]  # Sorted batches are padded only to their own longest email
+    assert np.allclose(runtime.predict_proba(texts).sum(axis=1), 1.0)
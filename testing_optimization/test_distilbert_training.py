@@ -0,0 +1,28 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from machine_learning.training.train_distilbert import EmailDataset, LengthGroupedTrainer
+
+
+def test_length_grouped_sampler_uses_precomputed_lengths(tmp_path, monkeypatch):
+    input_ids = [[101] + [7] * length + [102] for length in (30, 2, 17, 5, 9, 1, 25, 12)]
+    dataset = EmailDataset({"input_ids": input_ids}, [0, 1, 2, 3] * 2)
+    config = transformers.DistilBertConfig(vocab_size=128, dim=32, hidden_dim=64, n_layers=1, n_heads=2, num_labels=4)
+    trainer = LengthGroupedTrainer(
+        model=transformers.DistilBertForSequenceClassification(config),
+        args=transformers.TrainingArguments(
+            output_dir=str(tmp_path), per_device_train_batch_size=2, group_by_length=True, report_to=[]
+        ),
+        train_dataset=dataset,
+    )
+
+    def measured(self, idx):
+        raise AssertionError("lengths were measured again")
+
+    monkeypatch.setattr(EmailDataset, "__getitem__", measured)
+    sampler = trainer._get_train_sampler()
+
+    assert sorted(sampler) == list(range(len(dataset)))
+    assert sampler.lengths == [len(ids) for ids in input_ids]
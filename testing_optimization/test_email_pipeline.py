@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import categorize  # noqa: E402
+from machine_learning.predict.linear_model import LinearEmailClassifier  # noqa: E402
+from machine_learning.preprocessing import process_and_split_dataset as split_module  # noqa: E402
+from machine_learning.preprocessing.lexicon_preprocessor import LexiconPreprocessor, tokenize  # noqa: E402
+from machine_learning.training.train_svm import train_svm  # noqa: E402
+from machine_learning.vectorizers.feature_cache import get_feature_matrix  # noqa: E402
+from machine_learning.vectorizers.train_vectorizer import train_and_save_vectorizer  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+from utils import load_config, load_dataset  # noqa: E402
+
+
+def fake_spacy(texts, n_process=1, batch_size=256):
+    # Stand-in for the POS filter: drop greetings and short words
+    return [" ".join(t for t in tokenize(text) if len(t) > 3 and t not in {"dear", "hello"}) for text in texts]
+
+
+def test_lexicon_preprocessor_learns_spacy_decisions():
+    raw = ["Hi Anna, the meeting moved", "Hi Ben, the sale ends", "Anna: meeting notes"]
+    processed = ["the meeting moved", "the sale ends", "meeting notes"]
+
+    preprocessor = LexiconPreprocessor().fit(raw, processed=processed)
+
+    assert preprocessor.dropped_ == {"hi", "anna", "ben"}
+    # Unknown words are kept, digits and punctuation never are
+    assert preprocessor.transform(["Hi Zoe, 50% off the SALE!"]) == ["zoe off the sale"]
+
+
+def test_trainer_and_server_predict_the_same(tmp_path):
+    with open(load_config()["paths"]["data"]["dataset"], "r", encoding="utf-8") as f:
+        entries = json.load(f)[:240]
+    dataset_path = str(tmp_path / "dataset.json")
+    with open(dataset_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    paths = {name: str(tmp_path / name) for name in (
+        "train.arrow", "test.arrow", "preprocessor.pkl", "tfidf.pkl", "svm.npz", "svm_pipeline.pkl", "features"
+    )}
+
+    # Training side: split + preprocess, vectorizer, trainer (features from the shared cache)
+    with patch.object(split_module, "preprocess_texts", fake_spacy):
+        split_module.process_and_split_dataset(
+            dataset_path, paths["train.arrow"], paths["test.arrow"], paths["preprocessor.pkl"]
+        )
+    train_and_save_vectorizer(paths["train.arrow"], 2000, (1, 2), paths["tfidf.pkl"])
+    train_svm(
+        paths["train.arrow"], "linear", 1.0, paths["svm.npz"], paths["tfidf.pkl"], paths["features"],
+        paths["preprocessor.pkl"], paths["svm_pipeline.pkl"], svm_engine="linear"
+    )
+    X_test, _ = get_feature_matrix(paths["test.arrow"], paths["tfidf.pkl"], paths["features"])
+    trained = list(LinearEmailClassifier.load(paths["svm.npz"]).predict(X_test))
+
+    # Serving side: the same test emails, raw, through categorize.categorize_emails
+    by_content = {f"{e['subject']} {e['body']}": (e["subject"], e["body"]) for e in entries}
+    batch = [by_content[content] for content in load_dataset(paths["test.arrow"], columns=["content"])["content"]]
+    registry = ModelRegistry({categorize.PIPELINE_NAME: paths["svm_pipeline.pkl"]})
+    with patch.object(categorize, "registry", registry):
+        served = categorize.categorize_emails(batch, backend="svm")
+
+    assert len(served) == len(batch) == 48
+    assert served == trained
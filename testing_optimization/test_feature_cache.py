@@ -0,0 +1,40 @@
+import os
+import pickle
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from machine_learning.vectorizers import feature_cache
+from utils import save_dataset
+
+
+def write_fixtures(tmp_path, texts):
+    data_path = str(tmp_path / "train.arrow")
+    save_dataset(pd.DataFrame({"processed_content": texts, "label": ["Work", "Personal"] * (len(texts) // 2)}), data_path)
+    vectorizer_path = str(tmp_path / "tfidf.pkl")
+    with open(vectorizer_path, "wb") as f:
+        pickle.dump(TfidfVectorizer().fit(texts), f)
+    return data_path, vectorizer_path
+
+
+def test_feature_matrix_is_computed_once_and_invalidated_on_change(tmp_path, monkeypatch):
+    data_path, vectorizer_path = write_fixtures(tmp_path, ["meeting move", "dinner plan", "server down", "sale weekend"])
+    cache_dir = str(tmp_path / "features")
+    transforms = []
+    load_dataset = feature_cache.load_dataset
+    monkeypatch.setattr(feature_cache, "load_dataset", lambda *a, **k: transforms.append(a) or load_dataset(*a, **k))
+
+    X, y = feature_cache.get_feature_matrix(data_path, vectorizer_path, cache_dir)
+    X_cached, y_cached = feature_cache.get_feature_matrix(data_path, vectorizer_path, cache_dir)
+
+    assert len(transforms) == 1
+    assert (X != X_cached).nnz == 0
+    assert list(y_cached) == ["Work", "Personal", "Work", "Personal"]
+
+    # New data: a new key, and the stale matrix of the same dataset is removed.
+    write_fixtures(tmp_path, ["meeting moved", "dinner plans", "server is down", "big sale"])
+    X_new, _ = feature_cache.get_feature_matrix(data_path, vectorizer_path, cache_dir)
+
+    assert len(transforms) == 2
+    assert X_new.shape[1] != X.shape[1] or (X_new != X).nnz > 0
+    assert len(os.listdir(cache_dir)) == 1
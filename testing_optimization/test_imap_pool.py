@@ -0,0 +1,101 @@
+import imaplib
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+from imap_idle import MailboxWatcher  # noqa: E402
+from imap_pool import ImapConnectionPool  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox, make_message  # noqa: E402
+
+
+def connector(server):
+    def connect(user_email, app_password):
+        mail = imaplib.IMAP4(server.host, server.port)
+        mail.login(user_email, app_password)
+        return mail
+    return connect
+
+
+def test_pool_reuses_sessions_and_reconnects_dead_ones():
+    with FakeImapServer(FakeMailbox.generate(3)) as server:
+        pool = ImapConnectionPool(connector(server), health_check_interval=0)
+
+        with pool.connection("alice@example.com", "pw") as mail:
+            first = mail
+            assert mail.select("inbox")[0] == "OK"
+        with pool.connection("alice@example.com", "pw") as mail:
+            assert mail is first
+            mail.shutdown()  # Simulate the server dropping the session between refreshes
+        with pool.connection("alice@example.com", "pw") as mail:
+            assert mail is not first
+            assert mail.select("inbox")[0] == "OK"
+
+        assert server.command_counts["LOGIN"] == 2
+        assert pool.stats() == {"connects": 2, "reuses": 1, "reconnects": 1, "evictions": 0, "open": 1}
+        pool.close_all()
+
+
+def test_idle_watcher_reports_new_mail():
+    mailbox = FakeMailbox.generate(2)
+    with FakeImapServer(mailbox) as server:
+        changed = threading.Event()
+        watcher = MailboxWatcher(connector(server), lambda user, password: changed.set(), retry_delay=0.1)
+        watcher.watch("alice@example.com", "pw")
+
+        # Wait until the watch thread is idling, then deliver a message.
+        for _ in range(200):
+            if server.command_counts["IDLE"]:
+                break
+            changed.wait(0.01)
+        mailbox.append(make_message(3))
+
+        assert changed.wait(5)
+        assert watcher.watching("alice@example.com")
+        watcher.stop()
+        assert not watcher.watching("alice@example.com")
+
+
+def test_idle_watcher_survives_failing_callbacks():
+    mailbox = FakeMailbox.generate(2)
+    with FakeImapServer(mailbox) as server:
+        calls = []
+        recovered = threading.Event()
+
+        def on_change(user, password):
+            calls.append(user)
+            if len(calls) == 1:
+                raise ValueError("refresh failed")
+            recovered.set()
+
+        watcher = MailboxWatcher(connector(server), on_change, retry_delay=0.05)
+        watcher.watch("alice@example.com", "pw")
+        for count in (1, 2):
+            # Deliver a message once the watch thread is idling (again, after the error)
+            for _ in range(200):
+                if server.command_counts["IDLE"] >= count:
+                    break
+                recovered.wait(0.01)
+            mailbox.append(make_message(2 + count))
+
+        assert recovered.wait(5)
+        assert server.command_counts["LOGIN"] == 2
+        assert watcher.watching("alice@example.com")
+        watcher.stop()
+
+
+def test_ended_watch_thread_is_forgotten(monkeypatch):
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+
+    def connect(user_email, app_password):
+        raise SystemExit  # ends the thread, like any error escaping the retry loop
+
+    watcher = MailboxWatcher(connect, lambda user, password: None)
+    watcher.watch("alice@example.com", "pw")
+    for _ in range(500):
+        if not watcher.watching("alice@example.com"):
+            break
+        threading.Event().wait(0.01)
+
+    assert not watcher.watching("alice@example.com")
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from testing_optimization.bench_import_time import IMPORT_BUDGET_MS, PROJECT_ROOT, measure_import
+
+
+def test_utils_import_does_not_load_heavy_dependencies():
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, utils; print(sorted(m for m in ('spacy', 'pandas', 'sklearn') if m in sys.modules))"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_utils_import_time_within_budget():
+    total_ms, _ = measure_import("utils")
+
+    assert total_ms < IMPORT_BUDGET_MS
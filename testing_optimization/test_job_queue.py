@@ -0,0 +1,110 @@
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import categorize  # noqa: E402
+from job_queue import JobQueue, WorkerPool  # noqa: E402
+
+BATCH = [
+    ("Team meeting moved to 3pm", "Please update the project timeline before the meeting."),
+    ("50% off everything this weekend", "Shop our biggest sale of the year."),
+    ("URGENT: server down", "Production is down, please respond immediately."),
+]
+
+
+def test_jobs_are_claimed_once_and_requeued_after_a_crash(tmp_path):
+    jobs = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = jobs.enqueue("categorize", (BATCH, "svm"))
+    second = jobs.enqueue("categorize", ([], "svm"))
+
+    assert jobs.claim("worker-0") == (first, "categorize", (BATCH, "svm"))
+    assert jobs.claim("worker-1")[0] == second
+    assert jobs.claim("worker-2") is None
+
+    jobs.finish(second, result=[])
+    assert jobs.requeue("worker-0") == 1  # worker-0 died with its job
+    assert jobs.claim("worker-2")[0] == first
+    jobs.finish(first, error="ValueError: bad input")
+
+    assert jobs.get(first) == {"status": "failed", "result": None, "error": "ValueError: bad input"}
+    assert jobs.get(second) == {"status": "done", "result": [], "error": None}
+    assert jobs.stats() == {"queued": 0, "running": 0, "done": 1, "failed": 1}
+
+
+def test_pools_sharing_a_queue_only_touch_their_own_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    other, stale = JobQueue(path), JobQueue(path)
+    theirs = other.enqueue("categorize", (BATCH, "svm"), owner="other-pool")
+    abandoned = stale.enqueue("categorize", (BATCH, "svm"), owner="dead-pool")
+
+    pool = WorkerPool(path, "classify_worker", categorize.JOB_HANDLERS, ThreadPoolExecutor(1), processes=1)
+    ours = pool.queue.enqueue("categorize", ([], "svm"), owner=pool.owner)
+    assert pool.queue.claim("worker-0", pool.owner)[0] == ours
+    assert pool.queue.claim("worker-0", pool.owner) is None  # the other pools' jobs stay queued
+    assert other.get(theirs)["status"] == "queued"
+
+    time.sleep(0.05)
+    pool.queue.prune(max_age=0.01)  # unfinished jobs that old belong to pools that are gone
+    assert other.get(abandoned) is None and other.get(theirs) is None
+
+    pool.queue.finish(ours, result=[])
+    assert pool.queue.abandon(pool.owner, "RuntimeError: Job workers stopped") == 0
+
+
+def test_collector_fails_the_future_of_a_vanished_job(tmp_path):
+    pool = WorkerPool(
+        str(tmp_path / "jobs.sqlite3"), "classify_worker", categorize.JOB_HANDLERS, ThreadPoolExecutor(1), processes=1
+    )
+    pool._running = True
+    pool._finished = queue.Queue()
+    collector = threading.Thread(target=pool._collect, daemon=True)
+    collector.start()
+    try:
+        futures = [Future(), Future()]
+        job_ids = [pool.queue.enqueue("categorize", (BATCH, "svm"), owner=pool.owner) for _ in futures]
+        pool._futures = dict(zip(job_ids, futures))
+        pool.queue.delete(job_ids[:1])
+        pool.queue.finish(job_ids[1], result=["Work"])
+        for job_id in job_ids:
+            pool._finished.put((job_id, "worker-0", None))
+
+        with pytest.raises(RuntimeError, match="disappeared"):
+            futures[0].result(timeout=5)
+        assert futures[1].result(timeout=5) == ["Work"]  # the collector is still running
+    finally:
+        pool._running = False
+        collector.join(timeout=5)
+
+
+def test_worker_processes_match_in_process_classification(tmp_path):
+    pool = WorkerPool(
+        str(tmp_path / "jobs.sqlite3"), "classify_worker", categorize.JOB_HANDLERS, ThreadPoolExecutor(1), processes=2
+    )
+    expected = categorize.categorize_emails(BATCH, backend="svm")
+    assert pool.submit("categorize", (BATCH, "svm")).result() == expected  # not started: in-process
+    assert pool.stats()["local"] == 1
+
+    pool.start()
+    try:
+        futures = [pool.submit("categorize", (BATCH, "svm")) for _ in range(8)]
+        assert [future.result(timeout=60) for future in futures] == [expected] * 8
+        # Each worker reports its own prediction-cache counters with its results
+        reported = pool.worker_stats().values()
+        assert sum(s["prediction_cache"]["hits"] + s["prediction_cache"]["misses"] for s in reported) == 8 * len(BATCH)
+
+        # A killed worker is replaced and the pool keeps answering
+        os.kill(pool._workers[f"{pool.owner}:worker-0"].pid, signal.SIGKILL)
+        time.sleep(1.5)
+        assert pool.submit("categorize", (BATCH, "svm")).result(timeout=60) == expected
+        assert pool.stats()["restarts"] == 1 and pool.stats()["processes"] == 2
+        assert pool.stats()["jobs"]["done"] == 0  # collected results are removed
+    finally:
+        pool.stop()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+
+from machine_learning.predict.linear_model import LinearEmailClassifier
+from machine_learning.training.train_svm import build_linear_svm
+
+
+@pytest.mark.parametrize("n_classes", [2, 4])
+def test_exported_model_matches_calibrated_svm(tmp_path, n_classes):
+    X, y = make_classification(
+        n_samples=300, n_features=20, n_informative=8, n_classes=n_classes, random_state=0
+    )
+    labels = np.array(["Work", "Personal", "Promotional", "Urgent"])[y]
+    calibrated = build_linear_svm(1.0).fit(X, labels)
+
+    LinearEmailClassifier.from_calibrated(calibrated).save(str(tmp_path / "svm.npz"))
+    exported = LinearEmailClassifier.load(str(tmp_path / "svm.npz"))
+
+    np.testing.assert_allclose(exported.predict_proba(X), calibrated.predict_proba(X), atol=1e-6)
+    assert list(exported.predict(X)) == list(calibrated.predict(X))
+    assert exported.decision_function(X).shape == ((300,) if n_classes == 2 else (300, n_classes))
+
+
+def test_mismatched_weights_are_rejected():
+    with pytest.raises(ValueError, match="2 classes need 1 weight rows"):
+        LinearEmailClassifier(["a", "b"], np.zeros((2, 3)), np.zeros(2), [1.0, 1.0], [0.0, 0.0])
@@ -0,0 +1,101 @@
+import os
+import pickle
+from unittest.mock import patch
+
+import pytest
+
+from model_registry import ModelRegistry
+from utils import save_pickle
+
+
+def write_pickle(path, obj, mtime):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_models_load_lazily_once(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_pickle(path, {"version": 1}, 1_000_000_000)
+    registry = ModelRegistry({"model": str(path)}, check_interval=0, measure_memory=True)
+
+    assert registry.stats() == {}
+    first = registry.get("model")
+    second = registry.get("model")
+
+    assert first is second
+    stats = registry.stats()["model"]
+    assert stats["loads"] == 1
+    assert stats["load_time_s"] >= 0
+    assert stats["memory_bytes"] > 0
+    assert stats["file_bytes"] == os.path.getsize(path)
+
+
+def test_loads_are_not_traced_by_default(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_pickle(path, {"version": 1}, 1_000_000_000)
+    registry = ModelRegistry({"model": str(path)}, check_interval=0)
+
+    with patch("model_registry.tracemalloc") as tracemalloc:
+        registry.get("model")
+
+    assert not tracemalloc.start.called
+    assert registry.stats()["model"]["memory_bytes"] is None
+    assert registry.stats()["model"]["file_bytes"] == os.path.getsize(path)  # reported without tracing
+
+
+def test_changed_file_is_hot_reloaded(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_pickle(path, {"version": 1}, 1_000_000_000)
+    registry = ModelRegistry({"model": str(path)}, check_interval=0)
+    assert registry.get("model") == {"version": 1}
+
+    write_pickle(path, {"version": 2}, 2_000_000_000)
+    assert registry.get("model") == {"version": 2}
+    assert registry.stats()["model"]["loads"] == 2
+
+
+def test_failed_reload_keeps_previous_model(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_pickle(path, {"version": 1}, 1_000_000_000)
+    registry = ModelRegistry({"model": str(path)}, check_interval=0)
+    registry.get("model")
+
+    # Simulate a trainer that is still writing the new artifact
+    path.write_bytes(b"\x80\x04truncated")
+    assert registry.get("model") == {"version": 1}
+    assert registry.stats()["model"]["error"]
+
+
+def test_missing_file_keeps_loaded_model(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_pickle(path, {"version": 1}, 1_000_000_000)
+    registry = ModelRegistry({"model": str(path)}, check_interval=0)
+    registry.get("model")
+
+    os.rename(path, tmp_path / "moved.pkl")
+    assert registry.get("model") == {"version": 1}
+    assert registry.stats()["model"]["error"]
+
+    os.rename(tmp_path / "moved.pkl", path)
+    assert registry.get("model") == {"version": 1}
+    assert registry.stats()["model"]["error"] is None
+    assert registry.stats()["model"]["loads"] == 1
+
+
+def test_artifacts_are_replaced_atomically(tmp_path):
+    path = tmp_path / "model.pkl"
+    save_pickle({"version": 1}, str(path))
+
+    with patch("utils.pickle.dump", side_effect=RuntimeError("trainer crashed")), pytest.raises(RuntimeError):
+        save_pickle({"version": 2}, str(path))
+
+    assert pickle.loads(path.read_bytes()) == {"version": 1}
+    assert os.listdir(tmp_path) == ["model.pkl"]  # no half-written temporary file left behind
+
+
+def test_configured_models_are_registered():
+    registry = ModelRegistry()
+    registry.preload(["tfidf_vectorizer"])
+
+    assert set(registry.stats()) == {"tfidf_vectorizer"}
@@ -0,0 +1,34 @@
+import imaplib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import categorize  # noqa: E402
+from imap_fetch import fetch_messages, iter_partial_batches  # noqa: E402
+from testing_optimization.fake_imap_server import FakeImapServer, FakeMailbox, make_message  # noqa: E402
+
+
+def test_partial_fetch_skips_attachments_and_matches_full_parse():
+    mailbox = FakeMailbox([
+        make_message(1),
+        make_message(2, html=False, attachment_bytes=200_000),
+        make_message(3, attachment_bytes=200_000),
+    ])
+    with FakeImapServer(mailbox) as imap:
+        mail = imaplib.IMAP4(imap.host, imap.port)
+        mail.login("user@example.com", "app-password")
+        mail.select("inbox")
+
+        imap.reset_counts()
+        partial = [m for batch in iter_partial_batches(mail, [1, 2, 3]) for m in batch]
+        partial_bytes = imap.bytes_sent
+        full = fetch_messages(mail, [1, 2, 3], items="(UID RFC822 X-GM-MSGID)", uid=True)
+        mail.logout()
+
+    assert partial_bytes < 10_000
+    assert [m["part"]["section"] for m in partial] == ["2", "1", "1.2"]
+    parsed = [categorize.parse_partial(m["header"], m["part"], m["body"]) for m in partial]
+    assert [parsed[0], parsed[2]] == [categorize.parse_email(full[0]["raw"]), categorize.parse_email(full[2]["raw"])]
+    # A plain-text body next to an attachment is shown too (the full parser only looked for HTML)
+    assert parsed[1][2].startswith("word2 word3")
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from machine_learning.run_pipeline import Stage, run_pipeline
+
+
+def copy_upper(config):
+    with open(config["paths"]["raw"]) as src, open(config["paths"]["clean"], "w") as dst:
+        dst.write(src.read().upper())
+
+
+def write_model(config, name):
+    with open(config["paths"]["clean"]) as src, open(config["paths"][name], "w") as dst:
+        dst.write(f"{src.read()} x{config['params'][name]}")
+
+
+# Stage functions run in the process pool, so they must be module-level
+def write_model_a(config):
+    write_model(config, "a")
+
+
+def write_model_b(config):
+    write_model(config, "b")
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    paths = {key: str(tmp_path / key) for key in ("raw", "clean", "a", "b")}
+    with open(paths["raw"], "w") as f:
+        f.write("hello")
+    config = {"paths": paths, "params": {"a": 1, "b": 2}}
+    stages = [
+        Stage("clean", copy_upper, inputs=["paths.raw"], outputs=["paths.clean"]),
+        Stage("a", write_model_a, deps=["clean"], parallel=True,
+              inputs=["paths.clean"], outputs=["paths.a"], params=["params.a"]),
+        Stage("b", write_model_b, deps=["clean"], parallel=True,
+              inputs=["paths.clean"], outputs=["paths.b"], params=["params.b"]),
+    ]
+    return stages, config, str(tmp_path / "state.json")
+
+
+def test_pipeline_skips_unchanged_stages(pipeline):
+    stages, config, state_path = pipeline
+
+    assert run_pipeline(stages, config, state_path, max_workers=2) == {"clean": "ran", "a": "ran", "b": "ran"}
+    with open(config["paths"]["b"]) as f:
+        assert f.read() == "HELLO x2"
+    assert set(run_pipeline(stages, config, state_path).values()) == {"skipped"}
+
+    # A parameter change re-runs only the stage that reads it.
+    config["params"]["b"] = 3
+    assert run_pipeline(stages, config, state_path) == {"clean": "skipped", "a": "skipped", "b": "ran"}
+
+    # Rewriting the input with identical content skips every stage.
+    with open(config["paths"]["raw"], "w") as f:
+        f.write("hello")
+    assert set(run_pipeline(stages, config, state_path).values()) == {"skipped"}
+
+    # A missing output or a forced stage runs again.
+    os.remove(config["paths"]["a"])
+    assert run_pipeline(stages, config, state_path, force=["clean"]) == {"clean": "ran", "a": "ran", "b": "skipped"}
+
+
+def test_pipeline_rejects_unknown_stages(pipeline):
+    stages, config, state_path = pipeline
+
+    with pytest.raises(ValueError):
+        run_pipeline(stages, config, state_path, force=["missing"])
+    with pytest.raises(ValueError):
+        run_pipeline(stages + [Stage("orphan", copy_upper, deps=["missing"])], config, state_path)
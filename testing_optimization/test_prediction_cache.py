@@ -0,0 +1,60 @@
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+from prediction_cache import PredictionCache  # noqa: E402
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, texts):
+        self.calls.append(list(texts))
+        return ["Promotional" if "sale" in text else "Work" for text in texts]
+
+
+def test_cached_keys_are_predicted_once():
+    cache, model = PredictionCache(), CountingModel()
+    texts = ["big sale", "meeting", "big sale"]
+
+    first = cache.predict("svm", "v1", texts, texts, model.predict)
+    second = cache.predict("svm", "v1", texts + ["new sale"], texts + ["new sale"], model.predict)
+
+    assert first == ["Promotional", "Work", "Promotional"]
+    assert second == first + ["Promotional"]
+    assert model.calls == [["big sale", "meeting"], ["new sale"]]
+    assert cache.stats()["hits"] == 4 and cache.stats()["misses"] == 3
+
+
+def test_lru_eviction_ttl_and_model_version():
+    cache, model = PredictionCache(max_entries=2, ttl=60), CountingModel()
+    cache.predict("svm", "v1", ["a", "b", "c"], ["a", "b", "c"], model.predict)
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+    cache.predict("svm", "v1", ["b", "c"], ["b", "c"], model.predict)
+    assert len(model.calls) == 1
+
+    # A retrained model (new artifact version) never sees the old predictions
+    cache.predict("svm", "v2", ["b"], ["b"], model.predict)
+    assert model.calls[-1] == ["b"] and cache.stats()["invalidations"] == 1
+
+    with patch("prediction_cache.time.time", return_value=10 ** 12):
+        cache.predict("svm", "v2", ["b"], ["b"], model.predict)
+    assert len(model.calls) == 3
+
+
+def test_persisted_predictions_survive_restart(tmp_path):
+    path = str(tmp_path / "predictions.sqlite3")
+    model = CountingModel()
+    PredictionCache(path=path).predict("svm", "v1", ["big sale"], ["big sale"], model.predict)
+
+    restarted = PredictionCache(path=path)
+    assert restarted.predict("svm", "v1", ["big sale"], ["big sale"], model.predict) == ["Promotional"]
+    assert restarted.stats()["disk_hits"] == 1
+    assert len(model.calls) == 1
+
+    restarted.predict("svm", "v2", ["big sale"], ["big sale"], model.predict)
+    assert len(model.calls) == 2
@@ -0,0 +1,50 @@
+import pytest
+import spacy
+
+if not spacy.util.is_package("en_core_web_sm"):
+    pytest.skip("spaCy model 'en_core_web_sm' is not installed", allow_module_level=True)
+
+from utils import preprocess_text, preprocess_texts
+
+TEXTS = [
+    "Team meeting moved to 3pm",
+    "Please update the project timeline before Friday's review!",
+    "50% OFF everything this weekend -- shop our biggest sale of the year.",
+    "Dinner plans? Are you free next week?",
+    "",
+    "URGENT: Production is down, please respond immediately.",
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """
+    Output of the original preprocess_text, which ran the full pipeline (parser,
+    senter and NER included); excluding those components must not change it.
+    """
+    nlp = spacy.load("en_core_web_sm")
+    return [
+        " ".join(
+            token.text for token in nlp(text.lower())
+            if token.is_alpha and (token.is_stop or token.pos_ in {"NOUN", "VERB", "ADJ", "ADV"})
+        )
+        for text in TEXTS
+    ]
+
+
+def test_trimmed_pipeline_matches_full_pipeline(reference):
+    assert [preprocess_text(text) for text in TEXTS] == reference
+    assert preprocess_texts(TEXTS, batch_size=2) == reference
+
+
+def test_preprocess_texts_matches_preprocess_text():
+    expected = [preprocess_text(text) for text in TEXTS]
+
+    assert preprocess_texts(TEXTS) == expected
+    assert preprocess_texts(TEXTS, batch_size=2) == expected
+
+
+def test_preprocess_texts_multiprocess_matches_preprocess_text():
+    expected = [preprocess_text(text) for text in TEXTS]
+
+    assert preprocess_texts(TEXTS, n_process=2, batch_size=2) == expected
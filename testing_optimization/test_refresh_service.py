@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+from refresh_service import RefreshService  # noqa: E402
+
+
+def wait_idle(service, timeout=5):
+    # Done-callbacks run just after result() returns, so give them a moment to record the outcome
+    deadline = time.monotonic() + timeout
+    while service.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return service.stats()
+
+
+def test_concurrent_refreshes_of_one_key_share_a_run():
+    service = RefreshService(max_workers=4)
+    release = threading.Event()
+    calls = []
+
+    def refresh(user):
+        calls.append(user)
+        release.wait(5)
+        return f"synced {user}"
+
+    first = service.submit("alice", refresh, "alice")
+    second = service.submit("alice", refresh, "alice")
+    other = service.submit("bob", refresh, "bob")
+    release.set()
+
+    assert first is second
+    assert first.result(5) == "synced alice" and other.result(5) == "synced bob"
+    assert sorted(calls) == ["alice", "bob"]
+
+    # Once finished, the next refresh runs again.
+    assert service.submit("alice", refresh, "alice").result(5) == "synced alice"
+    assert wait_idle(service) == {"submitted": 3, "coalesced": 1, "completed": 3, "failed": 0, "in_flight": 0}
+    service.shutdown()
+
+
+def test_slow_mailboxes_do_not_serialize():
+    service = RefreshService(max_workers=8)
+    start = time.perf_counter()
+    futures = [service.submit(user, time.sleep, 0.2) for user in range(8)]
+    for future in futures:
+        future.result(5)
+
+    assert time.perf_counter() - start < 0.2 * 4
+    service.shutdown()
+
+
+def test_failed_refresh_is_reported_and_retried():
+    service = RefreshService(max_workers=2)
+
+    def fail():
+        raise ConnectionError("IMAP login failed")
+
+    with pytest.raises(ConnectionError):
+        service.submit("alice", fail).result(5)
+    assert service.submit("alice", lambda: "ok").result(5) == "ok"
+    assert wait_idle(service)["failed"] == 1
+    service.shutdown()
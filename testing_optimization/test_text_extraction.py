@@ -0,0 +1,36 @@
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "back_end"))
+
+import text_extract  # noqa: E402
+from text_extract import extract_text  # noqa: E402
+
+NEWSLETTER = """<!DOCTYPE html>
+<html><head><title>Weekly deals</title><style>p { color: red; }</style></head>
+<body>
+  <span style="display:none">Preview&#8203;&zwnj; text</span>
+  <table><tr><td><h1>50% off</h1></td><td>everything&nbsp;this&nbsp;weekend</td></tr></table>
+  <script>window.track("open");</script>
+  <!-- tracking pixel -->
+  <p>Shop <a href="https://example.com">now</a> &amp; save</p>
+</body></html>"""
+
+
+def test_extract_text_keeps_only_visible_text():
+    assert extract_text(NEWSLETTER) == "Preview text 50% off everything this weekend Shop now & save"
+
+
+def test_html_parser_fallback_matches_lxml():
+    pytest.importorskip("lxml")
+    with patch.object(text_extract, "lxml_html", None):
+        fallback = extract_text(NEWSLETTER)
+    assert fallback == extract_text(NEWSLETTER)
+
+
+@pytest.mark.parametrize("html", ["", "   ", "<!-- only a comment -->", "plain words, no tags"])
+def test_extract_text_degenerate_documents(html):
+    assert extract_text(html) == ("plain words, no tags" if "words" in html else "")
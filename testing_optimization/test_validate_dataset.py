@@ -0,0 +1,100 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from utils import iter_json_array, validate_dataset_stream
+
+
+def make_entry(i, **overrides):
+    entry = {
+        "id": i,
+        "date": "2023-09-20",
+        "from": "olivia.miller@email.com",
+        "to": "noah.anderson@email.com",
+        "subject": f"Dinner plans {i}?",
+        "body": "Are you free next week? [yes, no] {maybe}",
+        "label": ["Work", "Personal", "Promotional", "Urgent"][i % 4],
+        "reasoning": "A simple personal question.",
+        "target_scenario": "Extremely short",
+    }
+    entry.update(overrides)
+    return entry
+
+
+def write_dataset(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=4)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_iter_json_array_matches_json_load(chunk_size):
+    data = [make_entry(1), 12345, -0.5e3, "a, ] string", [1, [2, 3]], None, True, {"ünïcode": "✅"}, 67890]
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == data
+    assert list(iter_json_array(io.StringIO(" [ ] "), chunk_size=chunk_size)) == []
+
+
+@pytest.mark.parametrize("text", [
+    "[1, 2", '{"id": 1}', "[1, {]", "",
+    "[1 2]",  # missing comma
+    '[{"id": 1} {"id": 2}]',
+    "[,,1]",  # leading commas
+    "[1,, 2]",  # doubled comma
+    "[1, 2,]",  # trailing comma
+    "[,]",
+    "[1, 2] 3",  # content after the array
+    "[1, 2]]",
+])
+def test_iter_json_array_rejects_malformed_input(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size=4))
+
+
+def test_stream_report_counts_labels_and_errors(tmp_path):
+    entries = [make_entry(i) for i in range(1, 21)]
+    entries[4]["label"] = None
+    del entries[9]["body"]
+    entries[14]["id"] = "15"
+    path = write_dataset(tmp_path / "dataset.json", entries)
+
+    report = validate_dataset_stream(path, chunk_size=128)
+
+    assert report["valid"] is False
+    assert report["entries"] == 20
+    assert report["error_count"] == 3
+    assert [error["entry"] for error in report["errors"]] == [5, 10, 15]
+    assert report["errors"][1]["issues"] == ["Missing key: 'body'"]
+    assert sum(report["label_counts"].values()) == 19
+
+
+def test_stream_stops_or_samples_after_max_errors(tmp_path):
+    entries = [make_entry(i, label=None) for i in range(1, 101)]
+    path = write_dataset(tmp_path / "dataset.json", entries)
+
+    stopped = validate_dataset_stream(path, max_errors=5, on_max_errors="stop")
+    assert stopped["stopped_early"] is True
+    assert [error["entry"] for error in stopped["errors"]] == [1, 2, 3, 4, 5]
+
+    sampled = validate_dataset_stream(path, max_errors=5, on_max_errors="sample")
+    assert sampled["entries"] == 100
+    assert sampled["error_count"] == 100
+    assert sampled["errors_sampled"] is True
+    assert len(sampled["errors"]) == 5
+
+
+def test_stream_memory_is_independent_of_file_size(tmp_path):
+    def peak_memory(count):
+        path = write_dataset(tmp_path / f"dataset_{count}.json", [make_entry(i) for i in range(count)])
+        tracemalloc.start()
+        report = validate_dataset_stream(path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert report["entries"] == count
+        return peak
+
+    small, large = peak_memory(1_000), peak_memory(20_000)
+    assert large < small * 1.5
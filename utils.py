@@ -2,19 +2,45 @@ import csv
 import json
 import os
 import pickle
-from typing import Counter
-import pandas as pd
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Counter
 import yaml
-import spacy
-from spacy.cli import download
+from model_registry import get_model
+
+# pandas and spaCy are imported lazily: most consumers of utils (load_config,
+# validate_dataset, the model loaders) never need them.
+if TYPE_CHECKING:
+    import pandas as pd
+
+# preprocess_text only needs tokens, POS tags (tok2vec -> tagger -> attribute_ruler)
+# and the lemmatizer, so the parser and NER are never loaded.
+SPACY_EXCLUDE = ["parser", "senter", "ner"]
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    Load the spaCy pipeline on first use, downloading 'en_core_web_sm' if it is missing.
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                try:
+                    _nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+                except OSError:
+                    from spacy.cli import download
+                    print("Model 'en_core_web_sm' not found. Downloading...")
+                    download("en_core_web_sm")
+                    _nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+    return _nlp
 
-# Ensure the spaCy model is available
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Model 'en_core_web_sm' not found. Downloading...")
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
 
 def load_config(config_path="config.yaml"):
     """
@@ -26,7 +52,79 @@ def load_config(config_path="config.yaml"):
         return yaml.safe_load(file)
     
 
-def validate_data(data: pd.DataFrame, required_columns: list):
+def load_dataset(path, columns=None):
+    """
+    Load a processed dataset, reading only the requested columns.
+
+    Arrow IPC files ('.arrow' / '.feather') are memory-mapped; Parquet and CSV are
+    also supported so older exports keep working.
+
+    Args:
+        path (str): Path to the dataset file.
+        columns (list, optional): Columns to read. Defaults to every column.
+
+    Returns:
+        pd.DataFrame: The loaded dataset.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".arrow", ".feather"):
+        from pyarrow import feather
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    import pandas as pd
+    if extension == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def save_dataset(data: "pd.DataFrame", path):
+    """
+    Save a processed dataset in the format given by the file extension.
+
+    '.arrow' / '.feather' files are written as uncompressed Arrow IPC so they can be
+    memory-mapped by load_dataset; '.parquet' and '.csv' are also supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    data = data.reset_index(drop=True)
+    if extension in (".arrow", ".feather"):
+        from pyarrow import feather
+        feather.write_feather(data, path, compression="uncompressed")
+    elif extension == ".parquet":
+        data.to_parquet(path, index=False)
+    else:
+        data.to_csv(path, index=False)
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yield a temporary path next to ``path`` and move it over ``path`` once the block succeeds.
+
+    Readers of ``path`` (e.g. the model registry's hot reload) see either the previous
+    file or the complete new one, never a half-written file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp" + os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_pickle(obj, path):
+    """
+    Pickle a trained artifact to ``path`` atomically.
+    """
+    with atomic_output(path) as tmp_path, open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def validate_data(data: "pd.DataFrame", required_columns: list):
     """
     Validates the dataset.
     Checks that all required cols are present.
@@ -53,6 +151,45 @@ def validate_data(data: pd.DataFrame, required_columns: list):
     print("Validation passed: All required columns are present, and no missing values found.")
 
 
+# Required dataset keys and their expected types
+DATASET_EXPECTED_TYPES = {
+    "id": int,
+    "date": str,
+    "from": str,
+    "to": str,
+    "subject": str,
+    "body": str,
+    "label": str,
+    "reasoning": str,
+    "target_scenario": str,
+}
+
+
+def _entry_issues(entry):
+    """
+    Return the list of structural problems of one dataset entry.
+    """
+    if not isinstance(entry, dict):
+        return [f"Entry is not an object: got {type(entry)}"]
+
+    entry_issues = []
+
+    # Check for missing keys
+    for key in DATASET_EXPECTED_TYPES:
+        if key not in entry:
+            entry_issues.append(f"Missing key: '{key}'")
+        elif entry[key] is None:
+            entry_issues.append(f"Key '{key}' is None")
+
+    # Check for type mismatches
+    for key, expected_type in DATASET_EXPECTED_TYPES.items():
+        if key in entry and entry[key] is not None:
+            if not isinstance(entry[key], expected_type):
+                entry_issues.append(f"Key '{key}' has incorrect type: Expected {expected_type}, got {type(entry[key])}")
+
+    return entry_issues
+
+
 def validate_dataset(input_file=None):
     """
     Validates the structure and contents of a dataset file.
@@ -83,20 +220,6 @@ def validate_dataset(input_file=None):
         input_file = config["paths"]["data"]["dataset"]
         print(f"Using dataset path from config: {input_file}")
 
-    # Define the required keys and their expected types
-    required_keys = ["id", "date", "from", "to", "subject", "body", "label", "reasoning", "target_scenario"]
-    expected_types = {
-        "id": int,
-        "date": str,
-        "from": str,
-        "to": str,
-        "subject": str,
-        "body": str,
-        "label": str,
-        "reasoning": str,
-        "target_scenario": str,
-    }
-
     # Check if the file exists
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"File not found at {input_file}")
@@ -113,23 +236,10 @@ def validate_dataset(input_file=None):
     inconsistencies = []
     category_counts = Counter()
     for i, entry in enumerate(data, start=1):
-        entry_issues = []
-
-        # Check for missing keys
-        for key in required_keys:
-            if key not in entry:
-                entry_issues.append(f"Missing key: '{key}'")
-            elif entry[key] is None:
-                entry_issues.append(f"Key '{key}' is None")
-
-        # Check for type mismatches
-        for key, expected_type in expected_types.items():
-            if key in entry and entry[key] is not None:
-                if not isinstance(entry[key], expected_type):
-                    entry_issues.append(f"Key '{key}' has incorrect type: Expected {expected_type}, got {type(entry[key])}")
+        entry_issues = _entry_issues(entry)
 
         # Count categories if the 'label' key exists and is valid
-        if "label" in entry and entry["label"] is not None and isinstance(entry["label"], str):
+        if isinstance(entry, dict) and isinstance(entry.get("label"), str):
             category_counts[entry["label"]] += 1
 
         # Log issues for this entry
@@ -153,48 +263,203 @@ def validate_dataset(input_file=None):
     return True
 
 
+def iter_json_array(file, chunk_size=1 << 16, max_entry_size=64 << 20):
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time.
+
+    Only the current read chunk and the element being decoded are held in memory,
+    so peak memory does not depend on the size of the file.
+
+    Args:
+        file: A text-mode file object positioned at the start of the array.
+        chunk_size (int): Number of characters read at a time.
+        max_entry_size (int): Largest single element (in characters) to buffer
+            before giving up; guards against malformed input being read whole.
+
+    Raises:
+        ValueError: If the content is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        # Skip whitespace; the next significant character, or None at the end of the file
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                return None
+            read_more()
+
+    # What may come next: "open" ('['), "first" (an element or ']'), "element"
+    # (after a comma) or "separator" (',' or ']')
+    expect = "open"
+    while True:
+        char = next_char()
+        if expect == "open":
+            if char != "[":
+                raise ValueError("Dataset is not a JSON array")
+            pos += 1
+            expect = "first"
+            continue
+        if char is None:
+            raise ValueError("Unexpected end of file: JSON array is not closed")
+        if char == "]" and expect in ("first", "separator"):
+            pos += 1
+            if next_char() is not None:
+                raise ValueError("Unexpected content after the end of the JSON array")
+            return
+        if expect == "separator":
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' after an array element, found {char!r}")
+            pos += 1
+            expect = "element"
+            continue
+        if char in ",]":
+            raise ValueError(f"Expected an array element, found {char!r}")
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Invalid JSON near character {e.pos}: {e.msg}")
+            if len(buffer) - pos > max_entry_size:
+                raise ValueError(f"JSON element larger than {max_entry_size} characters or malformed")
+            read_more()
+            continue
+        # A number may continue in the next chunk ("-0" of "-0.5e3"): only accept it
+        # once a delimiter follows
+        is_number = isinstance(element, (int, float)) and not isinstance(element, bool)
+        if not eof and (end == len(buffer) or (is_number and buffer[end] not in " \t\r\n,]")):
+            if len(buffer) - pos > max_entry_size:
+                raise ValueError(f"JSON element larger than {max_entry_size} characters or malformed")
+            read_more()
+            continue
+
+        yield element
+        pos = end
+        expect = "separator"
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def validate_dataset_stream(input_file=None, max_errors=100, on_max_errors="sample", chunk_size=1 << 16):
+    """
+    Validates a dataset file without loading it into memory.
+
+    Applies the same checks as validate_dataset, but parses the JSON array
+    incrementally and keeps at most max_errors error entries. Once that limit is
+    reached, on_max_errors decides whether to stop ("stop") or keep scanning and
+    keep a uniform random sample of all errors ("sample").
+
+    Args:
+        input_file (str, optional): Path to the JSON dataset file. If None, defaults to the path in config.yaml.
+        max_errors (int): Maximum number of error entries kept in the report.
+        on_max_errors (str): "stop" or "sample".
+        chunk_size (int): Number of characters read from the file at a time.
+
+    Returns:
+        dict: Structured report with the keys file, valid, entries, error_count,
+        errors (list of {"entry", "issues"}), errors_sampled, stopped_early and label_counts.
+    """
+    if on_max_errors not in ("stop", "sample"):
+        raise ValueError(f"on_max_errors must be 'stop' or 'sample', got {on_max_errors!r}")
+
+    if input_file is None:
+        input_file = load_config()["paths"]["data"]["dataset"]
+
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"File not found at {input_file}")
+
+    entries = 0
+    error_count = 0
+    errors = []
+    stopped_early = False
+    category_counts = Counter()
+    rng = random.Random(0)
+
+    with open(input_file, "r", encoding="utf-8") as f:
+        for i, entry in enumerate(iter_json_array(f, chunk_size=chunk_size), start=1):
+            entries = i
+            if isinstance(entry, dict) and isinstance(entry.get("label"), str):
+                category_counts[entry["label"]] += 1
+
+            entry_issues = _entry_issues(entry)
+            if not entry_issues:
+                continue
+
+            error_count += 1
+            error = {"entry": i, "issues": entry_issues}
+            if len(errors) < max_errors:
+                errors.append(error)
+            elif on_max_errors == "stop":
+                stopped_early = True
+                break
+            else:
+                # Reservoir sampling keeps a uniform sample of every error seen so far
+                slot = rng.randrange(error_count)
+                if slot < max_errors:
+                    errors[slot] = error
+
+    return {
+        "file": input_file,
+        "valid": error_count == 0,
+        "entries": entries,
+        "error_count": error_count,
+        "errors": sorted(errors, key=lambda error: error["entry"]),
+        "errors_sampled": error_count > len(errors) and not stopped_early,
+        "stopped_early": stopped_early,
+        "label_counts": dict(category_counts),
+    }
+
+
 def get_trained_tfidf_vectorizer():
     """
     Load the pre-trained TF-IDF vectorizer.
     """
-    config = load_config()
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    vectorizer_path = os.path.join(project_root, config["paths"]["models"]["tfidf_vectorizer"])
-    with open(vectorizer_path, "rb") as file:
-        return pickle.load(file)
+    return get_model("tfidf_vectorizer")
 
 
 def get_trained_logistic_regression_model():
     """
     Load the pre-trained Logistic Regression model.
     """
-    config = load_config()
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(project_root, config["paths"]["models"]["logistic_regression"])
-    with open(model_path, "rb") as file:
-        return pickle.load(file)
+    return get_model("logistic_regression")
 
 
 def get_trained_naive_bayes_model():
     """
     Load the pre-trained Naive Bayes model.
     """
-    config = load_config()
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(project_root, config["paths"]["models"]["naive_bayes"])
-    with open(model_path, "rb") as file:
-        return pickle.load(file)
+    return get_model("naive_bayes")
 
 
 def get_trained_svm_model():
     """
-    Load the pre-trained SVM model.
+    Load the pre-trained SVM model for the configured engine ('linear' or 'libsvm').
     """
     config = load_config()
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(project_root, config["paths"]["models"]["svm"])
-    with open(model_path, "rb") as file:
-        return pickle.load(file)
+    return get_model("svm_linear" if config["training"]["svm_engine"] == "linear" else "svm")
+
+
+def get_trained_pipeline(model_name):
+    """
+    Load the preprocessor + vectorizer + model pipeline of 'logistic_regression', 'naive_bayes' or 'svm'.
+    """
+    return get_model(f"{model_name}_pipeline")
 
 
 def preprocess_text(text):
@@ -212,7 +477,31 @@ def preprocess_text(text):
     Returns:
         str: Preprocessed text with richer context.
     """
-    doc = nlp(text.lower())
+    doc = get_nlp()(text.lower())
+    return _filter_tokens(doc)
+
+
+def preprocess_texts(texts, n_process=1, batch_size=256):
+    """
+    Batch counterpart of preprocess_text built on nlp.pipe.
+
+    Produces exactly the same output as calling preprocess_text on every text,
+    but streams the texts through spaCy in batches and, with n_process > 1,
+    across worker processes.
+
+    Args:
+        texts (iterable): The texts to preprocess.
+        n_process (int): Number of worker processes (-1 uses every CPU core).
+        batch_size (int): Number of texts sent to spaCy per batch.
+
+    Returns:
+        list: Preprocessed texts, in input order.
+    """
+    docs = get_nlp().pipe((text.lower() for text in texts), n_process=n_process, batch_size=batch_size)
+    return [_filter_tokens(doc) for doc in docs]
+
+
+def _filter_tokens(doc):
     # Retain key parts of speech and allow meaningful stopwords for context
     clean_text = " ".join([
         token.text for token in doc
@@ -1,8 +1,24 @@
-from utils import validate_dataset
+import argparse
+import json
+from utils import validate_dataset, validate_dataset_stream
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the raw email dataset.")
+    parser.add_argument("input_file", nargs="?", default=None, help="Dataset path (defaults to config.yaml)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse the dataset incrementally with bounded memory and print a JSON report")
+    parser.add_argument("--max-errors", type=int, default=100, help="Errors kept in the streaming report")
+    parser.add_argument("--on-max-errors", choices=["stop", "sample"], default="sample",
+                        help="Stop at --max-errors, or keep scanning and sample the errors")
+    args = parser.parse_args()
+
+    if args.stream:
+        report = validate_dataset_stream(args.input_file, max_errors=args.max_errors, on_max_errors=args.on_max_errors)
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0 if report["valid"] else 1)
+
     try:
         print("Validating dataset...")
-        validate_dataset()  # No file provided, uses path from config.yaml
+        validate_dataset(args.input_file)  # No file provided, uses path from config.yaml
     except ValueError as e:
         print(f"Validation failed: {e}")